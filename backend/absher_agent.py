@@ -1,19 +1,21 @@
 # backend/absher_agent.py
-from typing import Any, Dict
+from functools import lru_cache
+from typing import Optional
 
 from langchain.agents import AgentType, initialize_agent
-from langchain.memory import ConversationBufferMemory
+from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import SystemMessage
 from langchain_core.prompts import MessagesPlaceholder
-from langchain_openai import ChatOpenAI
 from langchain.tools import StructuredTool
 
 from absher_tools import (
     SearchAbsherDocsInput,
     SubmitRenewalInput,
+    asearch_absher_docs_tool,
     search_absher_docs_tool,
     submit_renewal_request_tool,
 )
+from config import chat_llm
 
 SYSTEM_PROMPT = """
 You are AbsherAgent, an intelligent assistant for the Absher platform.
@@ -110,6 +112,7 @@ def _build_tools() -> list[StructuredTool]:
         StructuredTool.from_function(
             name="search_absher_docs",
             func=search_absher_docs_tool,
+            coroutine=asearch_absher_docs_tool,
             args_schema=SearchAbsherDocsInput,
             description=(
                 "Use this tool when the user asks how Absher services work, "
@@ -134,29 +137,23 @@ def _build_tools() -> list[StructuredTool]:
     ]
 
 
-def build_absher_agent(model: str = "gpt-4.1-mini"):
+def build_absher_agent(llm: Optional[BaseChatModel] = None):
     """
     Build and return a LangChain AgentExecutor configured with:
     - Absher system prompt
     - RAG + renewal tools
-    - Conversation memory
+    - A chat_history placeholder (history is passed in on each call,
+      the executor itself holds no per-session state)
     - Intermediate steps enabled (for extracting tool calls)
     """
-    llm = ChatOpenAI(model=model, temperature=0.2)
     tools = _build_tools()
 
-    memory = ConversationBufferMemory(
-        memory_key="chat_history",
-        return_messages=True,
-    )
-
     agent = initialize_agent(
         tools=tools,
-        llm=llm,
+        llm=llm or chat_llm,
         agent=AgentType.OPENAI_FUNCTIONS,
         verbose=True,
         handle_parsing_errors=True,
-        memory=memory,
         return_intermediate_steps=True,
         agent_kwargs={
             "system_message": SystemMessage(content=SYSTEM_PROMPT),
@@ -166,3 +163,11 @@ def build_absher_agent(model: str = "gpt-4.1-mini"):
         },
     )
     return agent
+
+
+@lru_cache(maxsize=1)
+def get_absher_agent():
+    """
+    Process-wide AgentExecutor shared by all sessions (built once).
+    """
+    return build_absher_agent()
@@ -0,0 +1,143 @@
+# backend/absher_lexical.py
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+# -------------------------------------------------------------------
+# Arabic / English normalization
+# -------------------------------------------------------------------
+
+# Harakat, tanween, shadda, sukun, superscript alef + tatweel
+_DIACRITICS = re.compile(r"[\u064B-\u0652\u0670\u0640]")
+
+_CHAR_FOLDS = str.maketrans(
+    {
+        "أ": "ا",
+        "إ": "ا",
+        "آ": "ا",
+        "ٱ": "ا",
+        "ى": "ي",
+        "ئ": "ي",
+        "ؤ": "و",
+        "ة": "ه",
+        **{chr(0x0660 + d): str(d) for d in range(10)},  # Arabic-Indic digits
+    }
+)
+
+# Definite article, alone or after a one-letter prefix (و / ب / ك / ف / ل)
+_ARTICLE_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+
+_STOPWORDS = {
+    # English
+    "a", "an", "and", "are", "be", "can", "do", "does", "for", "how", "i",
+    "in", "is", "it", "my", "of", "on", "or", "the", "to", "what", "with",
+    # Arabic (already normalized)
+    "في", "من", "علي", "الي", "عن", "ما", "ماذا", "كيف", "هل", "او", "و",
+    "مع", "هذا", "هذه", "ان", "انا", "لي",
+}
+
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize_arabic(text: str) -> str:
+    """
+    Strip diacritics / tatweel and fold letter variants (alef forms,
+    alef maqsura, hamza carriers, ta marbuta) and Arabic-Indic digits.
+    """
+    return _DIACRITICS.sub("", text).translate(_CHAR_FOLDS)
+
+
+# Light English suffix stripping (renew / renewal / renewing / renewed)
+_ENGLISH_SUFFIXES = ("ing", "als", "al", "ed", "es", "s")
+
+
+def _strip_affixes(token: str) -> str:
+    if token.isascii():
+        for suffix in _ENGLISH_SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+                return token[: -len(suffix)]
+        return token
+
+    for prefix in _ARTICLE_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 3:
+            return token[len(prefix):]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased, normalized word tokens without stopwords. Identifiers such
+    as error codes (ERR_LIC_VALIDITY_OVER) stay one token.
+    """
+    tokens = []
+    for token in _TOKEN.findall(normalize_arabic(text).lower()):
+        token = _strip_affixes(token)
+        if len(token) > 1 and token not in _STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+# -------------------------------------------------------------------
+# BM25
+# -------------------------------------------------------------------
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed list of texts (in-memory inverted index).
+    Results are (position in the input list, score), best first.
+    """
+
+    def __init__(self, texts: Sequence[str], k1: float = 1.5, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        for doc_idx, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc_idx, tf))
+
+        n_docs = len(self.doc_lengths)
+        self.avg_length = (sum(self.doc_lengths) / n_docs) if n_docs else 0.0
+        self.idf: Dict[str, float] = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+        # Weight for query terms that never occur (typos, paraphrases)
+        self.max_idf = max(self.idf.values(), default=0.0)
+
+    def search(self, query: str, k: int) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_idx, tf in self.postings[term]:
+                norm = 1 - self.b + self.b * self.doc_lengths[doc_idx] / self.avg_length
+                scores[doc_idx] = scores.get(doc_idx, 0.0) + idf * tf * (self.k1 + 1) / (
+                    tf + self.k1 * norm
+                )
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def coverage(self, query: str, doc_idx: int) -> float:
+        """
+        IDF-weighted share of the query's terms that occur in the document
+        (0..1). Terms unknown to the index count with the highest IDF, so a
+        paraphrased query is never "covered" by accident.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return 0.0
+
+        total = matched = 0.0
+        for term in terms:
+            idf = self.idf.get(term, self.max_idf)
+            total += idf
+            if any(d == doc_idx for d, _ in self.postings.get(term, ())):
+                matched += idf
+        return matched / total if total else 0.0
@@ -1,20 +1,60 @@
 # backend/absher_rag.py
-from functools import lru_cache
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import json
+import numpy as np
 from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-from config import embeddings
+from absher_lexical import BM25Index, tokenize
+from config import (
+    EMBEDDING_MODEL,
+    RAG_QUERY_CACHE_SIMILARITY,
+    RAG_QUERY_CACHE_SIZE,
+    embeddings,
+)
 
 KNOWLEDGE_DIR = Path(__file__).with_name("knowledge")
 JSON_PATH = KNOWLEDGE_DIR / "absher_knowledge.json"
 
+# Prebuilt index (written by `python absher_rag.py`)
+INDEX_DIR = KNOWLEDGE_DIR / "faiss_index"
+MANIFEST_PATH = INDEX_DIR / "manifest.json"
 
-def _load_json_docs() -> List[Document]:
+# Splitter settings (part of the index fingerprint)
+CHUNK_SIZE = 700
+CHUNK_OVERLAP = 120
+SEPARATORS = ["\n\n", "\n", ".", " "]
+
+# Bumped when the stored chunk metadata changes (2: chunk_id, 3: chunk_id
+# as docstore id + section manifest)
+INDEX_FORMAT_VERSION = 3
+
+# Hybrid retrieval: BM25 and vector candidates fused by reciprocal rank
+RRF_K = 60
+FUSION_CANDIDATES = 20
+# Lexical-only fast path (no embedding call) when the best BM25 chunk
+# covers this share of the query terms and clearly beats the runner-up
+LEXICAL_CONFIDENT_COVERAGE = 0.8
+LEXICAL_CONFIDENT_MARGIN = 1.3
+
+RAG_METRICS: Dict[str, Any] = {
+    "searches": 0,
+    "lexical_only": 0,
+    "hybrid": 0,
+    "latency_seconds_sum": 0.0,
+}
+
+
+def load_json_docs() -> List[Document]:
     """
     Load Absher documentation from the JSON file into a list of Documents.
     Each section becomes a Document with metadata (id, title, source).
@@ -49,57 +89,625 @@ def _load_json_docs() -> List[Document]:
     return docs
 
 
-def _build_vector_index() -> FAISS:
+# section id -> {"hash": section hash, "chunk_ids": docstore ids of its chunks}
+SectionManifest = Dict[str, Dict[str, Any]]
+
+
+def section_hash(doc: Document) -> str:
+    """
+    Hash of a knowledge section (id, title, text), used to detect changed
+    sections: by the incremental reindex and by the FAQ router.
+    """
+    h = hashlib.sha256()
+    for part in (doc.metadata["id"], doc.metadata["title"], doc.page_content):
+        h.update(part.encode("utf-8") + b"\0")
+    return h.hexdigest()
+
+
+def _split_sections() -> Dict[str, Tuple[str, List[Document]]]:
     """
-    Build a FAISS index over the Absher documentation.
+    Current knowledge sections, split into chunks: section id -> (section
+    hash, chunks). Chunk ids ("<section id>:<n>") double as docstore ids,
+    so a section's chunks can be replaced in place.
+    """
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=SEPARATORS,
+    )
+
+    sections: Dict[str, Tuple[str, List[Document]]] = {}
+    for doc in load_json_docs():
+        section_id = doc.metadata["id"]
+        if section_id in sections:
+            print(f"[RAG] Duplicate section id '{section_id}', keeping the first one")
+            continue
+
+        chunks = splitter.split_documents([doc])
+        for n, chunk in enumerate(chunks):
+            chunk.metadata["chunk_id"] = f"{section_id}:{n}"
+        sections[section_id] = (section_hash(doc), chunks)
+
+    return sections
+
+
+def _add_section_chunks(index: FAISS, chunks: List[Document]) -> None:
+    index.add_texts(
+        texts=[c.page_content for c in chunks],
+        metadatas=[c.metadata for c in chunks],
+        ids=[c.metadata["chunk_id"] for c in chunks],
+    )
+
+
+def _section_manifest(sections: Dict[str, Tuple[str, List[Document]]]) -> SectionManifest:
+    return {
+        section_id: {
+            "hash": digest,
+            "chunk_ids": [c.metadata["chunk_id"] for c in chunks],
+        }
+        for section_id, (digest, chunks) in sections.items()
+    }
+
+
+def _build_vector_index() -> Tuple[FAISS, SectionManifest]:
+    """
+    Build a FAISS index over the Absher documentation (every section).
     If no docs are available, return a safe empty index.
     """
-    raw_docs = _load_json_docs()
-    if not raw_docs:
-        return FAISS.from_texts(
+    sections = _split_sections()
+    if not sections:
+        index = FAISS.from_texts(
             texts=[""],
             embedding=embeddings,
             metadatas=[{"source": "empty"}],
         )
+        return index, {}
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=700,
-        chunk_overlap=120,
-        separators=["\n\n", "\n", ".", " "],
+    chunks = [c for _, section_chunks in sections.values() for c in section_chunks]
+    index = FAISS.from_texts(
+        texts=[c.page_content for c in chunks],
+        embedding=embeddings,
+        metadatas=[c.metadata for c in chunks],
+        ids=[c.metadata["chunk_id"] for c in chunks],
     )
+    return index, _section_manifest(sections)
 
-    chunks: List[Document] = []
-    for doc in raw_docs:
-        chunks.extend(splitter.split_documents([doc]))
 
-    texts = [c.page_content for c in chunks]
-    metadatas = [c.metadata for c in chunks]
+def _update_vector_index(
+    index: FAISS,
+    manifest: SectionManifest,
+) -> Optional[Tuple[FAISS, SectionManifest, int, int]]:
+    """
+    Apply section-level changes to a copy of `index` (the original keeps
+    serving): chunks of changed / removed sections are deleted, and only
+    added / changed sections are split and embedded.
 
-    return FAISS.from_texts(
-        texts=texts,
-        embedding=embeddings,
-        metadatas=metadatas,
+    Returns (index, manifest, sections re-embedded, sections removed), or
+    None when a full build is needed (no previous or no current sections).
+    """
+    sections = _split_sections()
+    if not sections or not manifest:
+        return None
+
+    changed = [
+        section_id
+        for section_id, (digest, _) in sections.items()
+        if manifest.get(section_id, {}).get("hash") != digest
+    ]
+    removed = [section_id for section_id in manifest if section_id not in sections]
+
+    updated = FAISS.deserialize_from_bytes(
+        index.serialize_to_bytes(),
+        embeddings,
+        allow_dangerous_deserialization=True,
     )
+    stale_ids = [
+        chunk_id
+        for section_id in changed + removed
+        for chunk_id in manifest.get(section_id, {}).get("chunk_ids", [])
+    ]
+    if stale_ids:
+        updated.delete(stale_ids)
+
+    new_chunks = [c for section_id in changed for c in sections[section_id][1]]
+    if new_chunks:
+        _add_section_chunks(updated, new_chunks)
+
+    return updated, _section_manifest(sections), len(changed), len(removed)
+
+
+def _settings_fingerprint() -> str:
+    """
+    Hash of everything besides the knowledge text that affects the stored
+    vectors (splitter settings, embedding model, index format). Sections
+    can only be updated in place in an index with the same settings.
+    """
+    settings = {
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "separators": SEPARATORS,
+        "embedding_model": EMBEDDING_MODEL,
+        "index_format": INDEX_FORMAT_VERSION,
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _index_fingerprint() -> str:
+    """
+    Content hash of the knowledge JSON plus the index settings.
+    """
+    h = hashlib.sha256()
+    h.update(JSON_PATH.read_bytes() if JSON_PATH.exists() else b"")
+    h.update(_settings_fingerprint().encode("utf-8"))
+    return h.hexdigest()
+
+
+def _save_index(index: FAISS, manifest: SectionManifest, fingerprint: str) -> None:
+    """
+    Persist the index with save_local, next to a manifest holding its
+    fingerprint and section hashes / chunk ids. The manifest is written
+    last so a half-written index is never considered valid.
+    """
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    MANIFEST_PATH.unlink(missing_ok=True)
+    index.save_local(str(INDEX_DIR))
+    MANIFEST_PATH.write_text(
+        json.dumps(
+            {
+                "fingerprint": fingerprint,
+                "settings": _settings_fingerprint(),
+                "built_at": datetime.now(timezone.utc).isoformat(),
+                "sections": manifest,
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+
+
+def build_and_save_index(fingerprint: Optional[str] = None) -> FAISS:
+    """
+    Build the full FAISS index and persist it (see _save_index).
+    """
+    fingerprint = fingerprint or _index_fingerprint()
+    index, manifest = _build_vector_index()
+    _save_index(index, manifest, fingerprint)
+    return index
+
+
+def _load_saved_index() -> Optional[Tuple[FAISS, Dict[str, Any]]]:
+    """
+    Load the persisted index and its manifest if it was built with the
+    current settings (its knowledge may be outdated). Returns None when
+    missing, built differently or unreadable.
+    """
+    try:
+        manifest = json.loads(MANIFEST_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("settings") != _settings_fingerprint():
+        return None
+
+    try:
+        # Safe: the pickle is written by _save_index on this host
+        index = FAISS.load_local(
+            str(INDEX_DIR),
+            embeddings,
+            allow_dangerous_deserialization=True,
+        )
+    except Exception as exc:  # noqa: BLE001
+        print(f"[RAG] Failed to load saved index: {exc}")
+        return None
+    return index, manifest
+
+
+# -------------------------------------------------------------------
+# Served index (hot-swappable)
+# -------------------------------------------------------------------
+
+
+class KnowledgeIndex:
+    """
+    One generation of the served knowledge index: the FAISS index, the
+    BM25 index over the same chunks (read from its docstore), and the
+    fingerprint / section manifest it was built from. Never modified once
+    built; a reload swaps in a new one, so in-flight searches keep using
+    the generation they started with.
+    """
+
+    def __init__(self, vector: FAISS, sections: SectionManifest, fingerprint: str) -> None:
+        self.vector = vector
+        self.sections = sections
+        self.fingerprint = fingerprint
+        self.chunks: List[Document] = [
+            vector.docstore.search(doc_id) for doc_id in vector.index_to_docstore_id.values()
+        ]
+        # Titles are indexed with the text, since they carry the Arabic
+        # service names
+        self.bm25 = BM25Index(
+            [f"{c.metadata.get('title', '')}\n{c.page_content}" for c in self.chunks]
+        )
+        self.sections_reembedded = 0
+        self.sections_removed = 0
+
+
+_ACTIVE_INDEX: Optional[KnowledgeIndex] = None
+# Held while building / swapping an index (one builder at a time); searches
+# only read _ACTIVE_INDEX and never wait on it.
+_INDEX_LOCK = threading.Lock()
+
+# Called with no arguments after a reload swapped in new knowledge
+_RELOAD_HOOKS: List[Callable[[], None]] = []
+
+INDEX_METRICS: Dict[str, Any] = {
+    "reloads": 0,
+    "sections_reembedded": 0,
+    "sections_removed": 0,
+    "last_reload_seconds": None,
+}
+
+
+def register_index_reload_hook(hook: Callable[[], None]) -> None:
+    _RELOAD_HOOKS.append(hook)
+
+
+def _load_or_build(previous: Optional[KnowledgeIndex]) -> KnowledgeIndex:
+    """
+    Index for the current knowledge JSON, from (in order): `previous` or
+    the saved index when up to date; either of them updated section by
+    section; a full build. Anything new is saved to INDEX_DIR.
+    """
+    fingerprint = _index_fingerprint()
+
+    if previous is not None:
+        base = (previous.vector, previous.sections, previous.fingerprint)
+    else:
+        saved = _load_saved_index()
+        base = (
+            (saved[0], saved[1].get("sections", {}), saved[1].get("fingerprint"))
+            if saved is not None
+            else None
+        )
+
+    if base is not None:
+        vector, sections, base_fingerprint = base
+        if base_fingerprint == fingerprint:
+            if previous is not None:
+                return previous
+            print(f"[RAG] Loaded prebuilt index from {INDEX_DIR}")
+            return KnowledgeIndex(vector, sections, fingerprint)
+
+        updated = _update_vector_index(vector, sections)
+        if updated is not None:
+            vector, sections, reembedded, removed = updated
+            _save_index(vector, sections, fingerprint)
+            print(
+                f"[RAG] Knowledge changed: re-embedded {reembedded} section(s), "
+                f"removed {removed}"
+            )
+            index = KnowledgeIndex(vector, sections, fingerprint)
+            index.sections_reembedded = reembedded
+            index.sections_removed = removed
+            return index
+
+    if previous is not None and previous.sections and not load_json_docs():
+        # Keep serving rather than swap in an empty index (e.g. a file
+        # caught mid-write or with a JSON error)
+        raise ValueError(f"No sections could be read from {JSON_PATH}")
+
+    print("[RAG] Knowledge changed or no prebuilt index, rebuilding")
+    vector, sections = _build_vector_index()
+    _save_index(vector, sections, fingerprint)
+    index = KnowledgeIndex(vector, sections, fingerprint)
+    index.sections_reembedded = len(sections)
+    return index
+
+
+def get_active_index() -> KnowledgeIndex:
+    """
+    The knowledge index currently served, loaded (or built) on first use.
+    """
+    global _ACTIVE_INDEX
+
+    index = _ACTIVE_INDEX
+    if index is not None:
+        return index
+
+    with _INDEX_LOCK:
+        if _ACTIVE_INDEX is None:
+            _ACTIVE_INDEX = _load_or_build(None)
+            print(f"[RAG] Lexical index built over {len(_ACTIVE_INDEX.chunks)} chunks")
+        return _ACTIVE_INDEX
 
 
-@lru_cache(maxsize=1)
 def get_absher_index() -> FAISS:
     """
-    Cached accessor for the Absher FAISS index.
+    FAISS index currently served.
     """
-    return _build_vector_index()
+    return get_active_index().vector
 
 
-def search_absher_docs(query: str, k: int = 4) -> str:
+def get_absher_lexical_index() -> Tuple[BM25Index, List[Document]]:
     """
-    Search the Absher documentation for the most relevant snippets.
+    BM25 index over the same chunks as the FAISS index, with the chunk
+    list it refers to.
+    """
+    index = get_active_index()
+    return index.bm25, index.chunks
 
-    Returns a formatted string with titles and content, or a fallback
-    message if nothing relevant is found.
+
+def reload_absher_index() -> Dict[str, Any]:
+    """
+    Bring the served index up to date with the knowledge JSON, re-embedding
+    only added / changed sections, then swap it in atomically. Searches
+    keep running on the old index meanwhile. Blocking: run in a thread.
+    """
+    global _ACTIVE_INDEX
+
+    started = time.perf_counter()
+    with _INDEX_LOCK:
+        previous = _ACTIVE_INDEX
+        index = _load_or_build(previous)
+        if index is previous:
+            return {"status": "unchanged", "chunks": len(index.chunks)}
+        _ACTIVE_INDEX = index
+
+    for hook in _RELOAD_HOOKS:
+        hook()
+
+    elapsed = time.perf_counter() - started
+    INDEX_METRICS["reloads"] += 1
+    INDEX_METRICS["sections_reembedded"] += index.sections_reembedded
+    INDEX_METRICS["sections_removed"] += index.sections_removed
+    INDEX_METRICS["last_reload_seconds"] = round(elapsed, 3)
+    print(f"[RAG] Swapped in reloaded index ({len(index.chunks)} chunks) in {elapsed:.2f}s")
+    return {
+        "status": "reloaded",
+        "sections_reembedded": index.sections_reembedded,
+        "sections_removed": index.sections_removed,
+        "chunks": len(index.chunks),
+        "seconds": round(elapsed, 3),
+    }
+
+
+def _knowledge_mtime() -> Optional[float]:
+    try:
+        return JSON_PATH.stat().st_mtime
+    except OSError:
+        return None
+
+
+async def watch_knowledge_file(interval_seconds: float) -> None:
     """
-    index = get_absher_index()
-    docs = index.similarity_search(query, k=k)
+    Poll the knowledge JSON's mtime and hot-reload the index when it
+    changes (the reload itself runs in a worker thread).
+    """
+    last_mtime = _knowledge_mtime()
+    while True:
+        await asyncio.sleep(interval_seconds)
+        mtime = _knowledge_mtime()
+        if mtime == last_mtime:
+            continue
+        last_mtime = mtime
+        try:
+            await asyncio.to_thread(reload_absher_index)
+        except Exception as exc:  # noqa: BLE001
+            print(f"[RAG] Knowledge reload failed, still serving the previous index: {exc}")
+
+
+def _chunk_key(doc: Document) -> str:
+    return doc.metadata.get("chunk_id") or doc.page_content
+
+
+def _lexical_is_confident(bm25: BM25Index, query: str, hits: List[Tuple[int, float]]) -> bool:
+    if not hits:
+        return False
+    if len(hits) > 1 and hits[0][1] < LEXICAL_CONFIDENT_MARGIN * hits[1][1]:
+        return False
+    return bm25.coverage(query, hits[0][0]) >= LEXICAL_CONFIDENT_COVERAGE
+
+
+def _reciprocal_rank_fusion(rankings: List[List[Document]], k: int) -> List[Document]:
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = _chunk_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [docs[key] for key in best]
+
+
+def retrieve_absher_chunks(
+    query: str,
+    k: int = 4,
+    query_embedding: Optional[List[float]] = None,
+    index: Optional[KnowledgeIndex] = None,
+    hits: Optional[List[Tuple[int, float]]] = None,
+    confident: Optional[bool] = None,
+) -> List[Document]:
+    """
+    Hybrid retrieval: BM25 (local) fused with FAISS similarity by
+    reciprocal rank fusion. When the lexical match is confident, the
+    BM25 ranking is used alone and no query embedding is needed.
+
+    Callers that already ran the BM25 search (FUSION_CANDIDATES hits on
+    the same index) and the confidence check pass `hits` / `confident`.
+    """
+    started = time.perf_counter()
+    index = index or get_active_index()
+    bm25, chunks = index.bm25, index.chunks
+
+    if hits is None:
+        hits = bm25.search(query, k=FUSION_CANDIDATES)
+    lexical = [chunks[i] for i, _ in hits]
+    if confident is None:
+        confident = query_embedding is None and _lexical_is_confident(bm25, query, hits)
+
+    if confident:
+        RAG_METRICS["lexical_only"] += 1
+        docs = lexical[:k]
+    else:
+        RAG_METRICS["hybrid"] += 1
+        if query_embedding is None:
+            query_embedding = embeddings.embed_query(query)
+        vector = index.vector.similarity_search_by_vector(query_embedding, k=FUSION_CANDIDATES)
+        docs = _reciprocal_rank_fusion([lexical, vector], k)
+
+    RAG_METRICS["searches"] += 1
+    RAG_METRICS["latency_seconds_sum"] += time.perf_counter() - started
+    return docs
+
+
+# -------------------------------------------------------------------
+# Query-result cache
+# -------------------------------------------------------------------
+
 
+class QueryResultCache:
+    """
+    Two-level cache of formatted search results, valid for one index
+    fingerprint:
+
+    1. exact: normalized query text (same tokens as the BM25 index) + k;
+    2. semantic: nearest cached query embedding (same k) with cosine
+       similarity >= RAG_QUERY_CACHE_SIMILARITY.
+
+    Both levels hold at most RAG_QUERY_CACHE_SIZE entries (LRU / FIFO).
+    Thread-safe: searches run in worker threads.
+    """
+
+    def __init__(self, max_items: int, min_similarity: float) -> None:
+        self.max_items = max_items
+        self.min_similarity = min_similarity
+        self.fingerprint: Optional[str] = None
+        self._exact: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+        # Semantic level: unit vectors in a ring buffer, with (k, result)
+        self._vectors: Optional[np.ndarray] = None
+        self._entries: List[Optional[Tuple[int, str]]] = [None] * max_items
+        self._next_slot = 0
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+        self._miss_seconds_sum = 0.0
+
+    @staticmethod
+    def key(query: str, k: int) -> Tuple[str, int]:
+        return " ".join(tokenize(query)) or query.strip().lower(), k
+
+    def _check_fingerprint(self, fingerprint: Optional[str]) -> None:
+        if fingerprint != self.fingerprint:
+            if self._exact:
+                self.invalidations += 1
+            self._exact.clear()
+            self._vectors = None
+            self._entries = [None] * self.max_items
+            self._next_slot = 0
+            self.fingerprint = fingerprint
+
+    def _record_hit(self) -> None:
+        # Credit the average cost of a miss as latency saved
+        misses = self.misses
+        if misses:
+            self.saved_seconds += self._miss_seconds_sum / misses
+
+    def get_exact(self, key: Tuple[str, int], fingerprint: Optional[str]) -> Optional[str]:
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            result = self._exact.get(key)
+            if result is not None:
+                self._exact.move_to_end(key)
+                self.exact_hits += 1
+                self._record_hit()
+            return result
+
+    def get_similar(
+        self,
+        key: Tuple[str, int],
+        embedding: List[float],
+        fingerprint: Optional[str],
+    ) -> Optional[str]:
+        vector = _unit(embedding)
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            if self._vectors is None:
+                return None
+
+            similarities = self._vectors @ vector
+            for slot in np.argsort(similarities)[::-1]:
+                if similarities[slot] < self.min_similarity:
+                    break
+                entry = self._entries[slot]
+                if entry is not None and entry[0] == key[1]:
+                    self.semantic_hits += 1
+                    self._record_hit()
+                    self._put_exact(key, entry[1])
+                    return entry[1]
+            return None
+
+    def _put_exact(self, key: Tuple[str, int], result: str) -> None:
+        self._exact[key] = result
+        self._exact.move_to_end(key)
+        while len(self._exact) > self.max_items:
+            self._exact.popitem(last=False)
+
+    def put(
+        self,
+        key: Tuple[str, int],
+        embedding: Optional[List[float]],
+        result: str,
+        fingerprint: Optional[str],
+        elapsed: float,
+    ) -> None:
+        with self._lock:
+            self._check_fingerprint(fingerprint)
+            self.misses += 1
+            self._miss_seconds_sum += elapsed
+            self._put_exact(key, result)
+
+            if embedding is None:
+                return
+            vector = _unit(embedding)
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_items, vector.shape[0]), dtype=np.float32)
+            slot = self._next_slot
+            self._vectors[slot] = vector
+            self._entries[slot] = (key[1], result)
+            self._next_slot = (slot + 1) % self.max_items
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (
+                round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else None
+            ),
+            "saved_latency_seconds": round(self.saved_seconds, 3),
+            "entries": len(self._exact),
+            "invalidations": self.invalidations,
+        }
+
+
+def _unit(embedding: List[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+QUERY_CACHE = QueryResultCache(RAG_QUERY_CACHE_SIZE, RAG_QUERY_CACHE_SIMILARITY)
+
+
+def _format_docs(docs: List[Document]) -> str:
+    docs = [d for d in docs if d.page_content.strip()]
     if not docs:
         return "No relevant information found in the Absher documentation."
 
@@ -109,3 +717,72 @@ def search_absher_docs(query: str, k: int = 4) -> str:
         response_parts.append(f"{title}\n{doc.page_content.strip()}")
 
     return "\n\n".join(response_parts)
+
+
+def search_absher_docs(query: str, k: int = 4) -> str:
+    """
+    Search the Absher documentation for the most relevant snippets.
+
+    Returns a formatted string with titles and content, or a fallback
+    message if nothing relevant is found. Results are cached per index
+    fingerprint: exact (normalized) repeats are answered before any
+    retrieval, near-duplicate phrasings after the query embedding.
+    """
+    started = time.perf_counter()
+    index = get_active_index()
+    fingerprint = index.fingerprint
+    key = QUERY_CACHE.key(query, k)
+
+    cached = QUERY_CACHE.get_exact(key, fingerprint)
+    if cached is not None:
+        return cached
+
+    bm25 = index.bm25
+    hits = bm25.search(query, k=FUSION_CANDIDATES)
+    confident = _lexical_is_confident(bm25, query, hits)
+
+    query_embedding = None
+    if not confident:
+        query_embedding = embeddings.embed_query(query)
+        cached = QUERY_CACHE.get_similar(key, query_embedding, fingerprint)
+        if cached is not None:
+            return cached
+
+    result = _format_docs(
+        retrieve_absher_chunks(
+            query,
+            k=k,
+            query_embedding=query_embedding,
+            index=index,
+            hits=hits,
+            confident=confident,
+        )
+    )
+    QUERY_CACHE.put(key, query_embedding, result, fingerprint, time.perf_counter() - started)
+    return result
+
+
+def rag_stats() -> Dict[str, Any]:
+    """
+    Counters for the /metrics endpoint.
+    """
+    searches = RAG_METRICS["searches"]
+    return {
+        **RAG_METRICS,
+        "latency_seconds_sum": round(RAG_METRICS["latency_seconds_sum"], 4),
+        "embedding_calls_saved_ratio": (
+            round(RAG_METRICS["lexical_only"] / searches, 3) if searches else None
+        ),
+        "query_cache": QUERY_CACHE.stats(),
+        "index": {
+            **INDEX_METRICS,
+            "chunks": len(_ACTIVE_INDEX.chunks) if _ACTIVE_INDEX is not None else 0,
+            "sections": len(_ACTIVE_INDEX.sections) if _ACTIVE_INDEX is not None else 0,
+        },
+    }
+
+
+if __name__ == "__main__":
+    # Offline build: python absher_rag.py
+    build_and_save_index()
+    print(f"[RAG] Index written to {INDEX_DIR}")
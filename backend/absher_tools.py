@@ -1,4 +1,5 @@
 # backend/absher_tools.py
+import asyncio
 from typing import Any, Dict, Literal
 
 from pydantic import BaseModel, Field
@@ -31,6 +32,14 @@ def search_absher_docs_tool(query: str, k: int = 4) -> str:
     return search_absher_docs(query=query, k=int(k))
 
 
+async def asearch_absher_docs_tool(query: str, k: int = 4) -> str:
+    """
+    Async variant used by the agent: FAISS search + query embedding are
+    blocking, so run them in a worker thread instead of on the event loop.
+    """
+    return await asyncio.to_thread(search_absher_docs, query, int(k))
+
+
 # ---------- Tool 2: submit_renewal_request (popup trigger) ----------
 
 
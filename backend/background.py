@@ -0,0 +1,85 @@
+# backend/background.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import BACKGROUND_QUEUE_SIZE, BACKGROUND_WORKERS
+
+# A job is a zero-argument coroutine function, e.g. lambda: do_work(user_id)
+Job = Callable[[], Awaitable[Any]]
+
+_QUEUE: Optional["asyncio.Queue[Tuple[str, Job]]"] = None
+_WORKERS: List[asyncio.Task] = []
+
+JOB_METRICS: Dict[str, int] = {
+    "enqueued": 0,
+    "completed": 0,
+    "failed": 0,
+}
+
+
+async def _worker(worker_id: int) -> None:
+    assert _QUEUE is not None
+    while True:
+        name, job = await _QUEUE.get()
+        try:
+            await job()
+            JOB_METRICS["completed"] += 1
+        except Exception as exc:  # noqa: BLE001
+            JOB_METRICS["failed"] += 1
+            print(f"[JOBS] Worker {worker_id}: job '{name}' failed: {exc}")
+        finally:
+            _QUEUE.task_done()
+
+
+def start_workers() -> None:
+    """
+    Start BACKGROUND_WORKERS workers consuming a queue bounded to
+    BACKGROUND_QUEUE_SIZE jobs. Must be called from the app's event loop.
+    """
+    global _QUEUE
+
+    if _QUEUE is not None:
+        return
+
+    _QUEUE = asyncio.Queue(maxsize=BACKGROUND_QUEUE_SIZE)
+    for i in range(BACKGROUND_WORKERS):
+        _WORKERS.append(asyncio.create_task(_worker(i)))
+    print(f"[JOBS] Started {BACKGROUND_WORKERS} background worker(s)")
+
+
+async def stop_workers() -> None:
+    global _QUEUE
+
+    for task in _WORKERS:
+        task.cancel()
+    await asyncio.gather(*_WORKERS, return_exceptions=True)
+    _WORKERS.clear()
+    _QUEUE = None
+
+
+async def enqueue(name: str, job: Job) -> None:
+    """
+    Queue a job for the worker pool. When the queue is full this waits for
+    room (backpressure) instead of growing without bound. If the workers are
+    not running (e.g. outside the app lifespan) the job runs inline.
+    """
+    JOB_METRICS["enqueued"] += 1
+
+    if _QUEUE is None:
+        try:
+            await job()
+            JOB_METRICS["completed"] += 1
+        except Exception as exc:  # noqa: BLE001
+            JOB_METRICS["failed"] += 1
+            print(f"[JOBS] Inline job '{name}' failed: {exc}")
+        return
+
+    await _QUEUE.put((name, job))
+
+
+def background_stats() -> Dict[str, int]:
+    return {
+        **JOB_METRICS,
+        "queued": _QUEUE.qsize() if _QUEUE is not None else 0,
+        "workers": len(_WORKERS),
+    }
@@ -0,0 +1,90 @@
+# backend/bench/agent_acquisition.py
+# Agent acquisition time and per-session memory: the shared AgentExecutor
+# (get_absher_agent) with a SessionMemory per session, vs. building an
+# AgentExecutor with its own ChatOpenAI client for every session (the
+# previous per-session setup). No requests are sent: the client is only
+# constructed.
+#
+#   python bench/agent_acquisition.py [--sessions 200] [--turns 6]
+import argparse
+import contextlib
+import gc
+import io
+import time
+import tracemalloc
+
+import stubs
+
+parser = argparse.ArgumentParser(description="Agent acquisition time and per-session memory")
+parser.add_argument("--sessions", type=int, default=200)
+parser.add_argument("--turns", type=int, default=6, help="chat turns kept per session")
+args = parser.parse_args()
+
+stubs.install()
+
+from langchain_openai import ChatOpenAI  # noqa: E402
+
+from absher_agent import build_absher_agent, get_absher_agent  # noqa: E402
+from chat_memory import SessionMemory  # noqa: E402
+
+TURN = (
+    "متى تنتهي رخصة القيادة الخاصة بي؟",
+    "تنتهي رخصة القيادة بعد 30 يوماً، ويمكنك تجديدها عبر أبشر.",
+)
+
+
+def per_session_agent():
+    return build_absher_agent(ChatOpenAI(model="gpt-4.1-mini", temperature=0.2))
+
+
+def shared_agent():
+    return get_absher_agent()
+
+
+def session_memory() -> SessionMemory:
+    memory = SessionMemory()
+    for _ in range(args.turns):
+        memory.add_turn(*TURN)
+    return memory
+
+
+def measure(acquire) -> tuple:
+    """
+    (acquisition seconds per session, bytes per session) for sessions that
+    each hold the acquired agent and a memory with args.turns turns.
+    """
+    acquire()  # first call builds the shared agent; not part of the steady state
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+
+    sessions, seconds = [], []
+    for _ in range(args.sessions):
+        started = time.perf_counter()
+        agent = acquire()
+        seconds.append(time.perf_counter() - started)
+        sessions.append((agent, session_memory()))
+
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return seconds, grown / args.sessions
+
+
+rows = []
+with contextlib.redirect_stdout(io.StringIO()):
+    for label, acquire in (
+        ("agent per session", per_session_agent),
+        ("shared agent", shared_agent),
+    ):
+        seconds, per_session = measure(acquire)
+        rows.append([
+            label,
+            round(stubs.percentile(seconds, 50) * 1e6, 1),
+            round(stubs.percentile(seconds, 99) * 1e6, 1),
+            round(per_session / 1024, 1),
+        ])
+
+print(f"\n{args.sessions} sessions, {args.turns} chat turns each\n")
+stubs.print_table(["setup", "acquire p50 us", "acquire p99 us", "KiB/session"], rows)
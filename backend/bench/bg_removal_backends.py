@@ -0,0 +1,149 @@
+# backend/bench/bg_removal_backends.py
+# The ID photo pipeline (process_id_photo, result cache missed) with each
+# BG_REMOVAL_BACKEND: "local" (CPU segmentation in the image pool) vs.
+# "removebg" against a local stand-in that waits --removebg-latency seconds
+# per call. Reports latency one photo at a time, throughput with
+# --concurrency photos in flight, and image-pool CPU per photo (photos per
+# core-second).
+#
+#   python bench/bg_removal_backends.py [--photos 40] [--concurrency 8] [--removebg-latency 1.5]
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import os
+import time
+
+from PIL import Image
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+import stubs
+
+parser = argparse.ArgumentParser(description="Local vs remote background removal")
+parser.add_argument("--photos", type=int, default=40, help="photos per run")
+parser.add_argument("--concurrency", type=int, default=8, help="photos in flight for throughput")
+parser.add_argument("--removebg-latency", type=float, default=1.5, help="seconds per remove.bg call")
+args = parser.parse_args()
+
+
+# -------------------------------------------------------------------
+# Stand-in remove.bg
+# -------------------------------------------------------------------
+
+
+def _processed_png() -> bytes:
+    # What remove.bg sends back for a portrait: subject cropped with margin, on white
+    subject = Image.open(io.BytesIO(stubs.portrait_jpeg(0))).crop((150, 300, 1050, 1600))
+    out = io.BytesIO()
+    subject.save(out, "PNG")
+    return out.getvalue()
+
+
+PROCESSED_PNG = _processed_png()
+
+
+async def removebg(request: Request) -> Response:
+    form = await request.form()
+    await form["image_file"].read()
+    await asyncio.sleep(args.removebg_latency)
+    return Response(PROCESSED_PNG, media_type="image/png")
+
+
+removebg_url, removebg_server = stubs.serve_in_thread(
+    Starlette(routes=[Route("/v1.0/removebg", removebg, methods=["POST"])])
+)
+os.environ["REMOVEBG_API_URL"] = f"{removebg_url}/v1.0/removebg"
+stubs.install()
+
+import id_photo  # noqa: E402
+import store  # noqa: E402
+from config import IMAGE_WORKERS  # noqa: E402
+from ingest import IngestedUpload  # noqa: E402
+
+# Keep processed photos out of backend/uploads
+id_photo.UPLOAD_DIR = stubs.SCRATCH_DIR / "uploads"
+id_photo.PHOTO_CACHE_DIR = id_photo.UPLOAD_DIR / "cache"
+id_photo.PHOTO_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+
+# -------------------------------------------------------------------
+# Runs
+# -------------------------------------------------------------------
+
+# Distinct bytes per photo: no result-cache hits
+_next_seed = iter(range(1, 1_000_000))
+
+
+def upload() -> IngestedUpload:
+    data = stubs.portrait_jpeg(next(_next_seed))
+    return IngestedUpload(
+        io.BytesIO(data), "photo.jpg", "image/jpeg", "jpeg", len(data),
+        hashlib.sha256(data).hexdigest(),
+    )
+
+
+async def run_photos(user_id: str, count: int, concurrency: int) -> tuple:
+    """
+    (per-photo seconds, wall seconds, image-pool CPU seconds) for `count` photos.
+    """
+    uploads = [upload() for _ in range(count)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(item: IngestedUpload) -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            await id_photo.process_id_photo(user_id, item, "bench")
+            return time.perf_counter() - started
+
+    cpu_before = id_photo.PHOTO_PIPELINE_METRICS["cpu_seconds"]
+    started = time.perf_counter()
+    seconds = await asyncio.gather(*(one(item) for item in uploads))
+    wall = time.perf_counter() - started
+    return seconds, wall, id_photo.PHOTO_PIPELINE_METRICS["cpu_seconds"] - cpu_before
+
+
+async def run() -> list:
+    template = next(iter(store.TEMPLATE_USERS.values()))
+    user_id = store.create_session_user_from_template(template)
+
+    rows = []
+    for backend in ("local", "removebg"):
+        id_photo.BG_REMOVAL_BACKEND = backend
+        await run_photos(user_id, 2, 1)  # warm-up: pool threads, HTTP connection
+
+        serial, _, cpu = await run_photos(user_id, args.photos, 1)
+        _, wall, _ = await run_photos(user_id, args.photos, args.concurrency)
+
+        latency = stubs.summarize_ms(serial)
+        cpu_per_photo = cpu / args.photos
+        rows.append([
+            backend,
+            latency["p50_ms"],
+            latency["p99_ms"],
+            round(args.photos / wall, 2),
+            round(cpu_per_photo * 1000, 1),
+            round(1 / cpu_per_photo, 1),
+        ])
+    await id_photo.close_http_client()
+    return rows
+
+
+try:
+    with contextlib.redirect_stdout(io.StringIO()):  # session / upload logs
+        rows = asyncio.run(run())
+finally:
+    removebg_server.should_exit = True
+
+print(
+    f"\n{args.photos} photos per run (1200x1600 JPEG), {args.concurrency} in flight for "
+    f"throughput, remove.bg latency {args.removebg_latency}s, "
+    f"IMAGE_WORKERS={IMAGE_WORKERS}, {os.cpu_count()} core(s)\n"
+)
+stubs.print_table(
+    ["backend", "p50 ms", "p99 ms", "photos/s", "pool CPU ms/photo", "photos per core-s"],
+    rows,
+)
@@ -0,0 +1,94 @@
+# backend/bench/chat_prompt_tokens.py
+# Prompt tokens sent to the chat LLM per turn over a 30-turn conversation:
+# the token-budgeted memory (recent raw messages + rolling summary) vs. the
+# previous full-transcript buffer, which resent every earlier agent input
+# (with its service status / notifications preamble) and reply.
+#
+#   python bench/chat_prompt_tokens.py [--turns 30]
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+
+import stubs
+
+parser = argparse.ArgumentParser(description="Prompt tokens per chat turn")
+parser.add_argument("--turns", type=int, default=30)
+args = parser.parse_args()
+
+os.environ["FAQ_ROUTER_ENABLED"] = "false"  # every message goes to the agent
+stub = stubs.install()
+
+REPLY = (
+    "رخصة القيادة الخاصة بك سارية حتى نهاية الشهر القادم. يمكنك تجديدها عبر أبشر من "
+    "خدمات المرور ثم تجديد رخصة القيادة، بعد التأكد من سداد المخالفات وإجراء الفحص "
+    "الطبي. تُحسب الرسوم الرسمية تلقائياً من نظام أبشر. هل تحتاج مساعدة في خطوة معينة؟"
+)
+stub.chat_llm.respond = lambda prompt: REPLY
+stub.chat_llm.record = True
+
+import chat_memory  # noqa: E402
+import llm_chat  # noqa: E402
+import store  # noqa: E402
+from chat_memory import count_tokens  # noqa: E402
+from config import CHAT_HISTORY_MAX_TURNS, CHAT_HISTORY_TOKEN_BUDGET  # noqa: E402
+
+MESSAGES = [
+    "ما حالة خدماتي؟",
+    "متى تنتهي رخصة القيادة؟",
+    "ما هي شروط تجديد جواز السفر؟",
+    "كم مدة تجديد الهوية الوطنية؟",
+    "هل أحتاج صورة جديدة للهوية؟",
+    "How do I renew my vehicle registration?",
+]
+
+
+def prompt_tokens(messages) -> int:
+    return sum(count_tokens(str(m.content)) for m in messages)
+
+
+async def run() -> list:
+    template = next(iter(store.TEMPLATE_USERS.values()))
+    session_id = store.create_session_user_from_template(template)
+    user = store.USERS[session_id]
+    store.add_notification(session_id, "sms", "مساعد أبشر: تنتهي صلاحية رخصة القيادة خلال 3 أيام.")
+
+    async def load_notifications():
+        return store.get_user_notifications(session_id)
+
+    rows = []
+    transcript_tokens = 0  # what a full-transcript buffer would resend
+    for turn in range(1, args.turns + 1):
+        message = MESSAGES[(turn - 1) % len(MESSAGES)]
+        await llm_chat.handle_chat(user, session_id, message, load_notifications)
+        await asyncio.gather(*llm_chat._COMPACTION_TASKS)  # settle the summary
+
+        prompt = stub.chat_llm.prompts[-1]
+        system_tokens = count_tokens(str(prompt[0].content))
+        agent_input_tokens = count_tokens(str(prompt[-1].content))
+        memory = llm_chat._SESSION_MEMORY[session_id]
+        rows.append([
+            turn,
+            prompt_tokens(prompt),
+            len(memory.turns),
+            "yes" if memory.summary else "",
+            system_tokens + transcript_tokens + agent_input_tokens,
+        ])
+        transcript_tokens += agent_input_tokens + count_tokens(REPLY)
+    return rows
+
+
+with contextlib.redirect_stdout(io.StringIO()):  # agent / chat logs
+    rows = asyncio.run(run())
+
+tokenizer = "tiktoken o200k_base" if chat_memory._ENCODING else "~4 chars/token estimate"
+print(
+    f"\nCHAT_HISTORY_MAX_TURNS={CHAT_HISTORY_MAX_TURNS}, "
+    f"CHAT_HISTORY_TOKEN_BUDGET={CHAT_HISTORY_TOKEN_BUDGET}; "
+    f"message tokens ({tokenizer}), tool schemas not included\n"
+)
+stubs.print_table(
+    ["turn", "prompt tokens", "turns kept", "summary", "full transcript tokens"],
+    rows,
+)
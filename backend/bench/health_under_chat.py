@@ -0,0 +1,93 @@
+# backend/bench/health_under_chat.py
+# /health latency while 50 /chat requests are in flight against a slow
+# (stubbed) LLM: if the agent blocked the event loop, health checks would
+# queue behind every LLM round trip.
+#
+#   python bench/health_under_chat.py [--chats 50] [--llm-latency 1.0]
+import argparse
+import asyncio
+import time
+
+import httpx
+
+import stubs
+
+parser = argparse.ArgumentParser(description="/health latency under concurrent chats")
+parser.add_argument("--chats", type=int, default=50, help="concurrent /chat requests")
+parser.add_argument("--llm-latency", type=float, default=1.0, help="seconds per LLM call")
+parser.add_argument("--embed-latency", type=float, default=0.05, help="seconds per embedding call")
+parser.add_argument("--probe-interval", type=float, default=0.01, help="seconds between /health calls")
+args = parser.parse_args()
+
+stubs.install(llm_latency=args.llm_latency, embed_latency=args.embed_latency)
+
+import main  # noqa: E402
+from config import CHAT_MAX_CONCURRENCY  # noqa: E402
+
+# A request about the user's own services: always handled by the agent
+CHAT_MESSAGE = "ابي اعرف حالة خدماتي"
+
+
+async def probe_health(client: httpx.AsyncClient, until: asyncio.Event) -> list:
+    samples = []
+    while not until.is_set():
+        started = time.perf_counter()
+        response = await client.get("/health")
+        response.raise_for_status()
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(args.probe_interval)
+    return samples
+
+
+async def chat(client: httpx.AsyncClient, user_id: str) -> float:
+    started = time.perf_counter()
+    response = await client.post("/chat", json={"user_id": user_id, "message": CHAT_MESSAGE})
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def run(base_url: str) -> None:
+    limits = httpx.Limits(max_connections=args.chats + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        user_ids = []
+        for _ in range(args.chats):
+            response = await client.post(
+                "/login", json={"username": "abdullah", "password": "123456"}
+            )
+            user_ids.append(response.json()["user_id"])
+        # Let the post-login summaries (background jobs) finish first
+        await asyncio.sleep(3 * args.llm_latency + 1)
+
+        idle_done = asyncio.Event()
+        idle_probe = asyncio.create_task(probe_health(client, idle_done))
+        await asyncio.sleep(2)
+        idle_done.set()
+        idle = await idle_probe
+
+        busy_done = asyncio.Event()
+        busy_probe = asyncio.create_task(probe_health(client, busy_done))
+        started = time.perf_counter()
+        chat_seconds = await asyncio.gather(*(chat(client, u) for u in user_ids))
+        wall = time.perf_counter() - started
+        busy_done.set()
+        busy = await busy_probe
+
+    rows = []
+    for phase, samples in (("idle", idle), (f"{args.chats} chats in flight", busy)):
+        latency = stubs.summarize_ms(samples)
+        rows.append([phase, len(samples), latency["p50_ms"], latency["p99_ms"], latency["max_ms"]])
+    print(f"\nLLM latency {args.llm_latency}s per call, CHAT_MAX_CONCURRENCY={CHAT_MAX_CONCURRENCY}\n")
+    stubs.print_table(["/health", "requests", "p50 ms", "p99 ms", "max ms"], rows)
+
+    chat_latency = stubs.summarize_ms(chat_seconds)
+    print(
+        f"\n/chat: {len(chat_seconds)} requests in {wall:.2f}s, "
+        f"p50 {chat_latency['p50_ms']} ms, p99 {chat_latency['p99_ms']} ms"
+    )
+
+
+base_url, server = stubs.serve_in_thread(main.app)
+try:
+    asyncio.run(run(base_url))
+finally:
+    server.should_exit = True
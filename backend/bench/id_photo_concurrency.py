@@ -0,0 +1,170 @@
+# backend/bench/id_photo_concurrency.py
+# /upload/id-photo under concurrent uploads, against a local stand-in for
+# remove.bg that waits --removebg-latency seconds per call and returns a
+# processed PNG. Reports upload latency, throughput, how many uploads fell
+# back to a 202 job, and /health latency while the uploads run (the event
+# loop stays free while remove.bg and Pillow work).
+#
+#   python bench/id_photo_concurrency.py [--concurrency 1,10,50] [--uploads 100]
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+
+import httpx
+from PIL import Image
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+import stubs
+
+parser = argparse.ArgumentParser(description="ID photo upload latency under concurrency")
+parser.add_argument("--concurrency", default="1,10,50", help="uploads in flight")
+parser.add_argument("--uploads", type=int, default=100, help="uploads per concurrency level")
+parser.add_argument("--removebg-latency", type=float, default=1.5, help="seconds per remove.bg call")
+args = parser.parse_args()
+
+levels = [int(n) for n in args.concurrency.split(",")]
+
+
+# -------------------------------------------------------------------
+# Stand-in remove.bg
+# -------------------------------------------------------------------
+
+
+def _processed_png() -> bytes:
+    # What remove.bg sends back for a portrait: subject cropped with margin, on white
+    subject = Image.open(io.BytesIO(stubs.portrait_jpeg(0))).crop((150, 300, 1050, 1600))
+    out = io.BytesIO()
+    subject.save(out, "PNG")
+    return out.getvalue()
+
+
+PROCESSED_PNG = _processed_png()
+REMOVEBG_CALLS = {"count": 0}
+
+
+async def removebg(request: Request) -> Response:
+    form = await request.form()
+    await form["image_file"].read()
+    await asyncio.sleep(args.removebg_latency)
+    REMOVEBG_CALLS["count"] += 1
+    return Response(PROCESSED_PNG, media_type="image/png")
+
+
+removebg_url, removebg_server = stubs.serve_in_thread(
+    Starlette(routes=[Route("/v1.0/removebg", removebg, methods=["POST"])])
+)
+os.environ["REMOVEBG_API_URL"] = f"{removebg_url}/v1.0/removebg"
+os.environ["REMOVEBG_API_KEY"] = "bench"
+os.environ["BG_REMOVAL_BACKEND"] = "removebg"
+stubs.install()
+
+import id_photo  # noqa: E402
+import main  # noqa: E402
+from config import ID_PHOTO_SYNC_WAIT_SECONDS, IMAGE_WORKERS, REMOVEBG_MAX_CONNECTIONS  # noqa: E402
+
+# Keep processed photos out of backend/uploads
+id_photo.UPLOAD_DIR = stubs.SCRATCH_DIR / "uploads"
+id_photo.PHOTO_CACHE_DIR = id_photo.UPLOAD_DIR / "cache"
+id_photo.PHOTO_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+
+# -------------------------------------------------------------------
+# Load
+# -------------------------------------------------------------------
+
+# Distinct bytes per upload: no result-cache hits
+PHOTOS = [stubs.portrait_jpeg(seed) for seed in range(1, len(levels) * args.uploads + 1)]
+
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event, samples: list) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        (await client.get("/health")).raise_for_status()
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(0.05)
+
+
+async def measure(client: httpx.AsyncClient, user_id: str, photos: list, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = []
+
+    async def one(photo: bytes) -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(
+                "/upload/id-photo",
+                data={"user_id": user_id},
+                files={"file": ("photo.jpg", photo, "image/jpeg")},
+            )
+            response.raise_for_status()
+            if response.status_code == 202:
+                pending.append(response.json()["job_id"])
+            return time.perf_counter() - started
+
+    started = time.perf_counter()
+    seconds = await asyncio.gather(*(one(photo) for photo in photos))
+
+    # 202s: the photo is ready once its job is done
+    for job_id in pending:
+        while True:
+            job = (await client.get(f"/upload/id-photo/jobs/{job_id}")).json()
+            if job["status"] != "pending":
+                break
+            await asyncio.sleep(0.1)
+    return [seconds, len(pending), time.perf_counter() - started]
+
+
+async def run(base_url: str) -> list:
+    limits = httpx.Limits(max_connections=max(levels) + 5)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        login = await client.post("/login", json={"username": "abdullah", "password": "123456"})
+        user_id = login.json()["user_id"]
+
+        rows = []
+        for n, concurrency in enumerate(levels):
+            photos = PHOTOS[n * args.uploads:(n + 1) * args.uploads]
+            health, stop = [], asyncio.Event()
+            prober = asyncio.create_task(probe_health(client, stop, health))
+            seconds, accepted, wall = await measure(client, user_id, photos, concurrency)
+            stop.set()
+            await prober
+
+            latency = stubs.summarize_ms(seconds)
+            health_latency = stubs.summarize_ms(health)
+            rows.append([
+                concurrency,
+                latency["p50_ms"],
+                latency["p99_ms"],
+                accepted,
+                round(len(photos) / wall, 1),
+                health_latency["p50_ms"],
+                health_latency["p99_ms"],
+            ])
+        return rows
+
+
+base_url, server = stubs.serve_in_thread(main.app)
+try:
+    with contextlib.redirect_stdout(io.StringIO()):  # login / upload logs
+        rows = asyncio.run(run(base_url))
+finally:
+    server.should_exit = True
+    removebg_server.should_exit = True
+
+print(
+    f"\n{args.uploads} uploads per level, remove.bg latency {args.removebg_latency}s "
+    f"({REMOVEBG_CALLS['count']} calls), REMOVEBG_MAX_CONNECTIONS={REMOVEBG_MAX_CONNECTIONS}, "
+    f"IMAGE_WORKERS={IMAGE_WORKERS}, "
+    f"ID_PHOTO_SYNC_WAIT_SECONDS={ID_PHOTO_SYNC_WAIT_SECONDS}\n"
+)
+stubs.print_table(
+    ["in flight", "upload p50 ms", "upload p99 ms", "202 (job)", "photos/s",
+     "/health p50 ms", "/health p99 ms"],
+    rows,
+)
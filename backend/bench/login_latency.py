@@ -0,0 +1,106 @@
+# backend/bench/login_latency.py
+# /login p50/p99 with the post-login summary and proactive SMS queued to the
+# background workers (current) vs. awaited inline before responding (the
+# previous behaviour, reproduced by a bench-only route), with a stubbed LLM.
+#
+#   python bench/login_latency.py [--logins 200] [--concurrency 20] [--llm-latency 1.0]
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import HTTPException
+
+import stubs
+
+parser = argparse.ArgumentParser(description="Login latency, inline vs background follow-up")
+parser.add_argument("--logins", type=int, default=200)
+parser.add_argument("--concurrency", type=int, default=20, help="logins in flight")
+parser.add_argument("--llm-latency", type=float, default=1.0, help="seconds per LLM call")
+parser.add_argument("--embed-latency", type=float, default=0.05, help="seconds per embedding call")
+args = parser.parse_args()
+
+stubs.install(llm_latency=args.llm_latency, embed_latency=args.embed_latency)
+
+import main  # noqa: E402
+from background import background_stats  # noqa: E402
+from config import BACKGROUND_WORKERS  # noqa: E402
+from models import LoginRequest, LoginResponse  # noqa: E402
+
+
+@main.app.post("/bench/login-inline", response_model=LoginResponse)
+async def login_inline(payload: LoginRequest) -> LoginResponse:
+    template_user = main.get_user_by_username(payload.username)
+    if not template_user or template_user.password != payload.password:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    session_id = main.create_session_user_from_template(template_user)
+    await main._login_followup(session_id)
+    return LoginResponse(user_id=session_id, name=template_user.name)
+
+
+CREDENTIALS = {"username": "abdullah", "password": "123456"}
+
+
+async def measure(client: httpx.AsyncClient, path: str) -> list:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one() -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(path, json=CREDENTIALS)
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+    return await asyncio.gather(*(one() for _ in range(args.logins)))
+
+
+async def run(base_url: str) -> list:
+    limits = httpx.Limits(max_connections=args.concurrency + 5)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        # Warm-up: renders the cached SMS template variants
+        await client.post("/bench/login-inline", json=CREDENTIALS)
+
+        rows = []
+        for label, path in (
+            ("summary + SMS inline", "/bench/login-inline"),
+            ("summary + SMS queued", "/login"),
+        ):
+            started = time.perf_counter()
+            seconds = await measure(client, path)
+            wall = time.perf_counter() - started
+            # Summaries / SMS are in /notifications once the queue has drained
+            while not _jobs_drained():
+                await asyncio.sleep(0.05)
+            drained = time.perf_counter() - started
+
+            latency = stubs.summarize_ms(seconds)
+            rows.append([
+                label,
+                latency["p50_ms"],
+                latency["p99_ms"],
+                round(args.logins / wall, 1),
+                round(drained, 2),
+            ])
+        return rows
+
+
+def _jobs_drained() -> bool:
+    jobs = background_stats()
+    return jobs["enqueued"] == jobs["completed"] + jobs["failed"]
+
+
+base_url, server = stubs.serve_in_thread(main.app)
+try:
+    rows = asyncio.run(run(base_url))
+finally:
+    server.should_exit = True
+
+print(
+    f"\n{args.logins} logins, {args.concurrency} in flight, "
+    f"LLM latency {args.llm_latency}s per call, BACKGROUND_WORKERS={BACKGROUND_WORKERS}\n"
+)
+stubs.print_table(
+    ["/login", "p50 ms", "p99 ms", "logins/s", "all notifications ready s"],
+    rows,
+)
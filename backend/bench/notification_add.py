@@ -0,0 +1,69 @@
+# backend/bench/notification_add.py
+# Notification add latency as one user's history grows from 1 to 10k
+# notifications: incremental index (store.add_notification) vs. the full
+# rebuild the index used to do on every add
+# (store.rebuild_user_notification_index).
+#
+#   python bench/notification_add.py [--max 10000] [--embed-latency 0]
+import argparse
+import time
+
+import stubs
+
+parser = argparse.ArgumentParser(description="Notification add latency vs history size")
+parser.add_argument("--max", type=int, default=10_000, help="largest history size")
+parser.add_argument("--samples", type=int, default=20, help="adds timed per size")
+parser.add_argument("--embed-latency", type=float, default=0.0, help="seconds per embedding call")
+args = parser.parse_args()
+
+# Uncached, so the stub sees every text the store embeds
+stub = stubs.install(embed_latency=args.embed_latency, cache_embeddings=False).embeddings
+
+import store  # noqa: E402
+
+template = next(iter(store.TEMPLATE_USERS.values()))
+user_id = store.create_session_user_from_template(template)
+
+sizes = [1, 10, 100, 1_000, 10_000, 100_000]
+sizes = [n for n in sizes if n <= args.max]
+
+rows = []
+count = 0
+for size in sizes:
+    # Grow the history to `size` (not timed)
+    while count < size:
+        store.add_notification(user_id, "sms", f"filler notification {count}")
+        count += 1
+
+    # Each timed add is deleted again, so the history stays at `size`
+    add_seconds, add_texts = [], []
+    for i in range(args.samples):
+        texts_before = stub.texts
+        started = time.perf_counter()
+        notif = store.add_notification(user_id, "sms", f"timed notification {size}-{i}")
+        add_seconds.append(time.perf_counter() - started)
+        add_texts.append(stub.texts - texts_before)
+        store.remove_notification(user_id, notif.id)
+
+    texts_before = stub.texts
+    started = time.perf_counter()
+    store.rebuild_user_notification_index(user_id)
+    rebuild_seconds = time.perf_counter() - started
+    rebuild_texts = stub.texts - texts_before
+
+    latency = stubs.summarize_ms(add_seconds)
+    rows.append([
+        count,
+        latency["p50_ms"],
+        latency["p99_ms"],
+        max(add_texts),
+        round(rebuild_seconds * 1000, 2),
+        rebuild_texts,
+    ])
+
+print(f"\nEmbedding latency per call: {args.embed_latency}s (stub, {stubs.EMBEDDING_SIZE} dims)\n")
+stubs.print_table(
+    ["notifications", "add p50 ms", "add p99 ms", "texts embedded/add",
+     "full rebuild ms", "texts embedded/rebuild"],
+    rows,
+)
@@ -0,0 +1,105 @@
+# backend/bench/notification_repo.py
+# Per-user notification reads (list, lookup by id, "since" polling, top-k
+# hydration) as the number of live sessions grows to 100k, next to the
+# global scan the store used to do for the same list.
+#
+# Storage only: notifications go straight into the repository, without the
+# per-user vector index (see notification_add.py for that).
+#
+#   python bench/notification_repo.py [--sessions 100000] [--per-user 5]
+import argparse
+import contextlib
+import io
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import stubs
+
+parser = argparse.ArgumentParser(description="Notification reads vs number of sessions")
+parser.add_argument("--sessions", type=int, default=100_000, help="largest session count")
+parser.add_argument("--per-user", type=int, default=5, help="notifications per session")
+parser.add_argument("--reads", type=int, default=2_000, help="reads timed per size")
+args = parser.parse_args()
+
+os.environ.setdefault("MAX_LIVE_SESSIONS", str(args.sessions))
+stubs.install()
+
+import store  # noqa: E402
+from models import Notification  # noqa: E402
+
+template = next(iter(store.TEMPLATE_USERS.values()))
+started_at = datetime.now(timezone.utc)
+
+
+def add_sessions(count: int) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):  # one log line per login
+        for _ in range(count):
+            session_id = store.create_session_user_from_template(template)
+            for n in range(args.per_user):
+                store._store_notification(Notification(
+                    id=str(uuid.uuid4()),
+                    user_id=session_id,
+                    channel="sms",
+                    message=f"notification {n}",
+                    created_at=started_at + timedelta(seconds=n),
+                ))
+
+
+def time_per_read(read, users) -> float:
+    started = time.perf_counter()
+    for user_id in users:
+        read(user_id)
+    return (time.perf_counter() - started) / len(users) * 1e6
+
+
+def global_scan(user_id: str):
+    return sorted(
+        (n for n in store.NOTIFICATIONS_BY_ID.values() if n.user_id == user_id),
+        key=lambda n: n.created_at,
+    )
+
+
+def lookup_by_id(user_id: str):
+    return store.get_notification(store.USER_NOTIFICATIONS[user_id][0].id)
+
+
+def hydrate_top_k(user_id: str, k: int = 3):
+    ids = [n.id for n in store.USER_NOTIFICATIONS[user_id][-k:]]
+    return [store.get_notification(i) for i in ids]
+
+
+def poll_since(user_id: str):
+    shard = store.USER_NOTIFICATIONS[user_id]
+    return store.get_user_notifications_since(user_id, shard[len(shard) // 2].id)
+
+
+sizes = [n for n in (1_000, 10_000, 100_000, 1_000_000) if n <= args.sessions]
+rows = []
+for size in sizes:
+    started = time.perf_counter()
+    add_sessions(size - len(store.USERS))
+    setup_seconds = time.perf_counter() - started
+
+    users = random.sample(list(store.USERS), min(args.reads, len(store.USERS)))
+    # The old full scan is O(all notifications): time fewer of them
+    scan_users = users[: max(1, 20_000 // size)]
+    rows.append([
+        len(store.USERS),
+        len(store.NOTIFICATIONS_BY_ID),
+        round(time_per_read(store.get_user_notifications, users), 2),
+        round(time_per_read(lookup_by_id, users), 2),
+        round(time_per_read(poll_since, users), 2),
+        round(time_per_read(hydrate_top_k, users), 2),
+        round(time_per_read(global_scan, scan_users), 1),
+        round(setup_seconds, 1),
+    ])
+
+print(f"\n{args.per_user} notifications per session; times are microseconds per read\n")
+stubs.print_table(
+    ["sessions", "notifications", "list us", "by id us", "since us", "top-3 hydrate us",
+     "global scan us", "setup s"],
+    rows,
+)
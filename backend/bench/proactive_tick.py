@@ -0,0 +1,90 @@
+# backend/bench/proactive_tick.py
+# Cost of one scheduler tick (run_proactive_batch from the expiry timeline,
+# SMS included) as the population grows and as the number of due services
+# grows, next to the full scan of every user it replaces.
+#
+#   python bench/proactive_tick.py [--populations 1000,10000,100000] [--due 0,100,1000]
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import stubs
+
+parser = argparse.ArgumentParser(description="Proactive tick cost vs population and due items")
+parser.add_argument("--populations", default="1000,10000,100000")
+parser.add_argument("--due", default="0,100,1000", help="services due per tick")
+parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per LLM call")
+args = parser.parse_args()
+
+populations = [int(n) for n in args.populations.split(",")]
+due_counts = [int(n) for n in args.due.split(",")]
+
+max_sessions = max(populations) + len(populations) * sum(due_counts)
+os.environ.setdefault("MAX_LIVE_SESSIONS", str(max_sessions))
+stubs.install(llm_latency=args.llm_latency)
+
+import proactive  # noqa: E402
+import store  # noqa: E402
+from models import ServicesExpiry  # noqa: E402
+
+now = datetime.now(timezone.utc)
+base = next(iter(store.TEMPLATE_USERS.values()))
+# Every service valid for a year / the driver license expiring in two days
+not_due = base.model_copy(update={"services": ServicesExpiry(
+    driver_license_expire_date=now + timedelta(days=365),
+    vehicle_registration_expire_date=now + timedelta(days=400),
+    passport_expire_date=now + timedelta(days=500),
+    national_id_expire_date=now + timedelta(days=600),
+)})
+due = base.model_copy(update={"services": ServicesExpiry(
+    driver_license_expire_date=now + timedelta(days=2, hours=12),
+    national_id_expire_date=now + timedelta(days=600),
+)})
+
+
+def add_sessions(template, count: int) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):  # one log line per login
+        for _ in range(count):
+            store.create_session_user_from_template(template)
+
+
+async def run() -> list:
+    rows = []
+    for population in populations:
+        add_sessions(not_due, population - len(store.USERS))
+        for due_count in due_counts:
+            add_sessions(due, due_count)
+
+            started = time.perf_counter()
+            _, scanned = await proactive._due_from_scan(
+                list(store.USERS), datetime.now(timezone.utc)
+            )
+            scan_seconds = time.perf_counter() - started
+
+            with contextlib.redirect_stdout(io.StringIO()):  # one log line per SMS
+                started = time.perf_counter()
+                tick = await proactive.run_proactive_batch()
+                tick_seconds = time.perf_counter() - started
+
+            rows.append([
+                len(store.USERS),
+                tick["due_services"],
+                tick["sms_generated"],
+                round(tick_seconds * 1000, 2),
+                round(scan_seconds * 1000, 2),
+                scanned,
+            ])
+    return rows
+
+
+rows = asyncio.run(run())
+print(f"\nLLM latency {args.llm_latency}s per call (SMS templates are cached per variant)\n")
+stubs.print_table(
+    ["sessions", "due services", "SMS sent", "tick ms", "full scan ms (detection only)",
+     "users scanned"],
+    rows,
+)
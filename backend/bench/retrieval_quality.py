@@ -0,0 +1,151 @@
+# backend/bench/retrieval_quality.py
+# Retrieval quality and latency of the Absher knowledge search over a fixed
+# question set (Arabic / English, exact error strings, colloquial phrasing),
+# each labelled with the knowledge section(s) that answer it:
+# vector only (the previous search_absher_docs), BM25 only, hybrid (BM25 +
+# vector, reciprocal rank fusion) and hybrid with the lexical-only fast path
+# (the current retrieve_absher_chunks). Reports hit@1 / hit@k, the share of
+# queries that skipped the embedding call, and per-query latency.
+#
+# With the default stub embeddings the vector ranking is meaningless, so only
+# the BM25 columns and the latencies are representative; --real-embeddings
+# uses text-embedding-3-small (needs OPENAI_API_KEY, ~40 short requests).
+#
+#   python bench/retrieval_quality.py [--k 4] [--embed-latency 0.2] [--real-embeddings]
+import argparse
+import contextlib
+import io
+import time
+
+import stubs
+
+parser = argparse.ArgumentParser(description="Retrieval quality and latency per search mode")
+parser.add_argument("--k", type=int, default=4, help="chunks returned per query")
+parser.add_argument("--embed-latency", type=float, default=0.2, help="seconds per stub embedding call")
+parser.add_argument("--real-embeddings", action="store_true", help="OpenAI embeddings instead of the stub")
+args = parser.parse_args()
+
+stubs.install(embed_latency=args.embed_latency, cache_embeddings=False)
+
+import absher_rag  # noqa: E402
+from config import EMBEDDING_MODEL  # noqa: E402
+
+if args.real_embeddings:
+    from langchain_openai import OpenAIEmbeddings
+
+    absher_rag.embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+
+# question -> section ids that answer it
+QUESTIONS = [
+    ("كيف أجدد رخصة القيادة؟", ("driver_license_renewal",)),
+    ("ابي اجدد رخصتي", ("driver_license_renewal",)),
+    ("عفواً، لا يمكن التجديد لعدم توفر التقرير الطبي", ("driver_license_renewal", "common_error_codes")),
+    ("ERR_LIC_VALIDITY_OVER", ("common_error_codes",)),
+    ("Who can renew a driver license on behalf of someone else?", ("driver_license_roles",)),
+    ("تجديد الاستمارة", ("vehicle_registration_istimara_renewal",)),
+    ("How do I check my traffic violations?", ("traffic_violations_inquiry",)),
+    ("الاستعلام عن المخالفات المرورية", ("traffic_violations_inquiry",)),
+    ("هل تأمين سيارتي ساري؟", ("vehicle_insurance_inquiry",)),
+    ("مبايعة المركبات إلكترونياً", ("vehicle_ownership_transfer",)),
+    ("الفحص الدوري منتهي الصلاحية", ("vehicle_ownership_transfer", "common_error_codes")),
+    ("Can someone else drive my car in another GCC country?", ("vehicle_authorization_tafweed",)),
+    ("تفويض قيادة المركبة", ("vehicle_authorization_tafweed",)),
+    ("How do I know if my vehicle is seized?", ("vehicle_details_inquiry",)),
+    ("تأشيرة خروج وعودة", ("exit_reentry_visa",)),
+    ("صلاحية الجواز أقل من المدة المطلوبة", ("exit_reentry_visa", "common_error_codes")),
+    ("لا يوجد تأمين طبي ساري في مجلس الضمان", ("iqama_renewal", "common_error_codes")),
+    ("تجديد الاقامه", ("iqama_renewal",)),
+    ("travel permit for my son under 21", ("travel_permits_dependents",)),
+    ("تجديد جواز السفر", ("passport_issuance_renewal",)),
+    ("Is the passport valid for 5 or 10 years?", ("passport_issuance_renewal",)),
+    ("update the passport of my domestic worker", ("passport_dependents_domestic_workers",)),
+    ("تجديد الهوية الوطنية", ("national_id_renewal",)),
+    ("What photo do I need for the national ID renewal?", ("national_id_renewal",)),
+    ("سجل الأسرة للأمهات", ("family_registry_mothers",)),
+    ("I just got married, how do I get a family registry?", ("family_registry_newlyweds",)),
+    ("تسجيل المواليد", ("birth_registration",)),
+    ("فقدت هويتي", ("lost_id_reporting",)),
+    ("نقل الكفالة", ("transfer_of_services_sponsorship",)),
+    ("العامل لم يوافق على الطلب في حسابه", ("transfer_of_services_sponsorship", "common_error_codes")),
+    ("check my Absher prepaid balance", ("absher_payment_balance",)),
+    ("العنوان الوطني واصل", ("national_address_registration",)),
+    ("deliver my passport by Saudi Post", ("document_delivery_spl",)),
+    ("exceptional travel permit for medical treatment", ("exceptional_travel_permits",)),
+    ("military travel permit status", ("military_travel_permits",)),
+    ("Is Absher secure? Nafath and two-factor authentication", ("absher_security_features",)),
+    ("Does the Absher app have dark mode?", ("absher_mobile_apps",)),
+    ("How do I contact Absher customer support?", ("absher_customer_support",)),
+]
+
+
+# -------------------------------------------------------------------
+# Search modes: query -> (ranked chunks, embedding calls made)
+# -------------------------------------------------------------------
+
+
+def vector_only(index, query: str):
+    embedding = absher_rag.embeddings.embed_query(query)
+    return index.vector.similarity_search_by_vector(embedding, k=args.k), 1
+
+
+def lexical_only(index, query: str):
+    return [index.chunks[i] for i, _ in index.bm25.search(query, k=args.k)], 0
+
+
+def hybrid(index, query: str):
+    embedding = absher_rag.embeddings.embed_query(query)
+    return absher_rag.retrieve_absher_chunks(query, args.k, query_embedding=embedding, index=index), 1
+
+
+def hybrid_fast_path(index, query: str):
+    before = absher_rag.RAG_METRICS["hybrid"]
+    docs = absher_rag.retrieve_absher_chunks(query, args.k, index=index)
+    return docs, absher_rag.RAG_METRICS["hybrid"] - before
+
+
+MODES = [
+    ("vector only (previous)", vector_only),
+    ("BM25 only", lexical_only),
+    ("hybrid RRF", hybrid),
+    ("hybrid + lexical fast path", hybrid_fast_path),
+]
+
+
+def evaluate(index, search) -> list:
+    hit1 = hitk = embedding_calls = 0
+    seconds = []
+    for query, expected in QUESTIONS:
+        started = time.perf_counter()
+        docs, calls = search(index, query)
+        seconds.append(time.perf_counter() - started)
+
+        sections = [doc.metadata.get("id") for doc in docs]
+        hit1 += bool(sections) and sections[0] in expected
+        hitk += any(section in expected for section in sections)
+        embedding_calls += calls
+
+    latency = stubs.summarize_ms(seconds)
+    n = len(QUESTIONS)
+    return [
+        round(hit1 / n, 2),
+        round(hitk / n, 2),
+        f"{1 - embedding_calls / n:.0%}",
+        round(sum(seconds) / n * 1000, 2),
+        latency["p50_ms"],
+        latency["p99_ms"],
+    ]
+
+
+with contextlib.redirect_stdout(io.StringIO()):  # index build logs
+    index = absher_rag.get_active_index()
+
+rows = [[label, *evaluate(index, search)] for label, search in MODES]
+
+embedder = EMBEDDING_MODEL if args.real_embeddings else (
+    f"stub embeddings, {args.embed_latency}s per call (vector ranking not meaningful)"
+)
+print(f"\n{len(QUESTIONS)} questions, {len(index.chunks)} chunks, k={args.k}, {embedder}\n")
+stubs.print_table(
+    ["mode", "hit@1", f"hit@{args.k}", "embedding calls skipped", "mean ms", "p50 ms", "p99 ms"],
+    rows,
+)
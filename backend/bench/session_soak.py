@@ -0,0 +1,65 @@
+# backend/bench/session_soak.py
+# RSS over 100k logins with the live-session cap: each login creates a
+# session with two notifications (vector-indexed), a media record and two
+# chat turns, like a login followed by a short chat. Once the cap is reached
+# older sessions are evicted, so RSS should level off.
+#
+#   python bench/session_soak.py [--logins 100000] [--max-live 1000]
+import argparse
+import contextlib
+import gc
+import io
+import os
+import time
+
+import stubs
+
+parser = argparse.ArgumentParser(description="RSS over many logins with session eviction")
+parser.add_argument("--logins", type=int, default=100_000)
+parser.add_argument("--max-live", type=int, default=1_000, help="MAX_LIVE_SESSIONS")
+parser.add_argument("--report-every", type=int, default=10_000)
+args = parser.parse_args()
+
+os.environ["MAX_LIVE_SESSIONS"] = str(args.max_live)
+stubs.install(cache_embeddings=False)
+
+import llm_chat  # noqa: E402
+import store  # noqa: E402
+
+template = next(iter(store.TEMPLATE_USERS.values()))
+
+
+def login(n: int) -> None:
+    session_id = store.create_session_user_from_template(template)
+    store.add_notification(session_id, "in_app", f"ملخص تسجيل الدخول رقم {n}: جميع خدماتك سارية.")
+    store.add_notification(session_id, "sms", f"مساعد أبشر: تنتهي صلاحية رخصة القيادة ({n}).")
+    store.add_user_media(session_id, "id_photo", f"{session_id}.jpg")
+    llm_chat._remember_turn(session_id, "ما حالة خدماتي؟", "جميع خدماتك سارية.")
+    llm_chat._remember_turn(session_id, "متى تنتهي رخصتي؟", "تنتهي بعد 30 يوماً.")
+
+
+rows = []
+started = time.perf_counter()
+for n in range(1, args.logins + 1):
+    with contextlib.redirect_stdout(io.StringIO()):  # one log line per login
+        login(n)
+    if n % args.report_every == 0 or n == 1:
+        gc.collect()
+        stats = store.session_stats()
+        rows.append([
+            n,
+            stats["live_sessions"],
+            stats["evicted_sessions"],
+            len(store.NOTIFICATIONS_BY_ID),
+            len(llm_chat._SESSION_MEMORY),
+            round(stats["estimated_bytes_per_session"] / 1024, 1),
+            stubs.rss_mb(),
+            round(time.perf_counter() - started, 1),
+        ])
+
+print(f"\nMAX_LIVE_SESSIONS={args.max_live}\n")
+stubs.print_table(
+    ["logins", "live sessions", "evicted", "notifications", "chat memories",
+     "KiB/session", "RSS MiB", "elapsed s"],
+    rows,
+)
@@ -0,0 +1,295 @@
+# backend/bench/stubs.py
+# Shared setup for the benchmark scripts in this folder: puts backend/ on
+# sys.path and swaps the OpenAI models in config for local stubs with a
+# configurable latency, so the numbers measure this code (and how it waits
+# on the models), offline and without an API key.
+#
+# install() must run BEFORE any other backend module is imported: they bind
+# config.chat_llm / notification_llm / embeddings at import time.
+import asyncio
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Never sent anywhere: every model is stubbed
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("PROACTIVE_SCHEDULER_ENABLED", "false")
+os.environ.setdefault("FAQ_AUTOBUILD", "false")
+os.environ.setdefault("SMS_TEMPLATE_PREWARM", "false")
+
+EMBEDDING_SIZE = 1536  # text-embedding-3-small
+
+# Scratch directory for files the backend writes (FAISS index, uploads)
+SCRATCH_DIR = Path(tempfile.mkdtemp(prefix="absher-bench-"))
+
+
+# -------------------------------------------------------------------
+# Model stubs
+# -------------------------------------------------------------------
+
+
+class StubEmbeddings(Embeddings):
+    """
+    Deterministic unit vectors (same text -> same vector), with a fixed
+    latency per call standing in for the API round trip. Counts calls and
+    embedded texts.
+    """
+
+    def __init__(self, latency: float = 0.0, size: int = EMBEDDING_SIZE) -> None:
+        self.latency = latency
+        self.size = size
+        self.calls = 0
+        self.texts = 0
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.size).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.texts += len(texts)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+def default_reply(prompt: str) -> str:
+    """
+    A well-formed answer for each prompt the backend sends.
+    """
+    if "IN_APP:" in prompt:  # login summary
+        return (
+            "IN_APP:\nمرحباً، جميع خدماتك سارية حالياً ولا يوجد ما يتطلب إجراء.\n\n"
+            "SMS:\nAbsher Assistant: everything is fine at the moment."
+        )
+    if "{user_name}" in prompt:  # proactive SMS template
+        return "مساعد أبشر: {user_name}، تنتهي صلاحية خدمتك قريباً. سجّل الدخول إلى أبشر للتجديد."
+    if "Return ONLY a JSON object" in prompt:  # FAQ generation
+        return json.dumps({
+            "questions": {"ar": ["ما هي الخطوات؟"], "en": ["What are the steps?"]},
+            "answer": {"ar": "الخطوات في أبشر.", "en": "The steps are in Absher."},
+        })
+    return "يمكنك إتمام ذلك عبر منصة أبشر."
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Chat model answering after a fixed latency (non-blocking in the async
+    path, like the OpenAI client). `respond` maps the last message text to
+    the reply; the agent sees it as a final answer (no function call).
+    Prompts are kept in `prompts` when `record` is set.
+    """
+
+    latency: float = 0.0
+    respond: Callable[[str], str] = default_reply
+    record: bool = False
+    calls: int = 0
+    prompts: List[List[BaseMessage]] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "bench-stub"
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        self.calls += 1
+        if self.record:
+            self.prompts.append(list(messages))
+        reply = self.respond(str(messages[-1].content))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply))])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+
+class Stubs:
+    """
+    The installed stubs (see install()).
+    """
+
+    def __init__(
+        self,
+        chat_llm: StubChatModel,
+        notification_llm: StubChatModel,
+        embeddings: StubEmbeddings,
+    ) -> None:
+        self.chat_llm = chat_llm
+        self.notification_llm = notification_llm
+        self.embeddings = embeddings
+
+
+def install(
+    llm_latency: float = 0.0,
+    embed_latency: float = 0.0,
+    cache_embeddings: bool = True,
+) -> Stubs:
+    """
+    Replace the models in config with stubs and point the knowledge index
+    at SCRATCH_DIR. With cache_embeddings=False every text reaches the
+    stub (no CachedEmbeddings in front), to count real embedding work.
+    """
+    import config
+    from embedding_cache import CachedEmbeddings
+
+    stubs = Stubs(
+        chat_llm=StubChatModel(latency=llm_latency),
+        notification_llm=StubChatModel(latency=llm_latency),
+        embeddings=StubEmbeddings(latency=embed_latency),
+    )
+    config.chat_llm = stubs.chat_llm
+    config.notification_llm = stubs.notification_llm
+    config.embeddings = (
+        CachedEmbeddings(stubs.embeddings, model="bench-stub")
+        if cache_embeddings
+        else stubs.embeddings
+    )
+
+    import absher_rag
+
+    absher_rag.INDEX_DIR = SCRATCH_DIR / "faiss_index"
+    absher_rag.MANIFEST_PATH = absher_rag.INDEX_DIR / "manifest.json"
+    return stubs
+
+
+# -------------------------------------------------------------------
+# Test images
+# -------------------------------------------------------------------
+
+
+def portrait_jpeg(seed: int, size: Tuple[int, int] = (1200, 1600), quality: int = 90) -> bytes:
+    """
+    A synthetic ID-style photo: a dark head and shoulders on a plain,
+    slightly uneven light wall, with sensor-like noise. Different seeds
+    give different bytes (no result-cache hits).
+    """
+    from PIL import Image
+
+    width, height = size
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+
+    wall = 200 + 25 * (y / height) + rng.uniform(-10, 10)
+    pixels = np.repeat(wall[..., None], 3, axis=2)
+
+    cx = width / 2 + rng.uniform(-0.05, 0.05) * width
+    head = ((x - cx) / (0.17 * width)) ** 2 + ((y - 0.38 * height) / (0.17 * height)) ** 2 <= 1
+    shoulders = ((x - cx) / (0.42 * width)) ** 2 + ((y - height) / (0.3 * height)) ** 2 <= 1
+    pixels[head] = (170, 125, 100)
+    pixels[shoulders] = (40, 45, 60)
+
+    pixels += rng.normal(0, 4, pixels.shape)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=quality)
+    return out.getvalue()
+
+
+# -------------------------------------------------------------------
+# Measuring / reporting
+# -------------------------------------------------------------------
+
+
+def percentile(samples: Sequence[float], p: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return float("nan")
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def summarize_ms(samples: Sequence[float]) -> Dict[str, float]:
+    """
+    p50 / p99 / max of latencies given in seconds, in milliseconds.
+    """
+    return {
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2) if samples else float("nan"),
+    }
+
+
+def print_table(headers: Sequence[str], rows: Sequence[Sequence[Any]]) -> None:
+    cells = [[str(h) for h in headers]] + [[str(c) for c in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    for n, row in enumerate(cells):
+        print("  ".join(c.rjust(w) for c, w in zip(row, widths)))
+        if n == 0:
+            print("  ".join("-" * w for w in widths))
+
+
+def _proc_status_kb(field: str, pid: str = "self") -> int:
+    for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+        if line.startswith(field + ":"):
+            return int(line.split()[1])
+    raise RuntimeError(f"{field} not in /proc/{pid}/status (Linux only)")
+
+
+def rss_mb(pid: str = "self") -> float:
+    return round(_proc_status_kb("VmRSS", pid) / 1024, 1)
+
+
+def peak_rss_mb(pid: str = "self") -> float:
+    return round(_proc_status_kb("VmHWM", pid) / 1024, 1)
+
+
+def serve_in_thread(app: Any) -> Tuple[str, Any]:
+    """
+    Run an ASGI app with uvicorn on a free local port in a daemon thread
+    (startup / shutdown events included). Returns (base_url, server);
+    set server.should_exit = True to stop it.
+    """
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    return f"http://127.0.0.1:{port}", server
@@ -0,0 +1,172 @@
+# backend/bench/tts_first_byte.py
+# Time to first audio byte (and to the last one) from /voice/tts, which
+# relays the speech stream as it arrives, vs. reading the whole MP3 before
+# responding (the previous behaviour, reproduced by a bench-only route).
+# The OpenAI speech API is a fake audio server in a subprocess
+# (OPENAI_BASE_URL) sending --chunks chunks of 4 KB, --chunk-interval apart.
+#
+#   python bench/tts_first_byte.py [--requests 40] [--concurrency 1,20]
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+import stubs
+
+parser = argparse.ArgumentParser(description="TTS time to first audio byte, streamed vs buffered")
+parser.add_argument("--requests", type=int, default=40, help="requests per concurrency level")
+parser.add_argument("--concurrency", default="1,20", help="requests in flight")
+parser.add_argument("--chunks", type=int, default=20, help="audio chunks per response")
+parser.add_argument("--chunk-interval", type=float, default=0.05, help="seconds between chunks")
+parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+args = parser.parse_args()
+
+CHUNK = b"\xff\xfb\x90\x64" + bytes(4092)  # MP3 frame header + padding, 4 KB
+
+
+# -------------------------------------------------------------------
+# Fake audio server (subprocess)
+# -------------------------------------------------------------------
+
+
+def serve() -> None:
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import StreamingResponse
+    from starlette.routing import Route
+
+    async def speech(request: Request) -> StreamingResponse:
+        await request.json()
+
+        async def chunks():
+            for _ in range(args.chunks):
+                await asyncio.sleep(args.chunk_interval)
+                yield CHUNK
+
+        return StreamingResponse(chunks(), media_type="audio/mpeg")
+
+    base_url, _ = stubs.serve_in_thread(
+        Starlette(routes=[Route("/v1/audio/speech", speech, methods=["POST"])])
+    )
+    print("BENCH_URL", base_url, flush=True)
+    while True:
+        time.sleep(3600)
+
+
+if args.serve:
+    serve()
+
+
+def start_audio_server() -> tuple:
+    process = subprocess.Popen(
+        [sys.executable, __file__, "--serve", "--chunks", str(args.chunks),
+         "--chunk-interval", str(args.chunk_interval)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    for line in process.stdout:
+        if line.startswith("BENCH_URL "):
+            return process, line.split()[1]
+    raise RuntimeError("fake audio server did not start")
+
+
+audio_server, audio_url = start_audio_server()
+os.environ["OPENAI_BASE_URL"] = f"{audio_url}/v1"  # read by config.audio_client
+stubs.install()
+
+from fastapi import HTTPException, Response  # noqa: E402
+
+import main  # noqa: E402
+from config import AUDIO_MAX_CONNECTIONS  # noqa: E402
+from models import TextToSpeechRequest  # noqa: E402
+
+
+@main.app.post("/bench/tts-buffered")
+async def tts_buffered(payload: TextToSpeechRequest) -> Response:
+    try:
+        speech = await main.audio_client.audio.speech.create(
+            model="gpt-4o-mini-tts",
+            voice="alloy",
+            input=payload.text,
+            response_format="mp3",
+        )
+    except Exception as exc:  # noqa: BLE001
+        raise HTTPException(status_code=500, detail="TTS failed") from exc
+    return Response(content=speech.content, media_type="audio/mpeg")
+
+
+# -------------------------------------------------------------------
+# Load
+# -------------------------------------------------------------------
+
+TEXT = {"text": "تنتهي صلاحية رخصة القيادة الخاصة بك خلال ثلاثة أيام."}
+
+
+async def measure(client: httpx.AsyncClient, path: str, concurrency: int) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> tuple:
+        async with semaphore:
+            started = time.perf_counter()
+            first = None
+            received = 0
+            async with client.stream("POST", path, json=TEXT) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes():
+                    if first is None and chunk:
+                        first = time.perf_counter() - started
+                    received += len(chunk)
+            if received != len(CHUNK) * args.chunks:
+                raise RuntimeError(f"{path}: got {received} bytes")
+            return first, time.perf_counter() - started
+
+    results = await asyncio.gather(*(one() for _ in range(args.requests)))
+    return [first for first, _ in results], [last for _, last in results]
+
+
+async def run(base_url: str) -> list:
+    levels = [int(n) for n in args.concurrency.split(",")]
+    limits = httpx.Limits(max_connections=max(levels) + 5)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        await client.post("/voice/tts", json=TEXT)  # warm-up: upstream connection
+
+        rows = []
+        for concurrency in levels:
+            for label, path in (("buffered", "/bench/tts-buffered"), ("streamed", "/voice/tts")):
+                first, last = await measure(client, path, concurrency)
+                first_ms = stubs.summarize_ms(first)
+                last_ms = stubs.summarize_ms(last)
+                rows.append([
+                    concurrency,
+                    label,
+                    first_ms["p50_ms"],
+                    first_ms["p99_ms"],
+                    last_ms["p50_ms"],
+                ])
+        return rows
+
+
+base_url, server = stubs.serve_in_thread(main.app)
+try:
+    with contextlib.redirect_stdout(io.StringIO()):  # voice logs
+        rows = asyncio.run(run(base_url))
+finally:
+    server.should_exit = True
+    audio_server.kill()
+    audio_server.wait()
+
+print(
+    f"\n{args.requests} requests per level, fake speech API: {args.chunks} x 4 KB chunks "
+    f"{args.chunk_interval}s apart, AUDIO_MAX_CONNECTIONS={AUDIO_MAX_CONNECTIONS}\n"
+)
+stubs.print_table(
+    ["in flight", "response", "first byte p50 ms", "first byte p99 ms", "last byte p50 ms"],
+    rows,
+)
@@ -0,0 +1,158 @@
+# backend/bench/upload_memory.py
+# Server peak RSS (VmHWM) while 100 concurrent 20 MB uploads hit
+# /voice/transcribe: the upload is checked and hashed in place by
+# ingest_upload (the multipart parser spools it to disk past 1 MB), vs.
+# `await audio.read()` before any check (the previous behaviour, reproduced
+# by a bench-only route), plus 30 MB uploads refused by the size limit and
+# 20 MB uploads refused by the header check, both while they arrive.
+# Each case runs in a fresh server subprocess; transcription is a stub that
+# reads the file in chunks (the OpenAI SDK's own request building is not
+# included).
+#
+#   python bench/upload_memory.py [--uploads 100] [--size-mb 20]
+import argparse
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+
+import stubs
+
+parser = argparse.ArgumentParser(description="Server peak RSS under concurrent large uploads")
+parser.add_argument("--uploads", type=int, default=100, help="uploads, all in flight at once")
+parser.add_argument("--size-mb", type=int, default=20)
+parser.add_argument("--over-limit-mb", type=int, default=30, help="over AUDIO_MAX_BYTES (25 MB)")
+parser.add_argument("--transcribe-latency", type=float, default=0.5, help="seconds per transcription")
+parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+args = parser.parse_args()
+
+
+# -------------------------------------------------------------------
+# Server (subprocess)
+# -------------------------------------------------------------------
+
+
+def serve() -> None:
+    stubs.install()
+
+    from fastapi import File, HTTPException, UploadFile
+
+    import main
+    from ingest import CHUNK_SIZE
+
+    async def create(model: str, file, response_format: str):
+        _, f = file
+        while f.read(CHUNK_SIZE):
+            pass
+        await asyncio.sleep(args.transcribe_latency)
+        return SimpleNamespace(text="مرحبا")
+
+    main.audio_client = SimpleNamespace(
+        audio=SimpleNamespace(transcriptions=SimpleNamespace(create=create))
+    )
+
+    @main.app.post("/bench/transcribe-read")
+    async def transcribe_read(audio: UploadFile = File(...)):
+        data = await audio.read()
+        if not data:
+            raise HTTPException(status_code=400, detail="Empty audio file")
+
+        transcript = await main.audio_client.audio.transcriptions.create(
+            model="gpt-4o-mini-transcribe",
+            file=(audio.filename or "recording.webm", io.BytesIO(data)),
+            response_format="json",
+        )
+        return {"text": transcript.text}
+
+    base_url, _ = stubs.serve_in_thread(main.app)
+    print("BENCH_URL", base_url, flush=True)
+    while True:
+        time.sleep(3600)
+
+
+if args.serve:
+    serve()
+
+
+# -------------------------------------------------------------------
+# Load
+# -------------------------------------------------------------------
+
+
+def start_server() -> tuple:
+    process = subprocess.Popen(
+        [sys.executable, __file__, "--serve", "--transcribe-latency", str(args.transcribe_latency)],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    for line in process.stdout:
+        if line.startswith("BENCH_URL "):
+            return process, line.split()[1]
+    raise RuntimeError("bench server did not start")
+
+
+def audio_payload(size_mb: int, header: bytes = b"OggS") -> bytes:
+    # Ogg header (or not), then incompressible bytes
+    return header + os.urandom(size_mb * 1024 * 1024 - len(header))
+
+
+async def upload_all(base_url: str, path: str, payload: bytes) -> tuple:
+    limits = httpx.Limits(max_connections=args.uploads)
+    async with httpx.AsyncClient(base_url=base_url, timeout=600, limits=limits) as client:
+
+        async def one() -> int:
+            response = await client.post(
+                path, files={"audio": ("voice.ogg", payload, "audio/ogg")}
+            )
+            return response.status_code
+
+        started = time.perf_counter()
+        statuses = await asyncio.gather(*(one() for _ in range(args.uploads)))
+        return statuses, time.perf_counter() - started
+
+
+def run_case(label: str, path: str, payload: bytes) -> list:
+    process, base_url = start_server()
+    try:
+        idle = stubs.peak_rss_mb(process.pid)
+        statuses, wall = asyncio.run(upload_all(base_url, path, payload))
+        peak = stubs.peak_rss_mb(process.pid)
+    finally:
+        process.kill()
+        process.wait()
+
+    return [
+        label,
+        len(payload) // (1024 * 1024),
+        sum(1 for status in statuses if status == 200),
+        sum(1 for status in statuses if status == 400),
+        sum(1 for status in statuses if status == 413),
+        idle,
+        peak,
+        round(peak - idle, 1),
+        round(wall, 1),
+    ]
+
+
+payload = audio_payload(args.size_mb)
+rows = [
+    run_case("ingest_upload", "/voice/transcribe", payload),
+    run_case("await audio.read()", "/bench/transcribe-read", payload),
+]
+del payload
+rows.append(run_case("ingest_upload, over limit", "/voice/transcribe", audio_payload(args.over_limit_mb)))
+rows.append(run_case(
+    "ingest_upload, not audio", "/voice/transcribe", audio_payload(args.size_mb, header=b"<html>")
+))
+
+print(f"\n{args.uploads} concurrent uploads per case, server peak RSS (VmHWM)\n")
+stubs.print_table(
+    ["handling", "MB each", "200", "400", "413", "idle MiB", "peak MiB", "growth MiB", "wall s"],
+    rows,
+)
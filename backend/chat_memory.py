@@ -0,0 +1,147 @@
+# backend/chat_memory.py
+import asyncio
+from typing import Dict, List, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
+
+from config import CHAT_HISTORY_MAX_TURNS, CHAT_HISTORY_TOKEN_BUDGET, notification_llm
+
+_ENCODING = None
+
+SUMMARIES_GENERATED = 0
+SUMMARY_FAILURES = 0
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count with the OpenAI tokenizer (tiktoken), or a rough
+    4-chars-per-token estimate if it is unavailable.
+    """
+    global _ENCODING
+
+    if _ENCODING is None:
+        try:
+            import tiktoken
+
+            _ENCODING = tiktoken.get_encoding("o200k_base")
+        except Exception:  # noqa: BLE001
+            _ENCODING = False
+
+    if _ENCODING is False:
+        return len(text) // 4 + 1
+    return len(_ENCODING.encode(text))
+
+
+summary_prompt = ChatPromptTemplate.from_template(
+    """
+You maintain a running summary of a conversation between a user and
+AbsherAgent (an assistant for the Absher government services platform).
+
+Current summary (may be empty):
+{summary}
+
+Older turns to fold into the summary:
+{turns}
+
+Write an updated summary in at most 6 short bullet points.
+Keep: services discussed, renewals offered / confirmed / declined,
+documents or photos the user said they uploaded, open questions.
+Write in the same language the user used.
+Return ONLY the summary.
+"""
+)
+
+
+class SessionMemory:
+    """
+    Conversation memory for one session.
+
+    Keeps the most recent turns verbatim, within CHAT_HISTORY_MAX_TURNS and
+    CHAT_HISTORY_TOKEN_BUDGET, and folds older turns into a running summary
+    written by notification_llm. Turns store the user's raw message only,
+    not the per-turn context preamble.
+    """
+
+    def __init__(self) -> None:
+        self.turns: List[Tuple[str, str]] = []
+        self.summary = ""
+        self._lock = asyncio.Lock()
+
+    def messages(self) -> List[BaseMessage]:
+        """
+        chat_history for the agent: summary (if any) + recent turns.
+        """
+        messages: List[BaseMessage] = []
+        if self.summary:
+            messages.append(
+                SystemMessage(content=f"Summary of the earlier conversation:\n{self.summary}")
+            )
+        for user_text, reply_text in self.turns:
+            messages.append(HumanMessage(content=user_text))
+            messages.append(AIMessage(content=reply_text))
+        return messages
+
+    def add_turn(self, user_text: str, reply_text: str) -> bool:
+        """
+        Append a turn. Returns True if the memory is now over budget and
+        compact() should be scheduled.
+        """
+        self.turns.append((user_text, reply_text))
+        return self._overflow() > 0
+
+    def _overflow(self) -> int:
+        """
+        Number of oldest turns that must be folded to get back under
+        the turn limit and token budget (the latest turn is always kept).
+        """
+        overflow = max(len(self.turns) - CHAT_HISTORY_MAX_TURNS, 0)
+        tokens = count_tokens(self.summary) + sum(
+            count_tokens(u) + count_tokens(a) for u, a in self.turns[overflow:]
+        )
+        for user_text, reply_text in self.turns[overflow:-1]:
+            if tokens <= CHAT_HISTORY_TOKEN_BUDGET:
+                break
+            tokens -= count_tokens(user_text) + count_tokens(reply_text)
+            overflow += 1
+        return overflow
+
+    async def compact(self) -> None:
+        """
+        Fold overflowing turns into the summary. New turns may be appended
+        while the summary is being generated; only the folded prefix is removed.
+        """
+        global SUMMARIES_GENERATED, SUMMARY_FAILURES
+
+        async with self._lock:
+            overflow = self._overflow()
+            if overflow <= 0:
+                return
+
+            folded = self.turns[:overflow]
+            turns_text = "\n".join(f"User: {u}\nAssistant: {a}" for u, a in folded)
+            prompt_str = summary_prompt.format(summary=self.summary, turns=turns_text)
+
+            try:
+                ai_msg = await notification_llm.ainvoke(prompt_str)
+            except Exception as exc:  # noqa: BLE001
+                # Keep the history bounded even if summarization fails
+                print(f"[MEMORY] Summary failed, dropping {overflow} turn(s): {exc}")
+                SUMMARY_FAILURES += 1
+            else:
+                self.summary = ai_msg.content.strip()
+                SUMMARIES_GENERATED += 1
+
+            del self.turns[:overflow]
+
+
+def memory_stats() -> Dict[str, int]:
+    """
+    Counters for the /metrics endpoint.
+    """
+    return {
+        "summaries_generated": SUMMARIES_GENERATED,
+        "summary_failures": SUMMARY_FAILURES,
+        "max_turns": CHAT_HISTORY_MAX_TURNS,
+        "token_budget": CHAT_HISTORY_TOKEN_BUDGET,
+    }
@@ -3,7 +3,10 @@ import os
 
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from embedding_cache import CachedEmbeddings
 
 load_dotenv()
 
@@ -12,6 +15,15 @@ if not OPENAI_API_KEY:
     raise RuntimeError("Please set OPENAI_API_KEY environment variable.")
 
 
+# -------------------------------
+# Session limits
+# -------------------------------
+# Live login sessions are evicted LRU-first above this cap, and after
+# being idle for SESSION_IDLE_TTL_SECONDS.
+MAX_LIVE_SESSIONS = int(os.getenv("MAX_LIVE_SESSIONS", "10000"))
+SESSION_IDLE_TTL_SECONDS = int(os.getenv("SESSION_IDLE_TTL_SECONDS", "3600"))
+
+
 # -------------------------------
 # LLM 1: Main chat / service tools
 # -------------------------------
@@ -20,6 +32,20 @@ chat_llm = ChatOpenAI(
     temperature=0.2,
 )
 
+# Max agent runs in flight at once (extra /chat requests wait their turn)
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "20"))
+
+# Conversation memory: recent turns kept verbatim within these limits,
+# older turns are folded into a running summary.
+CHAT_HISTORY_MAX_TURNS = int(os.getenv("CHAT_HISTORY_MAX_TURNS", "6"))
+CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "1500"))
+
+# Answer confident FAQ matches (knowledge/absher_faq.json) without the agent
+FAQ_ROUTER_ENABLED = os.getenv("FAQ_ROUTER_ENABLED", "true").lower() == "true"
+# Generate missing / outdated FAQ answers in the background at startup
+# (one notification-LLM call per knowledge section, saved to disk)
+FAQ_AUTOBUILD = os.getenv("FAQ_AUTOBUILD", "true").lower() == "true"
+
 # -------------------------------
 # LLM 2: Notifications & SMS writer
 # -------------------------------
@@ -31,11 +57,73 @@ notification_llm = ChatOpenAI(
 # -------------------------------
 # Embeddings for FAISS
 # -------------------------------
-embeddings = OpenAIEmbeddings(
-    model="text-embedding-3-small",
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Shared by the RAG index, notification indexes and chat queries.
+# EMBEDDING_CACHE_PATH enables the on-disk (SQLite) tier.
+embeddings = CachedEmbeddings(
+    OpenAIEmbeddings(model=EMBEDDING_MODEL),
+    model=EMBEDDING_MODEL,
+    max_items=int(os.getenv("EMBEDDING_CACHE_SIZE", "50000")),
+    db_path=os.getenv("EMBEDDING_CACHE_PATH") or None,
 )
 
+# Poll knowledge/absher_knowledge.json for edits and hot-reload the index
+# (seconds, 0 = off; POST /admin/knowledge/reload works either way)
+KNOWLEDGE_WATCH_INTERVAL_SECONDS = float(os.getenv("KNOWLEDGE_WATCH_INTERVAL_SECONDS", "0"))
+# Required in the X-Admin-Token header of /admin/* endpoints (unset = disabled)
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN") or None
+
+# RAG query-result cache (absher_rag): max entries, and the cosine
+# similarity above which a new query reuses a cached neighbour's result.
+RAG_QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", "1000"))
+RAG_QUERY_CACHE_SIMILARITY = float(os.getenv("RAG_QUERY_CACHE_SIMILARITY", "0.95"))
+
+# -------------------------------
+# Background job queue (login summaries, proactive SMS after login)
+# -------------------------------
+BACKGROUND_WORKERS = int(os.getenv("BACKGROUND_WORKERS", "4"))
+BACKGROUND_QUEUE_SIZE = int(os.getenv("BACKGROUND_QUEUE_SIZE", "1000"))
+
+# -------------------------------
+# Proactive engine (batch runs over all live sessions)
+# -------------------------------
+PROACTIVE_SCHEDULER_ENABLED = os.getenv("PROACTIVE_SCHEDULER_ENABLED", "true").lower() == "true"
+PROACTIVE_INTERVAL_SECONDS = int(os.getenv("PROACTIVE_INTERVAL_SECONDS", "3600"))
+PROACTIVE_LLM_CONCURRENCY = int(os.getenv("PROACTIVE_LLM_CONCURRENCY", "10"))
+
+# Render every proactive SMS template variant at startup
+SMS_TEMPLATE_PREWARM = os.getenv("SMS_TEMPLATE_PREWARM", "false").lower() == "true"
+
+# -------------------------------
+# ID photo pipeline (remove.bg + Pillow)
+# -------------------------------
+# "removebg" (remote API, needs REMOVEBG_API_KEY) or "local" (CPU, plain walls)
+BG_REMOVAL_BACKEND = os.getenv("BG_REMOVAL_BACKEND", "removebg").lower()
+REMOVEBG_API_URL = os.getenv("REMOVEBG_API_URL", "https://api.remove.bg/v1.0/removebg")
+REMOVEBG_TIMEOUT_SECONDS = float(os.getenv("REMOVEBG_TIMEOUT_SECONDS", "30"))
+REMOVEBG_MAX_RETRIES = int(os.getenv("REMOVEBG_MAX_RETRIES", "2"))
+REMOVEBG_MAX_CONNECTIONS = int(os.getenv("REMOVEBG_MAX_CONNECTIONS", "20"))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(os.cpu_count() or 2)))
+# Uploads slower than this return a job id to poll instead of blocking
+ID_PHOTO_SYNC_WAIT_SECONDS = float(os.getenv("ID_PHOTO_SYNC_WAIT_SECONDS", "10"))
+# Upload size limits (bytes); the transcription API accepts up to 25 MB
+ID_PHOTO_MAX_BYTES = int(os.getenv("ID_PHOTO_MAX_BYTES", str(10 * 1024 * 1024)))
+AUDIO_MAX_BYTES = int(os.getenv("AUDIO_MAX_BYTES", str(25 * 1024 * 1024)))
+# Size cap of the processed-photo cache (uploads/cache), LRU evicted
+PHOTO_CACHE_MAX_BYTES = int(os.getenv("PHOTO_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+
 # -------------------------------
 # Audio client for voice features
 # -------------------------------
-audio_client = OpenAI()  # uses OPENAI_API_KEY from env
+# Async client (uses OPENAI_API_KEY / OPENAI_BASE_URL from env) with a
+# keep-alive connection pool shared by transcription and TTS requests.
+AUDIO_MAX_CONNECTIONS = int(os.getenv("AUDIO_MAX_CONNECTIONS", "50"))
+audio_client = AsyncOpenAI(
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=AUDIO_MAX_CONNECTIONS,
+            max_keepalive_connections=AUDIO_MAX_CONNECTIONS // 2,
+        ),
+    ),
+)
@@ -0,0 +1,189 @@
+# backend/embedding_cache.py
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+CacheKey = Tuple[str, str]  # (model, sha256(text))
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed cache in front of an Embeddings implementation.
+
+    Vectors are keyed by (model, sha256(text)) and looked up in:
+    1) an in-memory LRU (max_items entries)
+    2) an optional on-disk SQLite table (float32 blobs), if db_path is set
+
+    Only texts missing from both tiers are sent to the underlying model,
+    deduplicated within the same call.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model: str,
+        max_items: int = 50_000,
+        db_path: Optional[str] = None,
+    ) -> None:
+        self.underlying = underlying
+        self.model = model
+        self.max_items = max_items
+
+        self._memory: "OrderedDict[CacheKey, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = self._open_db(Path(db_path))
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ---------------- Storage tiers ----------------
+
+    @staticmethod
+    def _open_db(path: Path) -> sqlite3.Connection:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(path), check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        db.commit()
+        return db
+
+    def _key(self, text: str) -> CacheKey:
+        return self.model, hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _get(self, key: CacheKey) -> Optional[List[float]]:
+        """
+        Look up a vector in memory, then on disk. Caller must hold the lock.
+        """
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return vector
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT vector FROM embeddings WHERE model = ? AND text_hash = ?",
+                key,
+            ).fetchone()
+            if row is not None:
+                vector = np.frombuffer(row[0], dtype=np.float32).tolist()
+                self._remember(key, vector)
+                self.disk_hits += 1
+                return vector
+
+        return None
+
+    def _remember(self, key: CacheKey, vector: List[float]) -> None:
+        """
+        Insert into the memory LRU. Caller must hold the lock.
+        """
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def _put_many(self, items: Dict[CacheKey, List[float]]) -> None:
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) "
+                    "VALUES (?, ?, ?)",
+                    [
+                        (key[0], key[1], np.asarray(vec, dtype=np.float32).tobytes())
+                        for key, vec in items.items()
+                    ],
+                )
+                self._db.commit()
+
+    def _split(
+        self, texts: Sequence[str]
+    ) -> Tuple[List[CacheKey], List[Optional[List[float]]], Dict[CacheKey, str]]:
+        """
+        Resolve cached vectors and collect the unique texts that still
+        need to be embedded.
+        """
+        keys = [self._key(t) for t in texts]
+        results: List[Optional[List[float]]] = []
+        missing: Dict[CacheKey, str] = {}
+
+        with self._lock:
+            for key, text in zip(keys, texts):
+                vector = self._get(key)
+                if vector is None and key not in missing:
+                    missing[key] = text
+                    self.misses += 1
+                results.append(vector)
+
+        return keys, results, missing
+
+    @staticmethod
+    def _merge(
+        keys: List[CacheKey],
+        results: List[Optional[List[float]]],
+        computed: Dict[CacheKey, List[float]],
+    ) -> List[List[float]]:
+        return [r if r is not None else computed[k] for k, r in zip(keys, results)]
+
+    # ---------------- Embeddings interface ----------------
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, results, missing = self._split(texts)
+        computed: Dict[CacheKey, List[float]] = {}
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._put_many(computed)
+
+        return self._merge(keys, results, computed)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, results, missing = self._split(texts)
+        computed: Dict[CacheKey, List[float]] = {}
+
+        if missing:
+            vectors = await self.underlying.aembed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._put_many(computed)
+
+        return self._merge(keys, results, computed)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    # ---------------- Metrics ----------------
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Hit/miss counters for the /metrics endpoint.
+        """
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "memory_items": len(self._memory),
+        }
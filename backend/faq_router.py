@@ -0,0 +1,327 @@
+# backend/faq_router.py
+# Answers common knowledge questions ("what are the requirements to renew
+# a driver license?") from precomputed answers, without running the agent.
+import asyncio
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from langchain.docstore.document import Document
+
+from absher_lexical import BM25Index, normalize_arabic, tokenize
+from absher_rag import (
+    KNOWLEDGE_DIR,
+    load_json_docs,
+    register_index_reload_hook,
+    section_hash,
+)
+from config import notification_llm
+
+# Precomputed questions / answers per knowledge section (written by
+# build_faq: at startup when FAQ_AUTOBUILD is on, or `python faq_router.py`)
+FAQ_PATH = KNOWLEDGE_DIR / "absher_faq.json"
+
+# A message is answered from the FAQ when its IDF-weighted token overlap
+# with a known question reaches FAQ_MIN_OVERLAP and beats the best
+# question of any other section by FAQ_MIN_MARGIN.
+FAQ_MIN_OVERLAP = 0.8
+FAQ_MIN_MARGIN = 0.15
+FAQ_CANDIDATES = 10
+
+FAQ_METRICS: Dict[str, int] = {
+    "lookups": 0,
+    "answered": 0,
+    "not_a_question": 0,
+    "action_or_status": 0,
+    "low_confidence": 0,
+}
+
+# -------------------------------------------------------------------
+# Message guards
+# -------------------------------------------------------------------
+
+_WORD = re.compile(r"\w+")
+_ARABIC_LETTER = re.compile(r"[؀-ۿ]")
+_LATIN_LETTER = re.compile(r"[A-Za-z]")
+
+# First words of a question (normalized, see absher_lexical.normalize_arabic)
+_QUESTION_WORDS = {
+    "how", "what", "which", "where", "when", "who", "why", "can", "do",
+    "does", "is", "are", "should", "requirements", "steps",
+    "كيف", "ما", "ماهي", "ماهو", "ماذا", "وش", "ايش", "هل", "متي", "وين",
+    "اين", "لماذا", "ليش", "شلون", "شروط", "متطلبات", "خطوات",
+}
+
+# Requests to act on the user's own services, confirmations, and questions
+# about their status: these need the agent (tools + service status).
+_ACTION_OR_STATUS_WORDS = {
+    "want", "wanna", "please", "submit", "proceed", "confirm", "yes", "ok",
+    "okay", "expire", "expires", "expired", "expiring", "expiry", "status",
+    "uploaded",
+    "ابي", "ابغي", "ابغا", "اريد", "ارغب", "ودي", "جدد", "جددلي", "جددي",
+    "نعم", "ايوه", "تمام", "موافق", "اكد", "تنتهي", "ينتهي", "انتهت",
+    "انتهي", "منتهيه", "خلصت", "رفعت", "حالتي",
+}
+
+
+def detect_language(text: str) -> str:
+    """
+    "ar" when the message has more Arabic than Latin letters, else "en".
+    """
+    arabic = len(_ARABIC_LETTER.findall(text))
+    latin = len(_LATIN_LETTER.findall(text))
+    return "ar" if arabic > latin else "en"
+
+
+def _raw_words(text: str) -> List[str]:
+    return _WORD.findall(normalize_arabic(text).lower())
+
+
+def _looks_like_question(text: str, words: List[str]) -> bool:
+    if "?" in text or "؟" in text:
+        return True
+    return bool(words) and words[0] in _QUESTION_WORDS
+
+
+# -------------------------------------------------------------------
+# Router
+# -------------------------------------------------------------------
+
+
+def _current_section_hashes() -> Dict[str, str]:
+    return {doc.metadata["id"]: section_hash(doc) for doc in load_json_docs()}
+
+
+def _load_faq_entries() -> List[Dict[str, Any]]:
+    if not FAQ_PATH.exists():
+        return []
+    try:
+        return json.loads(FAQ_PATH.read_text(encoding="utf-8")).get("entries", [])
+    except Exception as exc:  # noqa: BLE001
+        print(f"[FAQ] Could not read {FAQ_PATH}: {exc}")
+        return []
+
+
+class FaqRouter:
+    """
+    Nearest-neighbour classifier over the precomputed FAQ questions (both
+    languages) of each knowledge section. Entries whose section text has
+    changed since they were generated are ignored.
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]], section_hashes: Dict[str, str]) -> None:
+        self.answers: Dict[str, Dict[str, str]] = {}
+        self.questions: List[Tuple[str, Set[str]]] = []  # (section_id, tokens)
+
+        stale = 0
+        for entry in entries:
+            section_id = entry.get("section_id")
+            if section_hashes.get(section_id) != entry.get("section_hash"):
+                stale += 1
+                continue
+            self.answers[section_id] = entry["answer"]
+            for lang_questions in entry.get("questions", {}).values():
+                for question in lang_questions:
+                    tokens = set(tokenize(question))
+                    if tokens:
+                        self.questions.append((section_id, tokens))
+
+        self.bm25 = BM25Index([" ".join(tokens) for _, tokens in self.questions])
+        if stale:
+            print(f"[FAQ] Ignoring {stale} stale FAQ entr(ies) until they are regenerated")
+
+    def _overlap(self, query_terms: Set[str], question_terms: Set[str]) -> float:
+        # IDF-weighted Jaccard; terms unknown to the FAQ weigh the most
+        idf = self.bm25.idf
+        weight = lambda term: idf.get(term, self.bm25.max_idf)  # noqa: E731
+        union = sum(weight(t) for t in query_terms | question_terms)
+        shared = sum(weight(t) for t in query_terms & question_terms)
+        return shared / union if union else 0.0
+
+    def classify(self, message: str) -> Optional[Tuple[str, float]]:
+        """
+        (section_id, overlap) of the closest question when it is a
+        confident match, else None.
+        """
+        query_terms = set(tokenize(message))
+        if not query_terms or not self.questions:
+            return None
+
+        best: Dict[str, float] = {}
+        for idx, _ in self.bm25.search(message, k=FAQ_CANDIDATES):
+            section_id, question_terms = self.questions[idx]
+            overlap = self._overlap(query_terms, question_terms)
+            best[section_id] = max(best.get(section_id, 0.0), overlap)
+
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        if not ranked or ranked[0][1] < FAQ_MIN_OVERLAP:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < FAQ_MIN_MARGIN:
+            return None
+        return ranked[0]
+
+    def answer(self, message: str) -> Optional[Tuple[str, str]]:
+        """
+        (section_id, precomputed answer in the message's language) for a
+        plain knowledge question with a confident FAQ match, else None.
+        """
+        FAQ_METRICS["lookups"] += 1
+        words = _raw_words(message)
+
+        if not _looks_like_question(message, words):
+            FAQ_METRICS["not_a_question"] += 1
+            return None
+        if _ACTION_OR_STATUS_WORDS.intersection(words):
+            FAQ_METRICS["action_or_status"] += 1
+            return None
+
+        match = self.classify(message)
+        answer = self.answers.get(match[0], {}).get(detect_language(message)) if match else None
+        if not answer:
+            FAQ_METRICS["low_confidence"] += 1
+            return None
+
+        FAQ_METRICS["answered"] += 1
+        return match[0], answer
+
+
+_FAQ_ROUTER: Optional[FaqRouter] = None
+_FAQ_ROUTER_LOCK = threading.Lock()
+
+
+def reload_faq_router() -> FaqRouter:
+    """
+    Build the router from the FAQ file and the current knowledge, then
+    swap it in; lookups keep using the previous one meanwhile. Blocking:
+    run in a thread (or at startup).
+    """
+    global _FAQ_ROUTER
+
+    with _FAQ_ROUTER_LOCK:
+        router = FaqRouter(_load_faq_entries(), _current_section_hashes())
+        _FAQ_ROUTER = router
+    print(
+        f"[FAQ] Router ready: {len(router.answers)} section(s), "
+        f"{len(router.questions)} question(s)"
+    )
+    return router
+
+
+def get_faq_router() -> FaqRouter:
+    """
+    The served router; built on first use (warmed up at startup).
+    """
+    router = _FAQ_ROUTER
+    return router if router is not None else reload_faq_router()
+
+
+# Section hashes change with the knowledge: re-check entries after a reload
+# (hooks run in the reload's worker thread)
+register_index_reload_hook(reload_faq_router)
+
+
+def answer_faq(message: str) -> Optional[Tuple[str, str]]:
+    """
+    (section_id, answer) when the message can be answered from the FAQ.
+    """
+    return get_faq_router().answer(message)
+
+
+def faq_stats() -> Dict[str, Any]:
+    """
+    Counters for the /metrics endpoint.
+    """
+    lookups = FAQ_METRICS["lookups"]
+    return {
+        **FAQ_METRICS,
+        "hit_rate": round(FAQ_METRICS["answered"] / lookups, 3) if lookups else None,
+        "sections": len(get_faq_router().answers),
+    }
+
+
+# -------------------------------------------------------------------
+# Generation (at startup with FAQ_AUTOBUILD, or `python faq_router.py`)
+# -------------------------------------------------------------------
+
+FAQ_PROMPT = """
+You write the FAQ of the Absher assistant for one documentation section.
+
+Section title: {title}
+Section text:
+{text}
+
+Return ONLY a JSON object of this shape:
+{{
+  "questions": {{"ar": [...], "en": [...]}},
+  "answer": {{"ar": "...", "en": "..."}}
+}}
+
+- "questions": 6 short, different ways a user would ask about this
+  section in Arabic (Saudi dialect and formal) and 6 in English.
+- "answer": the same answer in Arabic and in English, at most 120 words
+  each, using ONLY facts from the section text (steps, requirements,
+  conditions, where to find the service in Absher).
+- Never state fee amounts: say the official fee is calculated
+  automatically by the Absher system.
+- Do not assume anything about the user's own documents or status.
+""".strip()
+
+
+async def _generate_entry(doc: Document) -> Dict[str, Any]:
+    prompt = FAQ_PROMPT.format(title=doc.metadata["title"], text=doc.page_content)
+    ai_msg = await notification_llm.ainvoke(prompt)
+    content = ai_msg.content.strip().removeprefix("```json").removesuffix("```")
+    data = json.loads(content)
+    return {
+        "section_id": doc.metadata["id"],
+        "section_hash": section_hash(doc),
+        "questions": {lang: list(data["questions"][lang]) for lang in ("ar", "en")},
+        "answer": {lang: str(data["answer"][lang]).strip() for lang in ("ar", "en")},
+    }
+
+
+async def build_faq(concurrency: int = 5) -> int:
+    """
+    Generate FAQ entries for new or changed knowledge sections (LLM call
+    per section), keep the up-to-date ones, and write FAQ_PATH. Returns
+    how many entries were generated.
+    """
+    docs = load_json_docs()
+    current = {e["section_id"]: e for e in _load_faq_entries()}
+    missing = [
+        d for d in docs
+        if current.get(d.metadata["id"], {}).get("section_hash") != section_hash(d)
+    ]
+    if not missing:
+        return 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def generate(doc: Document) -> Dict[str, Any]:
+        async with semaphore:
+            return await _generate_entry(doc)
+
+    results = await asyncio.gather(*(generate(d) for d in missing), return_exceptions=True)
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        print(f"[FAQ] {len(failures)} section(s) failed to generate: {failures[0]}")
+    for entry in results:
+        if not isinstance(entry, Exception):
+            current[entry["section_id"]] = entry
+
+    section_ids = [d.metadata["id"] for d in docs]
+    entries = [current[s] for s in section_ids if s in current]
+    FAQ_PATH.write_text(
+        json.dumps({"entries": entries}, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    await asyncio.to_thread(reload_faq_router)
+
+    generated = len(missing) - len(failures)
+    print(f"[FAQ] Generated {generated} FAQ entr(ies), {len(entries)} in {FAQ_PATH}")
+    return generated
+
+
+if __name__ == "__main__":
+    # Offline build: python faq_router.py
+    asyncio.run(build_faq())
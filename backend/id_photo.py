@@ -0,0 +1,684 @@
+# backend/id_photo.py
+import asyncio
+import hashlib
+import io
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException
+from fastapi.staticfiles import StaticFiles
+from PIL import Image, ImageOps
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+
+from config import (
+    BG_REMOVAL_BACKEND,
+    ID_PHOTO_SYNC_WAIT_SECONDS,
+    IMAGE_WORKERS,
+    PHOTO_CACHE_MAX_BYTES,
+    REMOVEBG_API_URL,
+    REMOVEBG_MAX_CONNECTIONS,
+    REMOVEBG_MAX_RETRIES,
+    REMOVEBG_TIMEOUT_SECONDS,
+)
+from ingest import IngestedUpload
+from models import PhotoJobStatus, UserMedia
+from photo_segmentation import remove_background as remove_background_locally
+from store import USERS, add_user_media, register_session_evict_hook
+
+UPLOAD_DIR = Path(__file__).with_name("uploads")
+UPLOAD_DIR.mkdir(exist_ok=True)
+
+# Processed photos by content hash (see "Result cache" below)
+PHOTO_CACHE_DIR = UPLOAD_DIR / "cache"
+PHOTO_CACHE_DIR.mkdir(exist_ok=True)
+
+# remove.bg options:
+# - bg_color=ffffff: white background
+# - crop=true + crop_margin: trim empty space but keep some margin around subject
+REMOVEBG_PARAMS: Dict[str, str] = {
+    "size": "auto",
+    "crop": "true",
+    "crop_margin": "10%",
+    "bg_color": "ffffff",
+    # You can tune scale to zoom in/out globally if needed:
+    # "scale": "80%",
+}
+ID_PHOTO_SIZE: Tuple[int, int] = (600, 800)  # (width, height), 3:4
+ID_PHOTO_JPEG_QUALITY = 90
+ID_PHOTO_WEBP_QUALITY = 80
+
+# Variants written per photo: name -> (downscale factor of the 600x800
+# print image, format, filename suffix). "print" keeps the media filename.
+ID_PHOTO_VARIANTS: Dict[str, Tuple[int, str, str]] = {
+    "print": (1, "JPEG", ".jpg"),  # 600x800 progressive JPEG
+    "preview": (2, "WEBP", "_preview.webp"),  # 300x400
+    "thumb": (4, "WEBP", "_thumb.webp"),  # 150x200
+}
+
+PHOTO_PIPELINE_METRICS: Dict[str, Any] = {
+    "photos_processed": 0,
+    "cpu_seconds": 0.0,
+    "bytes_written": {name: 0 for name in ID_PHOTO_VARIANTS},
+    "bytes_served": {name: 0 for name in ID_PHOTO_VARIANTS},
+    "not_modified": 0,
+}
+_METRICS_LOCK = threading.Lock()
+
+# Pillow decode/crop/resize/encode release the GIL, so a thread pool sized
+# to the cores keeps the CPU work off the event loop without pickling.
+_IMAGE_POOL = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="id-photo")
+
+# Shared, keep-alive HTTP client for remove.bg (created on first use)
+_http_client: Optional[httpx.AsyncClient] = None
+
+# Slow uploads continue in the background; clients poll by job id
+PHOTO_JOBS: Dict[str, PhotoJobStatus] = {}
+_SESSION_JOBS: Dict[str, List[str]] = {}  # session user_id -> job ids
+_JOB_TASKS: Dict[str, asyncio.Task] = {}
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    global _http_client
+
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=REMOVEBG_TIMEOUT_SECONDS,
+            # Retries failed connection attempts; HTTP errors are retried below.
+            # The pool limits go on the transport: the client ignores its own
+            # `limits` when given one.
+            transport=httpx.AsyncHTTPTransport(
+                retries=REMOVEBG_MAX_RETRIES,
+                limits=httpx.Limits(
+                    max_connections=REMOVEBG_MAX_CONNECTIONS,
+                    max_keepalive_connections=REMOVEBG_MAX_CONNECTIONS // 2,
+                ),
+            ),
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# -------------------------------------------------------------------
+# remove.bg
+# -------------------------------------------------------------------
+
+
+async def _remove_background(upload: IngestedUpload, api_key: str) -> bytes:
+    """
+    Call remove.bg: white background, cropped to the subject with margin.
+    Retries rate limits (429) and server errors with a short backoff.
+    """
+    client = _get_http_client()
+
+    for attempt in range(REMOVEBG_MAX_RETRIES + 1):
+        try:
+            response = await client.post(
+                REMOVEBG_API_URL,
+                headers={"X-Api-Key": api_key},
+                files={"image_file": (upload.filename, upload.rewind(), upload.content_type)},
+                data=REMOVEBG_PARAMS,
+            )
+        except httpx.HTTPError as exc:
+            print("[UPLOAD] remove.bg request error:", exc)
+            raise HTTPException(
+                status_code=502,
+                detail="تعذر الاتصال بخدمة إزالة الخلفية.",
+            ) from exc
+
+        retryable = response.status_code == 429 or response.status_code >= 500
+        if retryable and attempt < REMOVEBG_MAX_RETRIES:
+            await asyncio.sleep(0.5 * 2**attempt)
+            continue
+        break
+
+    if response.status_code != 200:
+        print("[UPLOAD] remove.bg error:", response.status_code, response.text)
+        raise HTTPException(
+            status_code=502,
+            detail="فشل في إزالة خلفية الصورة. الرجاء المحاولة لاحقاً.",
+        )
+
+    processed_bytes = response.content
+    if not processed_bytes:
+        raise HTTPException(
+            status_code=502,
+            detail="خدمة إزالة الخلفية لم ترجع صورة صالحة.",
+        )
+    return processed_bytes
+
+
+# -------------------------------------------------------------------
+# Pillow processing (runs in _IMAGE_POOL)
+# -------------------------------------------------------------------
+
+
+def _open_processed(processed_bytes: bytes) -> Image.Image:
+    # --- Open processed image with Pillow ---
+    try:
+        img = Image.open(io.BytesIO(processed_bytes))
+        img.load()
+    except Exception as exc:  # noqa: BLE001
+        print("[UPLOAD] Failed to open processed image:", exc)
+        raise HTTPException(
+            status_code=502,
+            detail="فشل في قراءة الصورة بعد إزالة الخلفية.",
+        ) from exc
+    return img
+
+
+def _remove_background_local_sync(upload: IngestedUpload) -> Image.Image:
+    try:
+        img = Image.open(upload.rewind())
+        # JPEG: decode at a reduced scale that is still >= 2x the output
+        img.draft("RGB", (ID_PHOTO_SIZE[0] * 2, ID_PHOTO_SIZE[1] * 2))
+        img = ImageOps.exif_transpose(img)
+    except Exception as exc:  # noqa: BLE001
+        print("[UPLOAD] Failed to open uploaded image:", exc)
+        raise HTTPException(
+            status_code=400,
+            detail="تعذر قراءة الصورة المرفوعة.",
+        ) from exc
+
+    return remove_background_locally(img, margin=0.10)
+
+
+def variant_filename(filename: str, variant: str) -> str:
+    """
+    File name of a variant, given the media filename (the print JPEG).
+    """
+    return filename[: -len(".jpg")] + ID_PHOTO_VARIANTS[variant][2]
+
+
+def _encode_variant(img: Image.Image, fmt: str) -> bytes:
+    buf = io.BytesIO()
+    if fmt == "JPEG":
+        img.save(buf, format="JPEG", quality=ID_PHOTO_JPEG_QUALITY, progressive=True, optimize=True)
+    else:
+        img.save(buf, format=fmt, quality=ID_PHOTO_WEBP_QUALITY, method=4)
+    return buf.getvalue()
+
+
+def _crop_resize_save(img: Image.Image, out_path: Path) -> None:
+    """
+    Center-crop to 3:4, resize to 600x800 and save every variant from that
+    one image (print JPEG at out_path, plus reduced WebP preview/thumb).
+    CPU-bound: called from the image thread pool.
+    """
+    # Ensure RGB (remove.bg may return PNG with alpha)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    # --- Center crop to 6x8 (3:4 aspect ratio), always ---
+    # 6x8 => aspect ratio width/height = 3/4 = 0.75
+    target_ratio = 3 / 4  # width / height
+
+    width, height = img.size
+    if height == 0 or width == 0:
+        raise HTTPException(
+            status_code=500,
+            detail="الصورة الناتجة غير صالحة (أبعاد صفرية).",
+        )
+
+    current_ratio = width / height
+
+    if current_ratio > target_ratio:
+        # Image is too wide -> crop width
+        new_width = int(height * target_ratio)
+        left = (width - new_width) // 2
+        right = left + new_width
+        top = 0
+        bottom = height
+    elif current_ratio < target_ratio:
+        # Image is too tall -> crop height
+        new_height = int(width / target_ratio)
+        top = (height - new_height) // 2
+        bottom = top + new_height
+        left = 0
+        right = width
+    else:
+        # Already exactly 3:4 -> we still crop a bit to "zoom" slightly
+        zoom_factor = 0.9  # keep 90% of width/height
+        new_width = int(width * zoom_factor)
+        new_height = int(height * zoom_factor)
+        left = (width - new_width) // 2
+        top = (height - new_height) // 2
+        right = left + new_width
+        bottom = top + new_height
+
+    # --- Crop + resize to fixed ID-style dimensions (still 3:4) ---
+    # One pass: resize reads only the crop box, and reducing_gap does a
+    # cheap integer reduce first when the source is much larger.
+    img = img.resize(
+        ID_PHOTO_SIZE,
+        Image.LANCZOS,
+        box=(left, top, right, bottom),
+        reducing_gap=3.0,
+    )
+
+    # --- Save final variants to disk ---
+    try:
+        written: Dict[str, int] = {}
+        for name, (factor, fmt, _) in ID_PHOTO_VARIANTS.items():
+            data = _encode_variant(img if factor == 1 else img.reduce(factor), fmt)
+            path = out_path if name == "print" else out_path.with_name(
+                variant_filename(out_path.name, name)
+            )
+            path.write_bytes(data)
+            written[name] = len(data)
+    except Exception as exc:  # noqa: BLE001
+        print("[UPLOAD] Failed to save processed image:", exc)
+        raise HTTPException(
+            status_code=500,
+            detail="فشل حفظ الصورة بعد المعالجة.",
+        ) from exc
+
+    with _METRICS_LOCK:
+        PHOTO_PIPELINE_METRICS["photos_processed"] += 1
+        for name, size in written.items():
+            PHOTO_PIPELINE_METRICS["bytes_written"][name] += size
+
+
+def _timed(fn: Callable[..., Any], *args: Any) -> Any:
+    started = time.thread_time()
+    try:
+        return fn(*args)
+    finally:
+        with _METRICS_LOCK:
+            PHOTO_PIPELINE_METRICS["cpu_seconds"] += time.thread_time() - started
+
+
+async def _run_in_pool(fn: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run CPU-bound image work in _IMAGE_POOL, adding its CPU time to
+    PHOTO_PIPELINE_METRICS.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_IMAGE_POOL, _timed, fn, *args)
+
+
+# -------------------------------------------------------------------
+# Background removal backends (BG_REMOVAL_BACKEND)
+# -------------------------------------------------------------------
+
+# (upload, remove.bg api key or None) -> photo on white, cropped to subject
+BackgroundRemover = Callable[[IngestedUpload, Optional[str]], Awaitable[Image.Image]]
+
+
+async def _removebg_backend(upload: IngestedUpload, api_key: Optional[str]) -> Image.Image:
+    if not api_key:
+        raise HTTPException(
+            status_code=500,
+            detail="خدمة إزالة الخلفية غير مفعلة (REMOVEBG_API_KEY مفقود).",
+        )
+    processed_bytes = await _remove_background(upload, api_key)
+    return await _run_in_pool(_open_processed, processed_bytes)
+
+
+async def _local_backend(upload: IngestedUpload, api_key: Optional[str]) -> Image.Image:
+    return await _run_in_pool(_remove_background_local_sync, upload)
+
+
+BG_REMOVAL_BACKENDS: Dict[str, BackgroundRemover] = {
+    "removebg": _removebg_backend,
+    "local": _local_backend,
+}
+
+if BG_REMOVAL_BACKEND not in BG_REMOVAL_BACKENDS:
+    raise ValueError(
+        f"Unknown BG_REMOVAL_BACKEND {BG_REMOVAL_BACKEND!r}, "
+        f"expected one of {sorted(BG_REMOVAL_BACKENDS)}"
+    )
+
+
+def background_removal_needs_api_key() -> bool:
+    return BG_REMOVAL_BACKEND == "removebg"
+
+
+# -------------------------------------------------------------------
+# Result cache: retries of the same upload skip remove.bg and Pillow
+# -------------------------------------------------------------------
+
+# Part of every cache key, so changing the backend or any processing
+# option starts a fresh cache instead of serving photos made differently.
+_PROCESSING_SIGNATURE = repr(
+    (
+        BG_REMOVAL_BACKEND,
+        sorted(REMOVEBG_PARAMS.items()),
+        "crop=3:4",
+        ID_PHOTO_SIZE,
+        ID_PHOTO_JPEG_QUALITY,
+        ID_PHOTO_WEBP_QUALITY,
+        sorted(ID_PHOTO_VARIANTS.items()),
+    )
+).encode("utf-8")
+
+# key -> total size of its variant files, least recently used first
+_PHOTO_CACHE: "OrderedDict[str, int]" = OrderedDict()
+_PHOTO_CACHE_BYTES = 0
+
+PHOTO_CACHE_METRICS: Dict[str, int] = {
+    "hits": 0,
+    "misses": 0,
+    "evictions": 0,
+}
+
+
+def _photo_cache_key(upload: IngestedUpload) -> str:
+    digest = hashlib.sha256(_PROCESSING_SIGNATURE)
+    digest.update(upload.sha256.encode("ascii"))
+    return digest.hexdigest()
+
+
+def _photo_cache_path(key: str) -> Path:
+    return PHOTO_CACHE_DIR / f"{key}.jpg"
+
+
+def _variant_paths(print_path: Path) -> List[Path]:
+    """
+    All variant files of a photo, print JPEG first.
+    """
+    return [print_path.with_name(variant_filename(print_path.name, name)) for name in ID_PHOTO_VARIANTS]
+
+
+def _load_photo_cache() -> None:
+    """
+    Rebuild the LRU order from the files on disk (oldest mtime first);
+    hits touch the file, so mtime tracks last use across restarts.
+    """
+    global _PHOTO_CACHE_BYTES
+
+    entries = []
+    for path in PHOTO_CACHE_DIR.glob("*.jpg"):
+        size = sum(p.stat().st_size for p in _variant_paths(path) if p.exists())
+        entries.append((path.stat().st_mtime, path.stem, size))
+
+    for _, key, size in sorted(entries):
+        _PHOTO_CACHE[key] = size
+        _PHOTO_CACHE_BYTES += size
+    _evict_photo_cache()
+
+
+def _evict_photo_cache() -> None:
+    global _PHOTO_CACHE_BYTES
+
+    while _PHOTO_CACHE and _PHOTO_CACHE_BYTES > PHOTO_CACHE_MAX_BYTES:
+        key, size = _PHOTO_CACHE.popitem(last=False)
+        _PHOTO_CACHE_BYTES -= size
+        PHOTO_CACHE_METRICS["evictions"] += 1
+        for path in _variant_paths(_photo_cache_path(key)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _copy_from_cache(key: str, out_path: Path) -> bool:
+    src = _photo_cache_path(key)
+    try:
+        for src_variant, out_variant in zip(_variant_paths(src), _variant_paths(out_path)):
+            shutil.copyfile(src_variant, out_variant)
+        os.utime(src)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _copy_to_cache(out_path: Path, key: str) -> int:
+    size = 0
+    for out_variant, cache_variant in zip(_variant_paths(out_path), _variant_paths(_photo_cache_path(key))):
+        shutil.copyfile(out_variant, cache_variant)
+        size += cache_variant.stat().st_size
+    return size
+
+
+async def _get_cached_photo(key: str, out_path: Path) -> bool:
+    """
+    Copy the cached variants for key next to out_path (the print JPEG).
+    Returns False on a miss.
+    """
+    global _PHOTO_CACHE_BYTES
+
+    if key not in _PHOTO_CACHE:
+        PHOTO_CACHE_METRICS["misses"] += 1
+        return False
+
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(_IMAGE_POOL, _copy_from_cache, key, out_path):
+        # File removed behind our back: forget it and process normally
+        _PHOTO_CACHE_BYTES -= _PHOTO_CACHE.pop(key, 0)
+        PHOTO_CACHE_METRICS["misses"] += 1
+        return False
+
+    if key in _PHOTO_CACHE:
+        _PHOTO_CACHE.move_to_end(key)
+    PHOTO_CACHE_METRICS["hits"] += 1
+    return True
+
+
+async def _put_cached_photo(key: str, out_path: Path) -> None:
+    global _PHOTO_CACHE_BYTES
+
+    if key in _PHOTO_CACHE:
+        return  # a concurrent identical upload stored it already
+
+    loop = asyncio.get_running_loop()
+    try:
+        size = await loop.run_in_executor(_IMAGE_POOL, _copy_to_cache, out_path, key)
+    except OSError as exc:
+        print("[UPLOAD] Failed to cache processed photo:", exc)
+        return
+
+    if key not in _PHOTO_CACHE:
+        _PHOTO_CACHE[key] = size
+        _PHOTO_CACHE_BYTES += size
+        _evict_photo_cache()
+
+
+def photo_cache_stats() -> Dict[str, int]:
+    """
+    Counters for the /metrics endpoint.
+    """
+    return {
+        **PHOTO_CACHE_METRICS,
+        "entries": len(_PHOTO_CACHE),
+        "bytes": _PHOTO_CACHE_BYTES,
+        "max_bytes": PHOTO_CACHE_MAX_BYTES,
+    }
+
+
+_load_photo_cache()
+
+
+# -------------------------------------------------------------------
+# Serving /uploads
+# -------------------------------------------------------------------
+
+
+@lru_cache(maxsize=4096)
+def _content_etag(path: str, mtime_ns: int, size: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def _variant_of(filename: str) -> str:
+    for name, (_, _, suffix) in ID_PHOTO_VARIANTS.items():
+        if name != "print" and filename.endswith(suffix):
+            return name
+    return "print"
+
+
+class UploadStaticFiles(StaticFiles):
+    """
+    StaticFiles for UPLOAD_DIR. Upload files are written once under a
+    unique name and never change, so they get a strong content-hash ETag
+    and a long-lived immutable Cache-Control.
+    """
+
+    def file_response(
+        self,
+        full_path: Any,
+        stat_result: os.stat_result,
+        scope: Any,
+        status_code: int = 200,
+    ) -> Response:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["etag"] = _content_etag(
+            str(full_path), stat_result.st_mtime_ns, stat_result.st_size
+        )
+        response.headers["cache-control"] = "public, max-age=31536000, immutable"
+
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            PHOTO_PIPELINE_METRICS["not_modified"] += 1
+            return NotModifiedResponse(response.headers)
+
+        variant = _variant_of(os.path.basename(str(full_path)))
+        PHOTO_PIPELINE_METRICS["bytes_served"][variant] += stat_result.st_size
+        return response
+
+
+def photo_pipeline_stats() -> Dict[str, Any]:
+    """
+    Processing / serving counters for the /metrics endpoint.
+    """
+    processed = PHOTO_PIPELINE_METRICS["photos_processed"]
+    return {
+        **PHOTO_PIPELINE_METRICS,
+        "cpu_seconds": round(PHOTO_PIPELINE_METRICS["cpu_seconds"], 3),
+        "cpu_seconds_per_photo": (
+            round(PHOTO_PIPELINE_METRICS["cpu_seconds"] / processed, 4) if processed else None
+        ),
+    }
+
+
+# -------------------------------------------------------------------
+# Pipeline + jobs
+# -------------------------------------------------------------------
+
+
+async def process_id_photo(
+    user_id: str,
+    upload: IngestedUpload,
+    api_key: Optional[str],
+) -> UserMedia:
+    """
+    Full ID photo pipeline: background removal (BG_REMOVAL_BACKEND) ->
+    crop/resize/save (off the event loop) -> register via add_user_media.
+    Identical uploads are served from the result cache.
+    Closes the upload when done.
+
+    If the session was evicted meanwhile, the photo files are deleted and
+    nothing is registered (no evict hook would ever free it): 404.
+    """
+    try:
+        filename = f"{user_id}_{uuid.uuid4().hex}.jpg"
+        out_path = UPLOAD_DIR / filename
+        key = _photo_cache_key(upload)
+
+        if not await _get_cached_photo(key, out_path):
+            remove_background = BG_REMOVAL_BACKENDS[BG_REMOVAL_BACKEND]
+            img = await remove_background(upload, api_key)
+
+            await _run_in_pool(_crop_resize_save, img, out_path)
+            await _put_cached_photo(key, out_path)
+
+        if user_id not in USERS:
+            for path in _variant_paths(out_path):
+                path.unlink(missing_ok=True)
+            raise HTTPException(status_code=404, detail="User not found")
+
+        variants = {name: variant_filename(filename, name) for name in ID_PHOTO_VARIANTS}
+        return add_user_media(user_id=user_id, kind="id_photo", filename=filename, variants=variants)
+    finally:
+        upload.close()
+
+
+def _finish_job(job_id: str, task: asyncio.Task) -> None:
+    _JOB_TASKS.pop(job_id, None)
+    job = PHOTO_JOBS.get(job_id)
+    if job is None:
+        # Session evicted meanwhile (the pipeline then fails with a 404)
+        if not task.cancelled():
+            task.exception()
+        return
+
+    if task.cancelled():
+        job.status = "failed"
+        job.detail = "تم إلغاء معالجة الصورة."
+        return
+
+    exc = task.exception()
+    if exc is None:
+        media = task.result()
+        job.status = "done"
+        job.media_id = media.id
+        job.kind = media.kind
+        job.variants = media.variants
+    else:
+        print(f"[UPLOAD] Background job {job_id} failed: {exc}")
+        job.status = "failed"
+        job.detail = exc.detail if isinstance(exc, HTTPException) else "فشل في معالجة الصورة."
+
+
+async def run_id_photo_upload(
+    user_id: str,
+    upload: IngestedUpload,
+    api_key: Optional[str],
+) -> UserMedia | PhotoJobStatus:
+    """
+    Run the pipeline, waiting up to ID_PHOTO_SYNC_WAIT_SECONDS. If it takes
+    longer it keeps running in the background (owning the upload) and a
+    pending job is returned for the client to poll.
+    """
+    task = asyncio.create_task(process_id_photo(user_id, upload, api_key))
+
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), timeout=ID_PHOTO_SYNC_WAIT_SECONDS)
+    except asyncio.TimeoutError:
+        pass
+
+    if user_id not in USERS:
+        # Evicted while waiting: the task finishes on its own and registers
+        # nothing; a job entry would never be dropped
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        raise HTTPException(status_code=404, detail="User not found")
+
+    job_id = uuid.uuid4().hex
+    job = PhotoJobStatus(job_id=job_id, status="pending")
+    PHOTO_JOBS[job_id] = job
+    _SESSION_JOBS.setdefault(user_id, []).append(job_id)
+    _JOB_TASKS[job_id] = task
+    task.add_done_callback(lambda t: _finish_job(job_id, t))
+    return job
+
+
+def get_photo_job(job_id: str) -> Optional[PhotoJobStatus]:
+    return PHOTO_JOBS.get(job_id)
+
+
+def _drop_session_jobs(session_id: str) -> None:
+    for job_id in _SESSION_JOBS.pop(session_id, ()):
+        PHOTO_JOBS.pop(job_id, None)
+
+
+register_session_evict_hook(_drop_session_jobs)
@@ -0,0 +1,320 @@
+# backend/ingest.py
+import hashlib
+import io
+import json
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+from config import AUDIO_MAX_BYTES, ID_PHOTO_MAX_BYTES
+
+CHUNK_SIZE = 64 * 1024
+# Allowance for multipart boundaries / headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+# Bytes of the file the header sniffers look at
+SNIFF_BYTES = 16
+
+# Upload kind per path: UploadLimitMiddleware enforces its byte limit and
+# header check while the request body arrives
+UPLOAD_PATH_KINDS: Dict[str, str] = {
+    "/upload/id-photo": "image",
+    "/voice/transcribe": "audio",
+}
+
+INGEST_METRICS: Dict[str, int] = {
+    "accepted": 0,
+    "rejected_size": 0,
+    "rejected_format": 0,
+}
+
+
+# -------------------------------------------------------------------
+# Header sniffing
+# -------------------------------------------------------------------
+
+
+def sniff_image(head: bytes) -> Optional[str]:
+    """
+    Image format from the first bytes of the file (formats remove.bg accepts).
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def sniff_audio(head: bytes) -> Optional[str]:
+    """
+    Audio container from the first bytes of the file (formats the
+    transcription API accepts).
+    """
+    if head.startswith(b"\x1a\x45\xdf\xa3"):
+        return "webm"
+    if head.startswith(b"OggS"):
+        return "ogg"
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head.startswith(b"fLaC"):
+        return "flac"
+    return None
+
+
+# kind -> (byte limit, sniffer, error detail for an unknown format)
+_KINDS = {
+    "image": (ID_PHOTO_MAX_BYTES, sniff_image, "صيغة الصورة غير مدعومة (JPEG أو PNG أو WEBP)."),
+    "audio": (AUDIO_MAX_BYTES, sniff_audio, "Unsupported audio format"),
+}
+_TOO_LARGE = {
+    "image": "حجم الصورة أكبر من الحد المسموح.",
+    "audio": "Audio file too large",
+}
+_EMPTY = {
+    "image": "الملف فارغ.",
+    "audio": "Empty audio file",
+}
+
+
+# -------------------------------------------------------------------
+# Upload checks
+# -------------------------------------------------------------------
+
+
+class IngestedUpload:
+    """
+    The file the multipart parser spooled for an upload (in memory up to
+    1 MB, on disk beyond), with its size, sha256 and the format detected
+    from its header. Owns the file: call close() when done.
+    """
+
+    def __init__(
+        self,
+        file: BinaryIO,
+        filename: str,
+        content_type: str,
+        fmt: str,
+        size: int,
+        sha256: str,
+    ) -> None:
+        self.file = file
+        self.filename = filename
+        self.content_type = content_type
+        self.format = fmt
+        self.size = size
+        self.sha256 = sha256
+
+    def rewind(self):
+        self.file.seek(0)
+        return self.file
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def ingest_upload(upload: UploadFile, kind: str) -> IngestedUpload:
+    """
+    Check and hash an UploadFile in place, in chunks.
+
+    - kind "image" or "audio" selects the byte limit and header check.
+    - The body has already been received and spooled by the multipart
+      parser; UploadLimitMiddleware refused oversized bodies and bad file
+      headers while it arrived. Both are checked again here (400 for a bad
+      header, 413 over the per-kind limit), since the middleware only sees
+      the header when the file part starts near the top of the body.
+    - The spooled file is taken over from the UploadFile, so it outlives
+      the request (background photo jobs) until IngestedUpload.close().
+    """
+    max_bytes, sniff, bad_format = _KINDS[kind]
+
+    first = await upload.read(CHUNK_SIZE)
+    if not first:
+        raise HTTPException(status_code=400, detail=_EMPTY[kind])
+
+    fmt = sniff(first)
+    if fmt is None:
+        INGEST_METRICS["rejected_format"] += 1
+        raise HTTPException(status_code=400, detail=bad_format)
+
+    digest = hashlib.sha256()
+    size = 0
+    chunk = first
+    while chunk:
+        size += len(chunk)
+        if size > max_bytes:
+            INGEST_METRICS["rejected_size"] += 1
+            raise HTTPException(status_code=413, detail=_TOO_LARGE[kind])
+        digest.update(chunk)
+        chunk = await upload.read(CHUNK_SIZE)
+
+    await upload.seek(0)
+    # Detach the file: FastAPI closes the form's UploadFiles when the
+    # endpoint returns
+    file, upload.file = upload.file, io.BytesIO()
+    INGEST_METRICS["accepted"] += 1
+    return IngestedUpload(
+        file=file,
+        filename=upload.filename or "upload",
+        content_type=upload.content_type or "application/octet-stream",
+        fmt=fmt,
+        size=size,
+        sha256=digest.hexdigest(),
+    )
+
+
+def ingest_stats() -> Dict[str, int]:
+    """
+    Counters for the /metrics endpoint.
+    """
+    return dict(INGEST_METRICS)
+
+
+# -------------------------------------------------------------------
+# Request body checks (before multipart parsing)
+# -------------------------------------------------------------------
+
+
+def _multipart_boundary(headers: Dict[bytes, bytes]) -> Optional[bytes]:
+    content_type = headers.get(b"content-type", b"").decode("latin-1")
+    mime, _, params = content_type.partition(";")
+    if mime.strip().lower() != "multipart/form-data":
+        return None
+    for param in params.split(";"):
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "boundary" and value:
+            return value.strip('"').encode("latin-1")
+    return None
+
+
+def _file_part_head(body: bytes, boundary: bytes) -> Optional[bytes]:
+    """
+    First SNIFF_BYTES of the first file part of a multipart body, given the
+    start of that body; None while `body` does not reach that far.
+    """
+    delimiter = b"--" + boundary
+    pos = body.find(delimiter)
+    while pos != -1:
+        headers_start = pos + len(delimiter) + 2  # delimiter + CRLF
+        headers_end = body.find(b"\r\n\r\n", headers_start)
+        if headers_end == -1:
+            return None
+        data_start = headers_end + 4
+        next_pos = body.find(b"\r\n" + delimiter, data_start)
+
+        if b"filename=" in body[headers_start:headers_end].lower():
+            if next_pos != -1:
+                return body[data_start:next_pos][:SNIFF_BYTES]
+            if len(body) - data_start >= SNIFF_BYTES:
+                return body[data_start:data_start + SNIFF_BYTES]
+            return None
+
+        if next_pos == -1:
+            return None
+        pos = next_pos + 2
+    return None
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware checking request bodies on the upload endpoints while
+    they are received, before the multipart parser has spooled them:
+
+    - a Content-Length over the kind's limit is answered with 413 right
+      away; otherwise (e.g. chunked bodies) bytes are counted as they
+      arrive and the request is cut off with 413 once the limit is crossed;
+    - the start of the body is kept until the first file part's header
+      shows up, and a file that is not of the expected kind is cut off
+      with 400, after at most MULTIPART_OVERHEAD bytes.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        kind = None
+        if scope["type"] == "http" and scope.get("method") == "POST":
+            kind = UPLOAD_PATH_KINDS.get(scope["path"])
+        if kind is None:
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes, sniff, bad_format = _KINDS[kind]
+        limit = max_bytes + MULTIPART_OVERHEAD
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            INGEST_METRICS["rejected_size"] += 1
+            await self._send_error(send, 413, "Request body too large")
+            return
+
+        boundary = _multipart_boundary(headers)
+        prefix = b""
+        received = 0
+        refused: Optional[Tuple[int, str]] = None  # (status, detail)
+        response_started = False
+
+        def check(message) -> Optional[Tuple[int, str]]:
+            nonlocal boundary, prefix, received
+            body = message.get("body", b"")
+            received += len(body)
+            if received > limit:
+                INGEST_METRICS["rejected_size"] += 1
+                return 413, "Request body too large"
+
+            if boundary is None:
+                return None
+            prefix += body
+            head = _file_part_head(prefix, boundary)
+            if head is None and len(prefix) <= MULTIPART_OVERHEAD and message.get("more_body"):
+                return None
+            # Decided (or gave up: ingest_upload checks the header again)
+            boundary, prefix = None, b""
+            if head and sniff(head) is None:
+                INGEST_METRICS["rejected_format"] += 1
+                return 400, bad_format
+            return None
+
+        async def checked_receive():
+            nonlocal refused
+            message = await receive()
+            if message["type"] == "http.request" and refused is None:
+                refused = check(message)
+                if refused is not None:
+                    # Looks like a disconnect to the body parser: stop reading
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if refused is not None:
+                # Replace whatever error the app produced
+                if not response_started and message["type"] == "http.response.start":
+                    response_started = True
+                    await self._send_error(send, *refused)
+                return
+            response_started = response_started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, checked_receive, guarded_send)
+        except Exception:
+            if refused is None:
+                raise
+            if not response_started:
+                await self._send_error(send, *refused)
+
+    @staticmethod
+    async def _send_error(send, status: int, detail: str) -> None:
+        body = json.dumps({"detail": detail}, ensure_ascii=False, separators=(",", ":"))
+        body = body.encode("utf-8")
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+        ]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
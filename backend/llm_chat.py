@@ -1,27 +1,146 @@
 # backend/llm_chat.py
+import asyncio
+import statistics
+import time
 import uuid
+from collections import deque
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
 
-from absher_agent import build_absher_agent
-from models import ChatResponse, Notification, ProposedAction, User
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+
+from absher_agent import get_absher_agent
+from chat_memory import SessionMemory, count_tokens
+from config import CHAT_MAX_CONCURRENCY, FAQ_ROUTER_ENABLED
+from faq_router import answer_faq, detect_language
+from models import SERVICE_LABELS, ChatResponse, Notification, ProposedAction, User
 from pricing import get_service_fee
+from renewal_flow import (
+    clear_pending_renewal,
+    take_confirmed_renewal,
+    update_after_agent_reply,
+)
+from store import USERS, register_session_evict_hook
+
+
+# Fetches the notifications passed to the agent as context. Only called
+# when the agent actually runs (fast paths skip the lookup and its embedding).
+NotificationsLoader = Callable[[], Awaitable[List[Notification]]]
+
+# Per-session conversation memory, kept outside the shared agent.
+# Keyed by session_id (the user_id used by the frontend/backend APIs).
+_SESSION_MEMORY: Dict[str, SessionMemory] = {}
+
+# Bounds concurrent agent runs (each one holds LLM/tool calls in flight)
+_CHAT_SEMAPHORE = asyncio.Semaphore(CHAT_MAX_CONCURRENCY)
+
+# Strong refs to fire-and-forget memory compaction tasks
+_COMPACTION_TASKS: Set[asyncio.Task] = set()
+
+CHAT_METRICS: Dict[str, int] = {
+    "messages": 0,
+    "faq_answered": 0,
+    "renewal_fast_path": 0,
+    "agent_runs": 0,
+    "agent_llm_calls": 0,
+}
+
+# Recent end-to-end latencies (seconds) per path, for the p50 in chat_stats
+LATENCY_SAMPLES = 1000
+_LATENCIES: Dict[str, Deque[float]] = {
+    "faq": deque(maxlen=LATENCY_SAMPLES),
+    "renewal": deque(maxlen=LATENCY_SAMPLES),
+    "agent": deque(maxlen=LATENCY_SAMPLES),
+}
+
+
+def _drop_session_memory(session_id: str) -> None:
+    _SESSION_MEMORY.pop(session_id, None)
+
+
+register_session_evict_hook(_drop_session_memory)
+
 
+def _get_memory(session_id: str) -> SessionMemory:
+    memory = _SESSION_MEMORY.get(session_id)
+    if memory is None:
+        memory = SessionMemory()
+        _SESSION_MEMORY[session_id] = memory
+    return memory
 
-# Simple in-memory cache of agents per session user (for demo)
-# Keyed by session_id (the user_id used by the frontend/backend APIs)
-_AGENTS: Dict[str, Any] = {}
 
+def _history(session_id: str) -> List[BaseMessage]:
+    memory = _SESSION_MEMORY.get(session_id)
+    return memory.messages() if memory is not None else []
 
-def _get_agent_for_user(session_id: str):
+
+def _remember_turn(session_id: str, message: str, reply_text: str) -> None:
+    """
+    Store the raw user message (not the context preamble) and the reply.
+    Summarizing older turns happens in the background, off the response path.
+    Nothing is stored for a session evicted while its turn was running
+    (no evict hook would ever free it).
+    """
+    if session_id not in USERS:
+        return
+
+    memory = _get_memory(session_id)
+    if memory.add_turn(message, reply_text):
+        task = asyncio.create_task(memory.compact())
+        _COMPACTION_TASKS.add(task)
+        task.add_done_callback(_COMPACTION_TASKS.discard)
+
+
+def _log_prompt_tokens(session_id: str, agent_input: str, history: List[BaseMessage]) -> None:
+    history_tokens = sum(count_tokens(str(m.content)) for m in history)
+    input_tokens = count_tokens(agent_input)
+    print(
+        f"[CHAT] session={session_id} prompt_tokens~{history_tokens + input_tokens} "
+        f"(history={history_tokens}, input={input_tokens})"
+    )
+
+
+class _LLMCallCounter(BaseCallbackHandler):
     """
-    Return a cached agent for the session_id, building it on first use.
+    Counts the LLM calls made during agent runs (one per agent step).
     """
-    agent = _AGENTS.get(session_id)
-    if agent is None:
-        agent = build_absher_agent()
-        _AGENTS[session_id] = agent
-    return agent
+
+    run_inline = True
+
+    def on_llm_start(self, serialized, prompts, **kwargs) -> None:
+        CHAT_METRICS["agent_llm_calls"] += 1
+
+    def on_chat_model_start(self, serialized, messages, **kwargs) -> None:
+        CHAT_METRICS["agent_llm_calls"] += 1
+
+
+_LLM_CALL_COUNTER = _LLMCallCounter()
+
+
+def _record_latency(path: str, started: float) -> None:
+    _LATENCIES[path].append(time.perf_counter() - started)
+
+
+def _answer_from_faq(session_id: str, message: str) -> Optional[ChatResponse]:
+    """
+    Reply to a plain knowledge question from the precomputed FAQ (no LLM
+    call), or None to let the agent handle the message.
+    """
+    if not FAQ_ROUTER_ENABLED:
+        return None
+
+    match = answer_faq(message)
+    if match is None:
+        return None
+
+    section_id, answer = match
+    print(f"[CHAT] session={session_id} answered from FAQ section '{section_id}'")
+    CHAT_METRICS["faq_answered"] += 1
+    # A renewal offer only stands for the message right after it
+    clear_pending_renewal(session_id)
+    _remember_turn(session_id, message, answer)
+    return ChatResponse(reply=answer)
 
 
 def build_notifications_context(notifs: List[Notification]) -> str:
@@ -122,26 +241,53 @@ def _proposed_action_from_tool_input(tool_input: dict) -> ProposedAction:
     )
 
 
+def _renew_from_confirmation(user: User, session_id: str, message: str) -> Optional[ChatResponse]:
+    """
+    Explicit confirmation of the renewal the agent just offered: build the
+    ProposedAction the submit_renewal_request tool call would have produced,
+    without running the agent. None when the agent should handle the message.
+    """
+    service_type = take_confirmed_renewal(session_id, user, message)
+    if service_type is None:
+        return None
+
+    name_ar, name_en = SERVICE_LABELS[service_type]
+    if detect_language(message) == "ar":
+        reply = (
+            f"تم إرسال طلب تجديد {name_ar}. يرجى إكمال الدفع من النافذة الظاهرة، "
+            "وسيتم احتساب الرسوم الرسمية تلقائيًا من نظام أبشر."
+        )
+    else:
+        reply = (
+            f"Your {name_en} renewal request has been submitted. Please complete the payment "
+            "in the window shown; the official fee is calculated automatically by the Absher system."
+        )
+
+    print(f"[CHAT] session={session_id} renewal of {service_type} confirmed without the agent")
+    CHAT_METRICS["renewal_fast_path"] += 1
+    _remember_turn(session_id, message, reply)
+    return ChatResponse(
+        reply=reply,
+        proposed_action=_proposed_action_from_tool_input(
+            {"service_type": service_type, "reason": f"تجديد {name_ar}."}
+        ),
+    )
+
 
-async def handle_chat(
+def _build_agent_input(
     user: User,
     session_id: str,
     message: str,
     notifications: List[Notification],
-) -> ChatResponse:
+) -> str:
     """
-    Main chat handler using the AbsherAgent (AgentType.OPENAI_FUNCTIONS).
-
-    It:
-    - Builds a structured input containing user data, service status, and notifications.
-    - Calls the agent synchronously (LangChain AgentExecutor).
-    - Extracts any submit_renewal_request tool call as a ProposedAction
-      for the UI popup.
+    Build the structured agent input: user data, service status,
+    notifications and the user's message.
     """
     notifications_context = build_notifications_context(notifications)
     services_status = build_services_status(user)
 
-    agent_input = f"""
+    return f"""
 Internal user_id (for tools): {session_id}
 National ID: {user.national_id}
 User name: {user.name}
@@ -156,12 +302,12 @@ User message:
 {message}
 """.strip()
 
-    agent = _get_agent_for_user(session_id)
-    result = agent({"input": agent_input})
-
-    reply_text: str = result.get("output", "")
-    proposed_action: Optional[ProposedAction] = None
 
+def _extract_proposed_action(result: Dict[str, Any]) -> Optional[ProposedAction]:
+    """
+    Turn a successful submit_renewal_request tool call (if any) from the
+    agent's intermediate steps into a ProposedAction for the UI popup.
+    """
     # intermediate_steps: List[Tuple[AgentAction, Any]]
     intermediate_steps: List[Tuple[Any, Any]] = result.get("intermediate_steps", [])
 
@@ -176,11 +322,175 @@ User message:
             tool_input = getattr(action, "tool_input", {}) or {}
 
             if isinstance(tool_input, dict):
-                proposed_action = _proposed_action_from_tool_input(tool_input)
-                break
+                return _proposed_action_from_tool_input(tool_input)
+
+    return None
+
+
+async def handle_chat(
+    user: User,
+    session_id: str,
+    message: str,
+    load_notifications: NotificationsLoader,
+) -> ChatResponse:
+    """
+    Main chat handler using the AbsherAgent (AgentType.OPENAI_FUNCTIONS).
+
+    It:
+    - Answers an explicit "yes" to a pending renewal offer (renewal_flow)
+      and plain knowledge questions with a confident FAQ match
+      (faq_router) without running the agent.
+    - Builds a structured input containing user data, service status, and
+      notifications (looked up via load_notifications only at this point).
+    - Calls the agent asynchronously (AgentExecutor.ainvoke), so the event
+      loop keeps serving other requests during LLM/tool round-trips.
+    - Extracts any submit_renewal_request tool call as a ProposedAction
+      for the UI popup.
+    """
+    started = time.perf_counter()
+    CHAT_METRICS["messages"] += 1
+
+    renewal_response = _renew_from_confirmation(user, session_id, message)
+    if renewal_response is not None:
+        _record_latency("renewal", started)
+        return renewal_response
+
+    faq_response = _answer_from_faq(session_id, message)
+    if faq_response is not None:
+        _record_latency("faq", started)
+        return faq_response
+
+    notifications = await load_notifications()
+    agent_input = _build_agent_input(user, session_id, message, notifications)
+
+    agent = get_absher_agent()
+    history = _history(session_id)
+    _log_prompt_tokens(session_id, agent_input, history)
+
+    CHAT_METRICS["agent_runs"] += 1
+    async with _CHAT_SEMAPHORE:
+        result = await agent.ainvoke(
+            {"input": agent_input, "chat_history": history},
+            config={"callbacks": [_LLM_CALL_COUNTER]},
+        )
 
+    reply_text: str = result.get("output", "")
+    proposed_action = _extract_proposed_action(result)
+    _remember_turn(session_id, message, reply_text)
+    update_after_agent_reply(session_id, reply_text, proposed_action is not None)
+    _record_latency("agent", started)
 
     return ChatResponse(
         reply=reply_text,
         proposed_action=proposed_action,
     )
+
+
+async def stream_chat(
+    user: User,
+    session_id: str,
+    message: str,
+    load_notifications: NotificationsLoader,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streaming variant of handle_chat. Yields (event, data) pairs:
+
+    - ("token", {"text": ...})            LLM output tokens as they arrive
+    - ("tool_start", {"tool": ...})       a tool call started
+    - ("tool_end", {"tool": ...})         a tool call finished
+    - ("proposed_action", ProposedAction) if a renewal was submitted
+    - ("done", ChatResponse)              final reply (same as /chat)
+
+    FAQ answers and confirmed renewals (no agent run) arrive as a single
+    token event.
+    """
+    started = time.perf_counter()
+    CHAT_METRICS["messages"] += 1
+
+    renewal_response = _renew_from_confirmation(user, session_id, message)
+    if renewal_response is not None:
+        _record_latency("renewal", started)
+        yield "token", {"text": renewal_response.reply}
+        yield "proposed_action", renewal_response.proposed_action.model_dump(mode="json")
+        yield "done", renewal_response.model_dump(mode="json")
+        return
+
+    faq_response = _answer_from_faq(session_id, message)
+    if faq_response is not None:
+        _record_latency("faq", started)
+        yield "token", {"text": faq_response.reply}
+        yield "done", faq_response.model_dump(mode="json")
+        return
+
+    notifications = await load_notifications()
+    agent_input = _build_agent_input(user, session_id, message, notifications)
+
+    agent = get_absher_agent()
+    history = _history(session_id)
+    _log_prompt_tokens(session_id, agent_input, history)
+    result: Dict[str, Any] = {}
+
+    CHAT_METRICS["agent_runs"] += 1
+    async with _CHAT_SEMAPHORE:
+        payload = {"input": agent_input, "chat_history": history}
+        config = {"callbacks": [_LLM_CALL_COUNTER]}
+        async for event in agent.astream_events(payload, config=config, version="v2"):
+            kind = event["event"]
+
+            if kind == "on_chat_model_stream":
+                text = event["data"]["chunk"].content
+                if text:
+                    yield "token", {"text": text}
+            elif kind == "on_tool_start":
+                yield "tool_start", {"tool": event["name"]}
+            elif kind == "on_tool_end":
+                yield "tool_end", {"tool": event["name"]}
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                # Root AgentExecutor run: same dict ainvoke() would return
+                result = event["data"].get("output") or {}
+
+    response = ChatResponse(
+        reply=result.get("output", ""),
+        proposed_action=_extract_proposed_action(result),
+    )
+    _remember_turn(session_id, message, response.reply)
+    update_after_agent_reply(session_id, response.reply, response.proposed_action is not None)
+    _record_latency("agent", started)
+
+    if response.proposed_action is not None:
+        yield "proposed_action", response.proposed_action.model_dump(mode="json")
+
+    yield "done", response.model_dump(mode="json")
+
+
+def _p50(samples) -> Optional[float]:
+    return round(statistics.median(samples), 4) if samples else None
+
+
+def chat_stats() -> Dict[str, Any]:
+    """
+    Counters for the /metrics endpoint: how many messages skipped the agent
+    (FAQ answers, confirmed renewals), LLM calls per message vs per agent run, and p50 latency
+    (seconds) per path over the last LATENCY_SAMPLES messages.
+    """
+    messages = CHAT_METRICS["messages"]
+    runs = CHAT_METRICS["agent_runs"]
+    llm_calls = CHAT_METRICS["agent_llm_calls"]
+    per_message = llm_calls / messages if messages else None
+    per_run = llm_calls / runs if runs else None
+
+    return {
+        **CHAT_METRICS,
+        "llm_calls_per_message": round(per_message, 3) if per_message is not None else None,
+        "llm_calls_per_agent_run": round(per_run, 3) if per_run is not None else None,
+        # Share of LLM calls avoided compared with sending every message to the agent
+        "llm_calls_saved_ratio": (
+            round(1 - per_message / per_run, 3) if per_message is not None and per_run else None
+        ),
+        "p50_latency_seconds": {
+            "faq": _p50(_LATENCIES["faq"]),
+            "renewal": _p50(_LATENCIES["renewal"]),
+            "agent": _p50(_LATENCIES["agent"]),
+            "all": _p50([t for samples in _LATENCIES.values() for t in samples]),
+        },
+    }
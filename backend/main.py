@@ -1,54 +1,98 @@
 # backend/main.py
+import asyncio
+import hmac
+import json
 import os
-import io
 import uuid
-from typing import Dict, List
-from pathlib import Path
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-import requests
-from PIL import Image
-
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import FastAPI, File, Form, Header, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
-from fastapi.staticfiles import StaticFiles
-
-from config import audio_client
-from llm_chat import handle_chat
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+
+from absher_agent import get_absher_agent
+from absher_rag import (
+    get_absher_index,
+    get_absher_lexical_index,
+    rag_stats,
+    reload_absher_index,
+    watch_knowledge_file,
+)
+from background import background_stats, enqueue, start_workers, stop_workers
+from chat_memory import memory_stats
+from id_photo import (
+    UPLOAD_DIR,
+    UploadStaticFiles,
+    background_removal_needs_api_key,
+    close_http_client,
+    get_photo_job,
+    photo_cache_stats,
+    photo_pipeline_stats,
+    run_id_photo_upload,
+)
+from ingest import UploadLimitMiddleware, ingest_stats, ingest_upload
+from config import (
+    ADMIN_API_TOKEN,
+    FAQ_AUTOBUILD,
+    FAQ_ROUTER_ENABLED,
+    KNOWLEDGE_WATCH_INTERVAL_SECONDS,
+    SMS_TEMPLATE_PREWARM,
+    audio_client,
+    embeddings,
+)
+from faq_router import build_faq, faq_stats, get_faq_router
+from llm_chat import chat_stats, handle_chat, stream_chat
 from models import (
+    SERVICE_NAME_AR,
     ChatRequest,
     ChatResponse,
     ConfirmActionRequest,
     ConfirmActionResponse,
     LoginRequest,
     LoginResponse,
+    Notification,
     NotificationOut,
     PaymentRequest,
     PaymentResponse,
+    PhotoJobStatus,
     TextToSpeechRequest,
     UploadMediaResponse,
 )
-from notification_ai import generate_login_summary_messages
-from proactive import run_proactive_for_user
+from notification_ai import (
+    generate_login_summary_messages,
+    prewarm_sms_templates,
+    sms_template_stats,
+)
+from proactive import (
+    EXPIRY_SMS_THRESHOLD_DAYS,
+    proactive_stats,
+    run_proactive_for_user,
+    start_proactive_scheduler,
+    stop_proactive_scheduler,
+)
+from renewal_flow import clear_pending_renewal, renewal_flow_stats
 from store import (
+    SERVICE_NAMES,
     USERS,
-    add_notification,
-    add_user_media,
+    aadd_notification,
+    asearch_notifications,
     create_session_user_from_template,
+    evict_idle_sessions,
+    expiry_timeline_stats,
     get_user_by_username,
     get_user_notifications,
+    get_user_notifications_since,
+    notification_push_stats,
     renew_specific_service_for_user,
-    search_notifications,
+    session_stats,
+    subscribe_notifications,
+    touch_session,
+    unsubscribe_notifications,
 )
 
 
-SERVICE_NAME_AR: Dict[str, str] = {
-    "National ID": "الهوية الوطنية",
-    "Driver License": "رخصة القيادة",
-    "Vehicle Registration": "استمارة المركبة",
-    "Passport": "جواز السفر",
-}
-
 app = FastAPI(title="Absher Proactive Agent Backend")
 
 # allow your Vite frontend in dev
@@ -67,10 +111,101 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-UPLOAD_DIR = Path(__file__).with_name("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
+# Refuse oversized uploads before they are parsed (limits in ingest.py)
+app.add_middleware(UploadLimitMiddleware)
+
+app.mount("/uploads", UploadStaticFiles(directory=UPLOAD_DIR), name="uploads")
+
+
+@app.on_event("startup")
+async def warm_up() -> None:
+    """
+    Load (or build) the Absher knowledge index and the shared agent before
+    serving traffic, so the first chat does not pay for them.
+    """
+    try:
+        await asyncio.to_thread(get_absher_index)
+        await asyncio.to_thread(get_absher_lexical_index)
+        await asyncio.to_thread(get_faq_router)
+        get_absher_agent()
+    except Exception as exc:  # noqa: BLE001
+        print(f"[STARTUP] Failed to warm up Absher index: {exc}")
+
+
+SESSION_SWEEP_INTERVAL_SECONDS = 60
+
+_background_tasks: List[asyncio.Task] = []
+# At most one FAQ build at a time (startup, then after each knowledge reload)
+_faq_build_task: Optional[asyncio.Task] = None
+
+
+async def _session_sweeper() -> None:
+    """
+    Periodically evict idle sessions (also done on every login).
+    """
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL_SECONDS)
+        try:
+            evict_idle_sessions()
+        except Exception as exc:  # noqa: BLE001
+            print(f"[SESSIONS] Idle sweep failed: {exc}")
+
+
+@app.on_event("startup")
+async def start_background_tasks() -> None:
+    start_workers()
+    _background_tasks.append(asyncio.create_task(_session_sweeper()))
+    if KNOWLEDGE_WATCH_INTERVAL_SECONDS > 0:
+        _background_tasks.append(
+            asyncio.create_task(watch_knowledge_file(KNOWLEDGE_WATCH_INTERVAL_SECONDS))
+        )
+    start_proactive_scheduler(asyncio.get_running_loop())
+
+    if FAQ_ROUTER_ENABLED and FAQ_AUTOBUILD:
+        _start_faq_build()
+
+    if SMS_TEMPLATE_PREWARM:
+        _background_tasks.append(
+            asyncio.create_task(
+                prewarm_sms_templates(SERVICE_NAMES.values(), EXPIRY_SMS_THRESHOLD_DAYS)
+            )
+        )
+
+
+def _start_faq_build() -> None:
+    """
+    Start a background FAQ build, replacing one still running (it may have
+    read the knowledge before the latest change).
+    """
+    global _faq_build_task
+
+    if _faq_build_task is not None:
+        _faq_build_task.cancel()
+    _faq_build_task = asyncio.create_task(_build_faq_in_background())
+
+
+async def _build_faq_in_background() -> None:
+    """
+    Generate FAQ answers for sections that have none (or an outdated one);
+    the router picks them up once written. Messages go to the agent meanwhile.
+    """
+    try:
+        await build_faq()
+    except Exception as exc:  # noqa: BLE001
+        print(f"[STARTUP] Failed to generate FAQ answers: {exc}")
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks() -> None:
+    stop_proactive_scheduler()
+    for task in _background_tasks:
+        task.cancel()
+    _background_tasks.clear()
+    if _faq_build_task is not None:
+        _faq_build_task.cancel()
+    await stop_workers()
+    await close_http_client()
 
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 # -------------------------------------------------------------------
 # Utility helpers
@@ -81,9 +216,29 @@ def _get_session_user_or_404(user_id: str):
     user = USERS.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    touch_session(user_id)
     return user
 
 
+def _sse(event: str, data: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    """
+    Format one Server-Sent Event.
+    """
+    id_line = f"id: {event_id}\n" if event_id else ""
+    return f"{id_line}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _chat_notifications(payload: ChatRequest) -> List[Notification]:
+    """
+    Notifications passed to the agent as context: the ones most similar
+    to the message, or all of them if the index has nothing.
+    """
+    similar_notifs = await asearch_notifications(payload.user_id, payload.message, k=3)
+    if not similar_notifs:
+        similar_notifs = get_user_notifications(payload.user_id)
+    return similar_notifs
+
+
 def _notification_to_out(n) -> NotificationOut:
     return NotificationOut(
         id=n.id,
@@ -103,16 +258,21 @@ def _notification_to_out(n) -> NotificationOut:
 async def upload_id_photo(
     user_id: str = Form(...),
     file: UploadFile = File(...),
-) -> UploadMediaResponse:
+):
     """
     Upload a user photo to be used for National ID renewal (demo only).
 
     Steps:
     - Validate it's an image
-    - Call remove.bg to remove the background and replace with white
+    - Remove the background and replace with white (remove.bg, or the
+      local CPU backend when BG_REMOVAL_BACKEND=local)
     - Center-crop the result to 6x8 (3:4 aspect ratio), always
     - Resize to a fixed ID-friendly resolution (600x800)
     - Save to disk and register via add_user_media
+
+    If the pipeline takes longer than ID_PHOTO_SYNC_WAIT_SECONDS, it keeps
+    running in the background and a 202 with a PhotoJobStatus is returned;
+    poll /upload/id-photo/jobs/{job_id} for the result.
     """
     _get_session_user_or_404(user_id)
 
@@ -122,130 +282,38 @@ async def upload_id_photo(
             detail="الملف يجب أن يكون صورة (image/*).",
         )
 
-    contents = await file.read()
-    if not contents:
-        raise HTTPException(status_code=400, detail="الملف فارغ.")
-
-    # Get remove.bg API key from environment
+    # Get remove.bg API key from environment (not needed by the local backend)
     removebg_api_key = os.getenv("REMOVEBG_API_KEY")
-    if not removebg_api_key:
+    if not removebg_api_key and background_removal_needs_api_key():
         raise HTTPException(
             status_code=500,
             detail="خدمة إزالة الخلفية غير مفعلة (REMOVEBG_API_KEY مفقود).",
         )
 
-    # --- Call remove.bg API ---
-    # - bg_color=ffffff: white background
-    # - crop=true + crop_margin: trim empty space but keep some margin around subject
-    try:
-        response = requests.post(
-            "https://api.remove.bg/v1.0/removebg",
-            headers={"X-Api-Key": removebg_api_key},
-            files={"image_file": ("upload", contents, file.content_type)},
-            data={
-                "size": "auto",
-                "crop": "true",
-                "crop_margin": "10%",
-                "bg_color": "ffffff",
-                # You can tune scale to zoom in/out globally if needed:
-                # "scale": "80%",
-            },
-            timeout=30,
-        )
-    except requests.RequestException as exc:
-        print("[UPLOAD] remove.bg request error:", exc)
-        raise HTTPException(
-            status_code=502,
-            detail="تعذر الاتصال بخدمة إزالة الخلفية.",
-        ) from exc
+    # Size check + hash on the parsed upload; the image header is checked first
+    upload = await ingest_upload(file, kind="image")
 
-    if response.status_code != 200:
-        print("[UPLOAD] remove.bg error:", response.status_code, response.text)
-        raise HTTPException(
-            status_code=502,
-            detail="فشل في إزالة خلفية الصورة. الرجاء المحاولة لاحقاً.",
-        )
-
-    processed_bytes = response.content
-    if not processed_bytes:
-        raise HTTPException(
-            status_code=502,
-            detail="خدمة إزالة الخلفية لم ترجع صورة صالحة.",
-        )
-
-    # --- Open processed image with Pillow ---
-    try:
-        img = Image.open(io.BytesIO(processed_bytes))
-    except Exception as exc:  # noqa: BLE001
-        print("[UPLOAD] Failed to open processed image:", exc)
-        raise HTTPException(
-            status_code=502,
-            detail="فشل في قراءة الصورة بعد إزالة الخلفية.",
-        ) from exc
-
-    # Ensure RGB (remove.bg may return PNG with alpha)
-    if img.mode not in ("RGB", "L"):
-        img = img.convert("RGB")
-
-    # --- Center crop to 6x8 (3:4 aspect ratio), always ---
-    # 6x8 => aspect ratio width/height = 3/4 = 0.75
-    target_ratio = 3 / 4  # width / height
-
-    width, height = img.size
-    if height == 0 or width == 0:
-        raise HTTPException(
-            status_code=500,
-            detail="الصورة الناتجة غير صالحة (أبعاد صفرية).",
-        )
-
-    current_ratio = width / height
-
-    if current_ratio > target_ratio:
-        # Image is too wide -> crop width
-        new_width = int(height * target_ratio)
-        left = (width - new_width) // 2
-        right = left + new_width
-        top = 0
-        bottom = height
-    elif current_ratio < target_ratio:
-        # Image is too tall -> crop height
-        new_height = int(width / target_ratio)
-        top = (height - new_height) // 2
-        bottom = top + new_height
-        left = 0
-        right = width
-    else:
-        # Already exactly 3:4 -> we still crop a bit to "zoom" slightly
-        zoom_factor = 0.9  # keep 90% of width/height
-        new_width = int(width * zoom_factor)
-        new_height = int(height * zoom_factor)
-        left = (width - new_width) // 2
-        top = (height - new_height) // 2
-        right = left + new_width
-        bottom = top + new_height
+    result = await run_id_photo_upload(
+        user_id=user_id,
+        upload=upload,
+        api_key=removebg_api_key,
+    )
 
-    img = img.crop((left, top, right, bottom))
+    if isinstance(result, PhotoJobStatus):
+        return JSONResponse(status_code=202, content=result.model_dump())
 
-    # --- Resize to fixed ID-style dimensions (still 3:4) ---
-    target_size = (600, 800)  # (width, height)
-    img = img.resize(target_size, Image.LANCZOS)
+    return UploadMediaResponse(media_id=result.id, kind=result.kind, variants=result.variants)
 
-    # --- Save final image to disk as JPEG ---
-    filename = f"{user_id}_{uuid.uuid4().hex}.jpg"
-    out_path = UPLOAD_DIR / filename
 
-    try:
-        img.save(out_path, format="JPEG", quality=90)
-    except Exception as exc:  # noqa: BLE001
-        print("[UPLOAD] Failed to save processed image:", exc)
-        raise HTTPException(
-            status_code=500,
-            detail="فشل حفظ الصورة بعد المعالجة.",
-        ) from exc
-
-    media = add_user_media(user_id=user_id, kind="id_photo", filename=filename)
-
-    return UploadMediaResponse(media_id=media.id, kind=media.kind)
+@app.get("/upload/id-photo/jobs/{job_id}", response_model=PhotoJobStatus)
+async def get_id_photo_job(job_id: str) -> PhotoJobStatus:
+    """
+    Status of a background ID photo job (see /upload/id-photo).
+    """
+    job = get_photo_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 # -------------------------------------------------------------------
@@ -258,21 +326,64 @@ async def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
-@app.post("/login", response_model=LoginResponse)
-async def login(payload: LoginRequest) -> LoginResponse:
-    template_user = get_user_by_username(payload.username)
-    if not template_user or template_user.password != payload.password:
-        raise HTTPException(status_code=401, detail="Invalid credentials")
+@app.post("/admin/knowledge/reload")
+async def reload_knowledge(x_admin_token: Optional[str] = Header(default=None)) -> Dict[str, Any]:
+    """
+    Re-read knowledge/absher_knowledge.json and hot-swap the RAG index,
+    re-embedding only the sections that were added or changed. Searches
+    in flight finish on the previous index.
+    """
+    if ADMIN_API_TOKEN is None or not hmac.compare_digest(x_admin_token or "", ADMIN_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
 
-    session_id = create_session_user_from_template(template_user)
+    try:
+        result = await asyncio.to_thread(reload_absher_index)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
-    # 1) In-app login summary (synchronous)
+    if result["status"] == "reloaded" and FAQ_ROUTER_ENABLED and FAQ_AUTOBUILD:
+        # FAQ answers of changed sections are ignored until regenerated
+        _start_faq_build()
+    return result
+
+
+@app.get("/metrics")
+async def metrics() -> Dict[str, Any]:
+    """
+    In-process counters (cache hit rates, etc.) for monitoring.
+    """
+    return {
+        "chat": chat_stats(),
+        "faq_router": faq_stats(),
+        "renewal_flow": renewal_flow_stats(),
+        "rag": rag_stats(),
+        "embeddings": embeddings.stats(),
+        "sessions": session_stats(),
+        "chat_memory": memory_stats(),
+        "proactive": proactive_stats(),
+        "expiry_timeline": expiry_timeline_stats(),
+        "sms_templates": sms_template_stats(),
+        "background_jobs": background_stats(),
+        "notification_push": notification_push_stats(),
+        "id_photo_cache": photo_cache_stats(),
+        "id_photo_pipeline": photo_pipeline_stats(),
+        "uploads": ingest_stats(),
+    }
+
+
+async def _login_followup(session_id: str) -> None:
+    """
+    Post-login work run by the background workers: in-app login summary and
+    proactive SMS. Results show up via /notifications.
+    """
+    # 1) In-app login summary
     try:
         user_obj = USERS.get(session_id)
         if user_obj:
             in_app_msg, sms_msg = await generate_login_summary_messages(user_obj)
 
-            add_notification(
+            # Embedding for the notification index runs off the event loop
+            await aadd_notification(
                 user_id=session_id,
                 channel="in_app",
                 message=in_app_msg,
@@ -287,6 +398,18 @@ async def login(payload: LoginRequest) -> LoginResponse:
     except Exception as exc:  # noqa: BLE001
         print(f"[LOGIN] Failed to run proactive engine for user {session_id}: {exc}")
 
+
+@app.post("/login", response_model=LoginResponse)
+async def login(payload: LoginRequest) -> LoginResponse:
+    template_user = get_user_by_username(payload.username)
+    if not template_user or template_user.password != payload.password:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    session_id = create_session_user_from_template(template_user)
+
+    # Summary + proactive SMS are LLM-bound: do them off the request path
+    await enqueue("login_followup", lambda: _login_followup(session_id))
+
     return LoginResponse(
         user_id=session_id,
         name=template_user.name,
@@ -303,30 +426,127 @@ async def chat_endpoint(payload: ChatRequest) -> ChatResponse:
     """
     user = _get_session_user_or_404(payload.user_id)
 
-    similar_notifs = search_notifications(payload.user_id, payload.message, k=3)
-    if not similar_notifs:
-        similar_notifs = get_user_notifications(payload.user_id)
-
     return await handle_chat(
         user=user,
         session_id=payload.user_id,
         message=payload.message,
-        notifications=similar_notifs,
+        load_notifications=lambda: _chat_notifications(payload),
+    )
+
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(payload: ChatRequest) -> StreamingResponse:
+    """
+    Same as /chat, but streams the agent run as Server-Sent Events:
+    token, tool_start, tool_end, proposed_action and a final done event
+    carrying the full ChatResponse.
+    """
+    user = _get_session_user_or_404(payload.user_id)
+
+    async def event_source() -> AsyncIterator[str]:
+        try:
+            async for event, data in stream_chat(
+                user=user,
+                session_id=payload.user_id,
+                message=payload.message,
+                load_notifications=lambda: _chat_notifications(payload),
+            ):
+                yield _sse(event, data)
+        except Exception as exc:  # noqa: BLE001
+            print(f"[CHAT] Stream failed for user {payload.user_id}: {exc}")
+            yield _sse("error", {"detail": "Chat failed"})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
 @app.get("/notifications/{user_id}", response_model=List[NotificationOut])
-async def list_notifications(user_id: str) -> List[NotificationOut]:
+async def list_notifications(
+    user_id: str,
+    since: Optional[str] = None,
+) -> List[NotificationOut]:
     """
-    List all notifications for a given session user.
+    List notifications for a given session user (newest first).
     Used by the frontend to show SMS + in-app history.
+
+    `since` is a notification id cursor: only newer notifications are
+    returned, so polling clients fetch deltas instead of the full history.
     """
     _get_session_user_or_404(user_id)
 
-    notifs = get_user_notifications(user_id)
-    notifs_sorted = sorted(notifs, key=lambda x: x.created_at, reverse=True)
+    # Shards are already sorted by created_at (oldest first)
+    if since:
+        notifs = get_user_notifications_since(user_id, since)
+    else:
+        notifs = get_user_notifications(user_id)
+
+    return [_notification_to_out(n) for n in reversed(notifs)]
 
-    return [_notification_to_out(n) for n in notifs_sorted]
+
+NOTIFICATION_STREAM_KEEPALIVE_SECONDS = 15
+
+
+@app.get("/notifications/{user_id}/stream")
+async def stream_notifications(
+    user_id: str,
+    request: Request,
+    last_id: Optional[str] = None,
+) -> StreamingResponse:
+    """
+    Push channel for notifications (Server-Sent Events). Each event carries
+    the notification id, so a reconnecting client resumes after the last
+    one it saw (Last-Event-ID header, or the last_id query parameter).
+    Without a cursor the full history is sent first.
+    """
+    _get_session_user_or_404(user_id)
+    cursor = request.headers.get("last-event-id") or last_id
+
+    async def event_source() -> AsyncIterator[str]:
+        nonlocal cursor
+
+        # No await between subscribing and reading the backlog, so nothing
+        # published in between can be missed or sent twice.
+        queue = subscribe_notifications(user_id)
+        backlog = get_user_notifications_since(user_id, cursor)
+
+        try:
+            while True:
+                for n in backlog:
+                    yield _sse("notification", _notification_to_out(n).model_dump(mode="json"), n.id)
+                    cursor = n.id
+                backlog = []
+
+                try:
+                    item = await asyncio.wait_for(
+                        queue.get(), timeout=NOTIFICATION_STREAM_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    if user_id not in USERS:
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+
+                if item is not None:
+                    backlog = [item]
+                    continue
+
+                # Resync marker (overflow) or session evicted
+                if user_id not in USERS:
+                    break
+                while not queue.empty():
+                    queue.get_nowait()
+                backlog = get_user_notifications_since(user_id, cursor)
+        finally:
+            unsubscribe_notifications(user_id, queue)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/confirm-action", response_model=ConfirmActionResponse)
@@ -338,6 +558,8 @@ async def confirm_action(payload: ConfirmActionRequest) -> ConfirmActionResponse
     instead of all expiring services.
     """
     user = _get_session_user_or_404(payload.user_id)
+    # The offer is settled either way; a later "yes" must go through the agent
+    clear_pending_renewal(payload.user_id)
 
     if payload.accepted:
         renewed = renew_specific_service_for_user(
@@ -389,17 +611,13 @@ async def transcribe_audio(audio: UploadFile = File(...)):
     Accepts an audio file (e.g. webm/ogg/mp3) and returns a transcription
     using OpenAI gpt-4o-mini-transcribe.
     """
-    try:
-        raw_bytes = await audio.read()
-        if not raw_bytes:
-            raise HTTPException(status_code=400, detail="Empty audio file")
+    # Size check + hash on the parsed upload; the audio header is checked first
+    upload = await ingest_upload(audio, kind="audio")
 
-        file_obj = io.BytesIO(raw_bytes)
-        file_obj.name = audio.filename or "recording.webm"
-
-        transcript = audio_client.audio.transcriptions.create(
+    try:
+        transcript = await audio_client.audio.transcriptions.create(
             model="gpt-4o-mini-transcribe",
-            file=file_obj,
+            file=(audio.filename or "recording.webm", upload.rewind()),
             response_format="json",
         )
 
@@ -407,6 +625,8 @@ async def transcribe_audio(audio: UploadFile = File(...)):
     except Exception as exc:  # noqa: BLE001
         print("[VOICE] Transcription error:", exc)
         raise HTTPException(status_code=500, detail="Transcription failed") from exc
+    finally:
+        upload.close()
 
 
 # ================================
@@ -417,22 +637,44 @@ async def transcribe_audio(audio: UploadFile = File(...)):
 @app.post("/voice/tts")
 async def text_to_speech(payload: TextToSpeechRequest):
     """
-    Accepts text and returns an MP3 audio blob using gpt-4o-mini-tts.
+    Accepts text and returns MP3 audio using gpt-4o-mini-tts.
+
+    The audio is streamed through as it is generated, so playback can
+    start before synthesis finishes. Errors before the first byte give a
+    500; after that the stream is cut short.
     """
+    stack = AsyncExitStack()
     try:
-        tts_response = audio_client.audio.speech.create(
-            model="gpt-4o-mini-tts",
-            voice="alloy",
-            input=payload.text,
+        tts_response = await stack.enter_async_context(
+            audio_client.audio.speech.with_streaming_response.create(
+                model="gpt-4o-mini-tts",
+                voice="alloy",
+                input=payload.text,
+                response_format="mp3",
+            )
         )
-
-        audio_bytes = tts_response.read()
-        return Response(content=audio_bytes, media_type="audio/mpeg")
-
     except Exception as exc:  # noqa: BLE001
+        await stack.aclose()
         print("[VOICE] TTS error:", exc)
         raise HTTPException(status_code=500, detail="TTS failed") from exc
 
+    async def audio_chunks() -> AsyncIterator[bytes]:
+        async with stack:
+            try:
+                # Relay chunks as they arrive (no re-buffering)
+                async for chunk in tts_response.iter_bytes():
+                    yield chunk
+            except Exception as exc:  # noqa: BLE001
+                print("[VOICE] TTS stream error:", exc)
+
+    # Also closes the upstream response when the body is never iterated
+    # (client gone before the first chunk); aclose() is idempotent
+    return StreamingResponse(
+        audio_chunks(),
+        media_type="audio/mpeg",
+        background=BackgroundTask(stack.aclose),
+    )
+
 
 @app.post("/payment/charge", response_model=PaymentResponse)
 async def charge_payment(payload: PaymentRequest) -> PaymentResponse:
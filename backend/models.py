@@ -1,7 +1,7 @@
 # backend/models.py
 from datetime import datetime
 from enum import Enum
-from typing import Any, Dict, Literal, Optional
+from typing import Any, Dict, Literal, Optional, Tuple
 
 from pydantic import BaseModel, Field
 
@@ -11,12 +11,26 @@ class UserMedia(BaseModel):
     user_id: str          # session_id
     kind: Literal["id_photo", "license_photo", "other"]
     filename: str
+    # variant name ("print", "preview", "thumb") -> filename under /uploads
+    variants: Dict[str, str] = {}
     created_at: datetime
 
 
 class UploadMediaResponse(BaseModel):
     media_id: str
     kind: str
+    variants: Dict[str, str] = {}
+
+
+class PhotoJobStatus(BaseModel):
+    # Returned (HTTP 202) when the photo pipeline is still running;
+    # poll /upload/id-photo/jobs/{job_id} until status is done/failed.
+    job_id: str
+    status: Literal["pending", "done", "failed"]
+    media_id: Optional[str] = None
+    kind: Optional[str] = None
+    variants: Dict[str, str] = {}
+    detail: Optional[str] = None
 
 
 
@@ -34,6 +48,19 @@ class ServiceType(str, Enum):
     VEHICLE = "vehicle_registration"
 
 
+# (Arabic, English) display names per service type; the English name is
+# UserService.service_name
+SERVICE_LABELS: Dict[ServiceType, Tuple[str, str]] = {
+    ServiceType.NATIONAL_ID: ("الهوية الوطنية", "National ID"),
+    ServiceType.LICENSE: ("رخصة القيادة", "Driver License"),
+    ServiceType.VEHICLE: ("استمارة المركبة", "Vehicle Registration"),
+    ServiceType.PASSPORT: ("جواز السفر", "Passport"),
+}
+
+# Arabic name by UserService.service_name
+SERVICE_NAME_AR: Dict[str, str] = {name_en: name_ar for name_ar, name_en in SERVICE_LABELS.values()}
+
+
 class UserService(BaseModel):
     service_type: ServiceType
     service_name: str
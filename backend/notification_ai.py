@@ -1,11 +1,13 @@
 # backend/notification_ai.py
+import asyncio
+import time
 from datetime import datetime, timezone
-from typing import Optional, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 from langchain_core.prompts import ChatPromptTemplate
 
 from config import notification_llm
-from models import User, UserService
+from models import SERVICE_NAME_AR, User, UserService
 
 
 def _build_services_status_for_notifications(user: User) -> str:
@@ -47,8 +49,13 @@ def _build_services_status_for_notifications(user: User) -> str:
 
 
 # -------------------------------------------------
-# Prompt 1: Proactive expiry SMS
+# Prompt 1: Proactive expiry SMS (cached templates)
 # -------------------------------------------------
+# The SMS text only depends on (service_name, status bucket, days_left), so
+# the LLM writes it once per variant with a literal {user_name} placeholder,
+# and the user's name is substituted per recipient.
+USER_NAME_PLACEHOLDER = "{user_name}"
+
 proactive_sms_prompt = ChatPromptTemplate.from_template(
     """
 You are an assistant that writes VERY short SMS messages in Arabic only
@@ -56,14 +63,14 @@ for Absher platform users.
 All output must be in Arabic.
 
 Context:
-- User name: {user_name}
 - Service: {service_name}
 - Current status: {service_status}
-- Days left until expiry: {days_left}
 
 Requirements for the SMS:
 - Max ~160 characters.
 - Start with "مساعد أبشر:".
+- Address the user by name using the placeholder {{user_name}} exactly as
+  written (keep the curly braces, do not translate or fill it in).
 - Use polite and clear Arabic.
 - Mention the service and expiry status.
 - Invite the user to log in or reply to renew.
@@ -72,24 +79,177 @@ Requirements for the SMS:
 """
 )
 
+SmsTemplateKey = Tuple[str, str, Optional[int]]  # (service_name, bucket, days_left)
+
+_SMS_TEMPLATES: Dict[SmsTemplateKey, str] = {}
+_SMS_TEMPLATES_PENDING: Dict[SmsTemplateKey, "asyncio.Future[str]"] = {}
+
+SMS_TEMPLATE_HITS = 0
+SMS_TEMPLATE_MISSES = 0
+SMS_TEMPLATE_FALLBACKS = 0
+
+# LLM attempts per variant before falling back to the fixed template
+SMS_TEMPLATE_ATTEMPTS = 2
+
+# Called with the duration in seconds of each SMS template LLM call
+# (template-cache misses only; hits make no call)
+_SMS_LLM_LATENCY_HOOKS: List[Callable[[float], None]] = []
+
+
+def register_sms_llm_latency_hook(hook: Callable[[float], None]) -> None:
+    _SMS_LLM_LATENCY_HOOKS.append(hook)
+
+def _sms_template_key(service_name: str, days_left: int) -> SmsTemplateKey:
+    """
+    Expired services share one variant; expiring ones get one per day left.
+    """
+    if days_left < 0:
+        return service_name, "expired", None
+    return service_name, "expiring", days_left
+
+
+def _describe_bucket(bucket: str, days_left: Optional[int]) -> str:
+    if bucket == "expired":
+        return "EXPIRED (renewal is overdue)."
+    if days_left == 0:
+        return "EXPIRING today."
+    return f"EXPIRING in {days_left} day(s)."
+
+
+def _fallback_sms_template(key: SmsTemplateKey) -> str:
+    """
+    Fixed Arabic template, used when the LLM output has no name placeholder.
+    """
+    service_name, bucket, days_left = key
+    service_ar = SERVICE_NAME_AR.get(service_name, service_name)
+    if bucket == "expired":
+        status = f"انتهت صلاحية {service_ar}."
+    elif days_left == 0:
+        status = f"تنتهي صلاحية {service_ar} اليوم."
+    else:
+        status = f"تنتهي صلاحية {service_ar} خلال {days_left} يوم."
+    return (
+        f"مساعد أبشر: {USER_NAME_PLACEHOLDER}، {status} "
+        "سجّل الدخول إلى أبشر أو رد على هذه الرسالة للتجديد."
+    )
+
+
+async def _render_sms_template(key: SmsTemplateKey) -> str:
+    """
+    Generate (once) the SMS template for a variant. Concurrent requests for
+    the same variant share one LLM call. Output without the name
+    placeholder is retried, then replaced by the fixed template and not
+    cached (the next SMS for the variant asks the LLM again).
+    """
+    global SMS_TEMPLATE_FALLBACKS
+
+    pending = _SMS_TEMPLATES_PENDING.get(key)
+    if pending is not None:
+        return await pending
+
+    service_name, bucket, days_left = key
+    future: "asyncio.Future[str]" = asyncio.get_running_loop().create_future()
+    _SMS_TEMPLATES_PENDING[key] = future
+
+    try:
+        prompt_str = proactive_sms_prompt.format(
+            service_name=service_name,
+            service_status=_describe_bucket(bucket, days_left),
+        )
+        for _ in range(SMS_TEMPLATE_ATTEMPTS):
+            started = time.perf_counter()
+            ai_msg = await notification_llm.ainvoke(prompt_str)
+            for hook in _SMS_LLM_LATENCY_HOOKS:
+                hook(time.perf_counter() - started)
+            template = ai_msg.content.strip()
+            if USER_NAME_PLACEHOLDER in template:
+                _SMS_TEMPLATES[key] = template
+                break
+        else:
+            SMS_TEMPLATE_FALLBACKS += 1
+            print(f"[SMS] No name placeholder in the template for {key}, using the fixed one")
+            template = _fallback_sms_template(key)
+
+        future.set_result(template)
+        return template
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as exc:
+        future.set_exception(exc)
+        future.exception()  # mark retrieved if nobody else is waiting
+        raise
+    finally:
+        _SMS_TEMPLATES_PENDING.pop(key, None)
+
 
 async def generate_proactive_sms_for_service(
     user: User,
     service: UserService,
     days_left: int,
-    service_status: str,
 ) -> str:
     """
     Generate a short Arabic SMS about an expiring/expired service.
+
+    Served from the template cache when possible; the LLM is only called
+    for variants that have not been rendered yet.
     """
-    prompt_str = proactive_sms_prompt.format(
-        user_name=user.name,
-        service_name=service.service_name,
-        service_status=service_status,
-        days_left=days_left,
-    )
-    ai_msg = await notification_llm.ainvoke(prompt_str)
-    return ai_msg.content.strip()
+    global SMS_TEMPLATE_HITS, SMS_TEMPLATE_MISSES
+
+    key = _sms_template_key(service.service_name, days_left)
+    template = _SMS_TEMPLATES.get(key)
+    if template is None:
+        SMS_TEMPLATE_MISSES += 1
+        template = await _render_sms_template(key)
+    else:
+        SMS_TEMPLATE_HITS += 1
+
+    return template.replace(USER_NAME_PLACEHOLDER, user.name)
+
+
+async def prewarm_sms_templates(
+    service_names: Iterable[str],
+    max_days_left: int,
+    concurrency: int = 5,
+) -> int:
+    """
+    Render every service x status bucket variant (expired, and expiring in
+    0..max_days_left days) ahead of time. Returns how many were generated.
+    """
+    keys = {
+        _sms_template_key(name, days_left)
+        for name in service_names
+        for days_left in range(-1, max_days_left + 1)
+    }
+    missing = [k for k in keys if k not in _SMS_TEMPLATES]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def render(key: SmsTemplateKey) -> None:
+        async with semaphore:
+            await _render_sms_template(key)
+
+    results = await asyncio.gather(*(render(k) for k in missing), return_exceptions=True)
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        print(f"[SMS] {len(failures)} template(s) failed to pre-generate: {failures[0]}")
+
+    generated = sum(k in _SMS_TEMPLATES for k in missing)
+    print(f"[SMS] Pre-generated {generated} SMS template(s)")
+    return generated
+
+
+def sms_template_stats() -> Dict[str, float]:
+    """
+    Template cache counters for the /metrics endpoint.
+    """
+    total = SMS_TEMPLATE_HITS + SMS_TEMPLATE_MISSES
+    return {
+        "hits": SMS_TEMPLATE_HITS,
+        "misses": SMS_TEMPLATE_MISSES,
+        "fallbacks": SMS_TEMPLATE_FALLBACKS,
+        "hit_rate": SMS_TEMPLATE_HITS / total if total else 0.0,
+        "templates": len(_SMS_TEMPLATES),
+    }
 
 
 # -------------------------------------------------
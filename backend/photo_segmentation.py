@@ -0,0 +1,118 @@
+# backend/photo_segmentation.py
+# Local (CPU) background removal for ID photos: a portrait in front of a
+# plain wall. No model and no network call, NumPy + Pillow only.
+from typing import Tuple
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+# Longest side of the working copy used for segmentation
+SEGMENT_SIZE = 256
+# Colour distance (sum of |dR|+|dG|+|dB|) still counted as background,
+# raised automatically for noisy / gradient walls
+MIN_THRESHOLD = 45
+MAX_THRESHOLD = 120
+# Radius (full-size pixels) of the blur applied to the mask edge
+EDGE_SOFTNESS = 2
+
+WHITE = (255, 255, 255)
+
+
+def _border_pixels(arr: np.ndarray) -> np.ndarray:
+    rows = max(arr.shape[0] // 50, 1)
+    cols = max(arr.shape[1] // 50, 1)
+    return np.concatenate(
+        [
+            arr[:rows].reshape(-1, 3),
+            arr[:, :cols].reshape(-1, 3),
+            arr[:, -cols:].reshape(-1, 3),
+        ]
+    )
+
+
+def _background_mask(arr: np.ndarray) -> np.ndarray:
+    """
+    Boolean mask of background pixels of an RGB array (H, W, 3).
+    """
+    border = _border_pixels(arr)
+    bg_colour = np.median(border, axis=0)
+
+    # Threshold adapts to how uniform the wall is along the border
+    border_dist = np.abs(border - bg_colour).sum(axis=1)
+    threshold = float(np.clip(np.percentile(border_dist, 90) * 2, MIN_THRESHOLD, MAX_THRESHOLD))
+
+    candidate = np.abs(arr - bg_colour).sum(axis=2) <= threshold
+
+    # Flood fill from the top / left / right borders through candidate
+    # pixels, one 4-neighbour dilation per step (all pixels at once).
+    filled = np.zeros_like(candidate)
+    filled[0, :] = candidate[0, :]
+    filled[:, 0] = candidate[:, 0]
+    filled[:, -1] = candidate[:, -1]
+
+    for _ in range(candidate.shape[0] * candidate.shape[1]):
+        grown = filled.copy()
+        grown[1:, :] |= filled[:-1, :]
+        grown[:-1, :] |= filled[1:, :]
+        grown[:, 1:] |= filled[:, :-1]
+        grown[:, :-1] |= filled[:, 1:]
+        grown &= candidate
+        if np.array_equal(grown, filled):
+            break
+        filled = grown
+
+    return filled
+
+
+def _crop_box(
+    bbox: Tuple[int, int, int, int],
+    size: Tuple[int, int],
+    margin: float,
+) -> Tuple[int, int, int, int]:
+    left, top, right, bottom = bbox
+    pad_x = int((right - left) * margin)
+    pad_y = int((bottom - top) * margin)
+    width, height = size
+    # The bottom edge is left as is: the subject is cut there, not framed
+    return (
+        max(left - pad_x, 0),
+        max(top - pad_y, 0),
+        min(right + pad_x, width),
+        min(bottom, height),
+    )
+
+
+def remove_background(img: Image.Image, margin: float = 0.10) -> Image.Image:
+    """
+    Replace the plain background of a portrait with white and crop to the
+    subject plus `margin` (fraction of the subject's size). Returns an RGB
+    image; if no subject can be told apart, the photo is returned as is.
+
+    - Segmentation runs on a SEGMENT_SIZE copy: the wall colour is the
+      median of the top / left / right border (the bottom edge usually
+      cuts through the shoulders), and background is every pixel close
+      to it that is connected to those borders, so a white shirt inside
+      the subject is kept.
+    - The mask is upscaled and softened before compositing onto white.
+    """
+    img = img.convert("RGB")
+
+    small = img.copy()
+    small.thumbnail((SEGMENT_SIZE, SEGMENT_SIZE), Image.BILINEAR)
+    background = _background_mask(np.asarray(small, dtype=np.int16))
+
+    if background.all() or not background.any():
+        print("[UPLOAD] Local background removal: no subject found, keeping photo as is")
+        return img
+
+    subject = Image.fromarray(np.where(background, 0, 255).astype(np.uint8), mode="L")
+    subject = subject.resize(img.size, Image.BILINEAR)
+    subject = subject.filter(ImageFilter.GaussianBlur(EDGE_SOFTNESS))
+
+    result = Image.new("RGB", img.size, WHITE)
+    result.paste(img, mask=subject)
+
+    bbox = subject.point(lambda v: 255 if v >= 128 else 0).getbbox()
+    if bbox is None:
+        return result
+    return result.crop(_crop_box(bbox, img.size, margin))
@@ -1,68 +1,109 @@
 # backend/proactive.py
-from datetime import datetime, timezone
-from typing import List
+import asyncio
+import bisect
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
-from models import Notification, UserService
-from notification_ai import generate_proactive_sms_for_service
-from store import USERS, add_notification, get_user_notifications, iter_user_services
+import schedule
 
-EXPIRY_SMS_THRESHOLD_DAYS = 3  # send SMS if expiry <= 3 days
+from config import (
+    PROACTIVE_INTERVAL_SECONDS,
+    PROACTIVE_LLM_CONCURRENCY,
+    PROACTIVE_SCHEDULER_ENABLED,
+)
+from models import Notification, ServiceType, User, UserService
+from notification_ai import generate_proactive_sms_for_service, register_sms_llm_latency_hook
+from store import (
+    EXPIRY_DUE_THRESHOLD_DAYS,
+    SERVICE_NAMES,
+    USERS,
+    USER_NOTIFICATIONS,
+    aadd_notification,
+    iter_user_services,
+    pop_due_expiries,
+    snooze_expiry,
+)
 
+EXPIRY_SMS_THRESHOLD_DAYS = EXPIRY_DUE_THRESHOLD_DAYS  # send SMS if expiry <= 3 days
+SMS_REPEAT_DAYS = 7  # at most one SMS per service per week
 
-def _describe_service_status(svc: UserService, now: datetime) -> str:
-    """
-    Human-readable description of a service status given the current time.
-    """
-    days_left = (svc.expiry_date - now).days
-    if days_left < 0:
-        return f"EXPIRED {-days_left} day(s) ago (on {svc.expiry_date.date()})."
-    if days_left <= EXPIRY_SMS_THRESHOLD_DAYS:
-        return f"EXPIRING in {days_left} day(s) on {svc.expiry_date.date()}."
-    return f"VALID, expires in {days_left} day(s) on {svc.expiry_date.date()}."
+# Users are scanned in chunks, yielding to the event loop in between
+SCAN_CHUNK_SIZE = 1000
 
+# LLM latency histogram bucket upper bounds (seconds); last bucket is +Inf
+LLM_LATENCY_BUCKETS: Tuple[float, ...] = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
 
-async def run_proactive_for_user(user_id: str) -> List[Notification]:
-    """
-    Run proactive checks ONLY for a single session user.
+PROACTIVE_METRICS: Dict[str, Any] = {
+    "runs": 0,
+    "users_scanned": 0,
+    "sms_generated": 0,
+    "errors": 0,
+    "llm_latency_buckets": [0] * (len(LLM_LATENCY_BUCKETS) + 1),
+    "llm_latency_sum": 0.0,
+    "last_run": None,
+}
 
-    - Looks at this user's services.
-    - If any are expired / near expiry, generates an SMS notification
-      (once per week per service).
+# (user_id, service_type) pairs with an SMS being generated right now,
+# so a login-triggered run and a batch run never double-send.
+_IN_FLIGHT: Set[Tuple[str, ServiceType]] = set()
+
+
+def _recently_notified(user_id: str, service_type: ServiceType, now: datetime) -> bool:
     """
-    created: List[Notification] = []
-    now = datetime.now(timezone.utc)
+    True if an SMS for this service was sent in the last SMS_REPEAT_DAYS.
+    Walks the user's notifications newest-first and stops at the window.
+    """
+    for n in reversed(USER_NOTIFICATIONS.get(user_id, ())):
+        if (now - n.created_at).days >= SMS_REPEAT_DAYS:
+            return False
+        if n.channel == "sms" and n.meta.get("service_type") == service_type:
+            return True
+    return False
 
-    user = USERS.get(user_id)
-    if not user:
-        return created
 
-    for svc in iter_user_services(user):
-        days_left = (svc.expiry_date - now).days
+def _observe_llm_latency(seconds: float) -> None:
+    idx = bisect.bisect_left(LLM_LATENCY_BUCKETS, seconds)
+    PROACTIVE_METRICS["llm_latency_buckets"][idx] += 1
+    PROACTIVE_METRICS["llm_latency_sum"] += seconds
 
-        if days_left > EXPIRY_SMS_THRESHOLD_DAYS:
-            continue
 
-        # Check if we already sent an SMS recently for this service
-        existing = [
-            n
-            for n in get_user_notifications(user_id)
-            if n.channel == "sms"
-            and n.meta.get("service_type") == svc.service_type
-            and (now - n.created_at).days < 7
-        ]
-        if existing:
-            continue
+# Only actual LLM calls (SMS template misses), not template-cache hits
+register_sms_llm_latency_hook(_observe_llm_latency)
+
+
+async def _send_service_sms(
+    user_id: str,
+    user: User,
+    svc: UserService,
+    now: datetime,
+    source: str,
+) -> Optional[Notification]:
+    """
+    Generate and store one proactive SMS for a due service, unless one was
+    sent recently or is already being generated.
+    """
+    key = (user_id, svc.service_type)
+    if key in _IN_FLIGHT or _recently_notified(user_id, svc.service_type, now):
+        return None
 
-        service_status = _describe_service_status(svc, now)
+    _IN_FLIGHT.add(key)
+    try:
+        days_left = (svc.expiry_date - now).days
 
         sms_text = await generate_proactive_sms_for_service(
             user=user,
             service=svc,
             days_left=days_left,
-            service_status=service_status,
         )
 
-        notif = add_notification(
+        if user_id not in USERS:
+            return None  # session evicted while we were waiting
+
+        # Embedding for the notification index runs off the event loop
+        notif = await aadd_notification(
             user_id=user_id,
             channel="sms",
             message=sms_text,
@@ -70,10 +111,222 @@ async def run_proactive_for_user(user_id: str) -> List[Notification]:
                 "service_type": svc.service_type,
                 "expiry_date": svc.expiry_date.isoformat(),
                 "days_left": days_left,
-                "source": "proactive_engine_user",
+                "source": source,
             },
         )
+        if notif is None:
+            return None
         print(f"[PROACTIVE] Sending SMS to {user.phone_number}: {sms_text}")
-        created.append(notif)
+        return notif
+    finally:
+        _IN_FLIGHT.discard(key)
+
+
+def _due_services(user: User, now: datetime) -> List[UserService]:
+    return [
+        svc
+        for svc in iter_user_services(user)
+        if (svc.expiry_date - now).days <= EXPIRY_SMS_THRESHOLD_DAYS
+    ]
+
+
+async def run_proactive_for_user(user_id: str) -> List[Notification]:
+    """
+    Run proactive checks ONLY for a single session user.
+
+    - Looks at this user's services.
+    - If any are expired / near expiry, generates an SMS notification
+      (once per week per service).
+    """
+    created: List[Notification] = []
+    now = datetime.now(timezone.utc)
+
+    user = USERS.get(user_id)
+    if not user:
+        return created
+
+    for svc in _due_services(user, now):
+        notif = await _send_service_sms(user_id, user, svc, now, "proactive_engine_user")
+        if notif is not None:
+            created.append(notif)
+
+    return created
+
+
+DueItem = Tuple[str, User, UserService]
+
+
+def _due_from_timeline(now: datetime) -> List[DueItem]:
+    """
+    Due services taken from the store's expiry timeline: only entries that
+    crossed the threshold (or whose reminder came due) since the last tick.
+    """
+    due: List[DueItem] = []
+    for user_id, service_type, expiry in pop_due_expiries(now):
+        user = USERS.get(user_id)
+        if user is None:
+            continue
+        svc = UserService(
+            service_type=service_type,
+            service_name=SERVICE_NAMES[service_type],
+            expiry_date=expiry,
+        )
+        due.append((user_id, user, svc))
+    return due
+
+
+async def _due_from_scan(user_ids: Iterable[str], now: datetime) -> Tuple[List[DueItem], int]:
+    """
+    Due services found by checking every given user (full scan).
+    """
+    ids = list(user_ids)
+    due: List[DueItem] = []
+    scanned = 0
+
+    for offset in range(0, len(ids), SCAN_CHUNK_SIZE):
+        for user_id in ids[offset : offset + SCAN_CHUNK_SIZE]:
+            user = USERS.get(user_id)
+            if user is None:
+                continue
+            scanned += 1
+            due.extend((user_id, user, svc) for svc in _due_services(user, now))
+        await asyncio.sleep(0)  # let request handlers run between chunks
+
+    return due, scanned
+
+
+async def run_proactive_batch(user_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Run proactive checks for many session users at once. SMS generation
+    runs concurrently, bounded by PROACTIVE_LLM_CONCURRENCY in-flight LLM calls.
+
+    - user_ids=None (scheduler ticks): pull due services from the expiry
+      timeline, so the cost follows the number of due items, not users.
+      Handled entries are snoozed for SMS_REPEAT_DAYS (weekly reminder);
+      failed ones are retried on the next tick.
+    - user_ids given: full scan of those users.
+
+    Returns the metrics of this run.
+    """
+    now = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(PROACTIVE_LLM_CONCURRENCY)
+    from_timeline = user_ids is None
+
+    if from_timeline:
+        due, scanned = _due_from_timeline(now), 0
+    else:
+        due, scanned = await _due_from_scan(user_ids, now)
+
+    async def send(user_id: str, user: User, svc: UserService) -> Optional[Notification]:
+        retry_at = now
+        try:
+            async with semaphore:
+                notif = await _send_service_sms(
+                    user_id, user, svc, now, "proactive_engine_batch"
+                )
+            retry_at = now + timedelta(days=SMS_REPEAT_DAYS)
+            return notif
+        finally:
+            if from_timeline:
+                snooze_expiry(user_id, svc.service_type, svc.expiry_date, retry_at)
+
+    results = await asyncio.gather(
+        *(send(user_id, user, svc) for user_id, user, svc in due),
+        return_exceptions=True,
+    )
+
+    errors = [r for r in results if isinstance(r, Exception)]
+    for exc in errors:
+        print(f"[PROACTIVE] SMS generation failed: {exc}")
+    generated = sum(1 for r in results if isinstance(r, Notification))
+
+    run = {
+        "started_at": now.isoformat(),
+        "duration_seconds": round(time.perf_counter() - started, 3),
+        "source": "timeline" if from_timeline else "scan",
+        "users_scanned": scanned,
+        "due_services": len(due),
+        "sms_generated": generated,
+        "errors": len(errors),
+    }
+    PROACTIVE_METRICS["runs"] += 1
+    PROACTIVE_METRICS["users_scanned"] += scanned
+    PROACTIVE_METRICS["sms_generated"] += generated
+    PROACTIVE_METRICS["errors"] += len(errors)
+    PROACTIVE_METRICS["last_run"] = run
+
+    print(f"[PROACTIVE] Batch run: {run}")
+    return run
+
+
+def proactive_stats() -> Dict[str, Any]:
+    """
+    Metrics for the /metrics endpoint. The latency histogram is keyed by
+    bucket upper bound in seconds ("+Inf" for the overflow bucket).
+    """
+    bounds = [str(b) for b in LLM_LATENCY_BUCKETS] + ["+Inf"]
+    return {
+        **{k: v for k, v in PROACTIVE_METRICS.items() if k != "llm_latency_buckets"},
+        "llm_latency_histogram": dict(zip(bounds, PROACTIVE_METRICS["llm_latency_buckets"])),
+    }
+
+
+# ---------------- Scheduler ----------------
+
+_scheduler_stop = threading.Event()
+_scheduler_thread: Optional[threading.Thread] = None
+_current_run: Optional[Future] = None
+
+
+def _submit_batch(loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Scheduler job: hand a batch run to the app's event loop, unless the
+    previous run is still going.
+    """
+    global _current_run
+
+    if _current_run is not None and not _current_run.done():
+        print("[PROACTIVE] Previous batch run still in progress, skipping tick")
+        return
+    _current_run = asyncio.run_coroutine_threadsafe(run_proactive_batch(), loop)
+
+
+def _run_scheduler(scheduler: schedule.Scheduler) -> None:
+    while not _scheduler_stop.is_set():
+        scheduler.run_pending()
+        _scheduler_stop.wait(1)
+
+
+def start_proactive_scheduler(loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Start the background scheduler thread (runs every
+    PROACTIVE_INTERVAL_SECONDS when PROACTIVE_SCHEDULER_ENABLED).
+    The batch itself runs on the given event loop.
+    """
+    global _scheduler_thread
+
+    if not PROACTIVE_SCHEDULER_ENABLED or _scheduler_thread is not None:
+        return
+
+    scheduler = schedule.Scheduler()
+    scheduler.every(PROACTIVE_INTERVAL_SECONDS).seconds.do(_submit_batch, loop)
+
+    _scheduler_stop.clear()
+    _scheduler_thread = threading.Thread(
+        target=_run_scheduler,
+        args=(scheduler,),
+        name="proactive-scheduler",
+        daemon=True,
+    )
+    _scheduler_thread.start()
+    print(f"[PROACTIVE] Scheduler started (every {PROACTIVE_INTERVAL_SECONDS}s)")
+
+
+def stop_proactive_scheduler() -> None:
+    global _scheduler_thread
 
-    return created
\ No newline at end of file
+    _scheduler_stop.set()
+    if _scheduler_thread is not None:
+        _scheduler_thread.join(timeout=5)
+        _scheduler_thread = None
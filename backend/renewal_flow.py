@@ -0,0 +1,176 @@
+# backend/renewal_flow.py
+# Per-session renewal state: when the agent has asked the user to confirm
+# the renewal of one service, an explicit "yes" is turned into the
+# ProposedAction directly instead of running the agent again.
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from absher_lexical import normalize_arabic
+from models import User
+from store import USERS, iter_user_services, register_session_evict_hook
+
+# A pending offer is only honoured for this long after the agent made it
+PENDING_RENEWAL_TTL_SECONDS = 600
+
+# session_id -> (service_type, time.monotonic() when offered)
+_PENDING_RENEWALS: Dict[str, Tuple[str, float]] = {}
+
+RENEWAL_FLOW_METRICS: Dict[str, int] = {
+    "offers": 0,
+    "confirmed": 0,
+    "expired": 0,
+}
+
+# Service mentions in normalized (absher_lexical.normalize_arabic), lowercased text
+_SERVICE_PATTERNS: Dict[str, re.Pattern] = {
+    "national_id": re.compile(r"national id|national_id|الهويه|هويه"),
+    "driver_license": re.compile(
+        r"driver'?s? licen[sc]e|driving licen[sc]e|driver_license|رخصه القياده|رخصه قياده"
+    ),
+    "passport": re.compile(r"passport|جواز"),
+    "vehicle_registration": re.compile(
+        r"vehicle registration|vehicle_registration|istimara|استماره|رخصه السير"
+    ),
+}
+
+# The agent states that the fee is calculated automatically right before
+# asking for the final confirmation (system prompt, renewal steps 4-5)
+_FEE_NOTICE = (
+    re.compile(r"fee.{0,80}automatic|automatic.{0,80}fee"),
+    re.compile(r"رسوم.{0,80}تلقايي|تلقايي.{0,80}رسوم"),
+)
+
+# Question sentences that ask to go ahead with the renewal itself (as
+# opposed to follow-ups like "have you uploaded your photo?")
+_RENEWAL_ASK = (
+    re.compile(
+        r"\b(do|would) you (like|want|wish) (me )?to (renew|proceed|continue|confirm|go ahead)\b"
+        r"|\bshall (i|we) (renew|proceed|continue|submit|go ahead)\b"
+        r"|\b(do|can|could) you confirm\b"
+        r"|\bconfirm (the |your |this )?renewal\b"
+        r"|\bready to (renew|proceed)\b"
+    ),
+    re.compile(
+        r"\bهل (تريد|تود|ترغب|تبي|تبغي)( في)? (تجديد|التجديد|المتابعه|الاستمرار|اكمال)"
+        r"|\bهل (توكد|نبدا|نكمل|نتابع|نستمر|نجدد)\b"
+        r"|\b(توكد|تاكيد) (رغبتك|طلب)"
+    ),
+)
+# A sentence ending in a question mark (after normalization)
+_QUESTION_SENTENCE = re.compile(r"[^.!?؟\n]*[?؟]")
+
+_WORD = re.compile(r"\w+")
+
+# Explicit confirmations; a message is one only if every word is one of
+# these or a filler word, with at least one confirmation word.
+_CONFIRM_WORDS = {
+    "yes", "yeah", "yep", "ok", "okay", "sure", "proceed", "continue",
+    "confirm", "confirmed", "ahead",
+    "نعم", "اي", "ايه", "ايوه", "اكيد", "بالتاكيد", "تمام", "موافق", "اوكي",
+    "اوك", "كمل", "اكمل", "استمر", "اكد", "موكد", "جدد", "جددها",
+}
+_FILLER_WORDS = {
+    "please", "go", "do", "it", "renew", "renewal", "the", "and",
+    "من", "فضلك", "لو", "سمحت", "والله", "و", "تجديد", "التجديد", "يلا",
+}
+
+
+def _normalize(text: str) -> str:
+    return normalize_arabic(text).lower()
+
+
+def mentioned_services(text: str) -> List[str]:
+    normalized = _normalize(text)
+    return [s for s, pattern in _SERVICE_PATTERNS.items() if pattern.search(normalized)]
+
+
+def is_confirmation(message: str) -> bool:
+    """
+    True for short, unambiguous confirmations ("نعم", "yes, proceed",
+    "تمام كمل"). Anything else (negations, questions, other content) is
+    left to the agent.
+    """
+    words = _WORD.findall(_normalize(message))
+    if not words or "?" in message or "؟" in message:
+        return False
+    if any(w not in _CONFIRM_WORDS and w not in _FILLER_WORDS for w in words):
+        return False
+    return any(w in _CONFIRM_WORDS for w in words)
+
+
+def _offered_service(reply: str) -> Optional[str]:
+    """
+    The service the agent asked the user to confirm the renewal of, if
+    the reply is such a confirmation request for exactly one service:
+    it carries the fee notice, and every question in it asks to renew /
+    proceed / confirm (so a "yes" cannot be an answer to something else).
+    """
+    normalized = _normalize(reply)
+    questions = _QUESTION_SENTENCE.findall(normalized)
+    if not questions:
+        return None
+    if not all(any(p.search(q) for p in _RENEWAL_ASK) for q in questions):
+        return None
+    if not any(pattern.search(normalized) for pattern in _FEE_NOTICE):
+        return None
+    services = mentioned_services(reply)
+    return services[0] if len(services) == 1 else None
+
+
+# -------------------------------------------------------------------
+# Per-session state
+# -------------------------------------------------------------------
+
+
+def clear_pending_renewal(session_id: str) -> None:
+    _PENDING_RENEWALS.pop(session_id, None)
+
+
+register_session_evict_hook(clear_pending_renewal)
+
+
+def update_after_agent_reply(session_id: str, reply: str, action_proposed: bool) -> None:
+    """
+    Track the renewal offer (if any) made by the agent's latest reply. Every
+    agent turn replaces the previous state, so an offer only stands for the
+    user's next message.
+    """
+    service_type = None if action_proposed else _offered_service(reply)
+    if service_type is None or session_id not in USERS:
+        # Also skip sessions evicted during the agent run: no evict hook
+        # would free their entry
+        clear_pending_renewal(session_id)
+        return
+
+    _PENDING_RENEWALS[session_id] = (service_type, time.monotonic())
+    RENEWAL_FLOW_METRICS["offers"] += 1
+    print(f"[RENEWAL] session={session_id} pending confirmation for {service_type}")
+
+
+def take_confirmed_renewal(session_id: str, user: User, message: str) -> Optional[str]:
+    """
+    The service_type to renew when the session has a live offer and the
+    message is an explicit confirmation. The offer is consumed by any
+    message. None means the agent should handle the message.
+    """
+    pending = _PENDING_RENEWALS.pop(session_id, None)
+    if pending is None or not is_confirmation(message):
+        return None
+
+    service_type, offered_at = pending
+    if time.monotonic() - offered_at > PENDING_RENEWAL_TTL_SECONDS:
+        RENEWAL_FLOW_METRICS["expired"] += 1
+        return None
+    if all(s.service_type.value != service_type for s in iter_user_services(user)):
+        return None
+
+    RENEWAL_FLOW_METRICS["confirmed"] += 1
+    return service_type
+
+
+def renewal_flow_stats() -> Dict[str, int]:
+    """
+    Counters for the /metrics endpoint.
+    """
+    return {**RENEWAL_FLOW_METRICS, "pending": len(_PENDING_RENEWALS)}
@@ -1,15 +1,20 @@
 # backend/store.py
+import asyncio
+import bisect
+import heapq
 import json
+import time
 import uuid
+from collections import OrderedDict
 from copy import deepcopy
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from langchain_community.vectorstores import FAISS
 
-from config import embeddings
-from models import Notification, ServiceType, User, UserService, UserMedia
+from config import MAX_LIVE_SESSIONS, SESSION_IDLE_TTL_SECONDS, embeddings
+from models import SERVICE_LABELS, Notification, ServiceType, User, UserService, UserMedia
 
 # In-memory session users + notifications
 # USERS is keyed by a session_id (random UUID per login)
@@ -18,7 +23,10 @@ USERS: Dict[str, User] = {}
 # Template users loaded from users.json (keyed by national_id)
 TEMPLATE_USERS: Dict[str, User] = {}
 
-NOTIFICATIONS: List[Notification] = []
+# Notification repository: sharded by session user_id, each shard kept
+# sorted by created_at (oldest first), plus a global index by notification id.
+USER_NOTIFICATIONS: Dict[str, List[Notification]] = {}
+NOTIFICATIONS_BY_ID: Dict[str, Notification] = {}
 
 # FAISS index per session user (for fuzzy notification search)
 USER_NOTIFICATION_INDEX: Dict[str, FAISS] = {}
@@ -56,7 +64,13 @@ def create_session_user_from_template(template: User) -> str:
     session_id = str(uuid.uuid4())
     user_copy = deepcopy(template)
     USERS[session_id] = user_copy
+    SESSION_LAST_SEEN[session_id] = time.monotonic()
+    for service_type, expiry in _service_expiries(user_copy):
+        _track_expiry(session_id, service_type, expiry)
     print(f"[STORE] Created session user {session_id} from template {template.national_id}")
+
+    evict_idle_sessions()
+    _enforce_session_cap()
     return session_id
 
 
@@ -73,52 +87,125 @@ def get_user_by_username(username: str) -> Optional[User]:
 # ---------------- Services helper ----------------
 
 
+SERVICE_NAMES: Dict[ServiceType, str] = {
+    service_type: name_en for service_type, (_, name_en) in SERVICE_LABELS.items()
+}
+
+
+def _service_expiries(user: User) -> List[Tuple[ServiceType, datetime]]:
+    """
+    (service_type, expiry_date) pairs for a user, without building
+    UserService objects.
+    """
+    s = user.services
+    pairs = [
+        (ServiceType.NATIONAL_ID, s.national_id_expire_date),
+        (ServiceType.LICENSE, s.driver_license_expire_date),
+        (ServiceType.VEHICLE, s.vehicle_registration_expire_date),
+        (ServiceType.PASSPORT, s.passport_expire_date),
+    ]
+    return [(service_type, expiry) for service_type, expiry in pairs if expiry]
+
+
 def iter_user_services(user: User) -> List[UserService]:
     """
     Convert the user's ServicesExpiry (user.services) into a list of
     UserService objects. This gives a uniform iterable representation
     for proactive checks and renewals.
     """
-    s = user.services
-    services: List[UserService] = []
-
-    if s.national_id_expire_date:
-        services.append(
-            UserService(
-                service_type=ServiceType.NATIONAL_ID,
-                service_name="National ID",
-                expiry_date=s.national_id_expire_date,
-            )
+    return [
+        UserService(
+            service_type=service_type,
+            service_name=SERVICE_NAMES[service_type],
+            expiry_date=expiry,
         )
+        for service_type, expiry in _service_expiries(user)
+    ]
 
-    if s.driver_license_expire_date:
-        services.append(
-            UserService(
-                service_type=ServiceType.LICENSE,
-                service_name="Driver License",
-                expiry_date=s.driver_license_expire_date,
-            )
-        )
 
-    if s.vehicle_registration_expire_date:
-        services.append(
-            UserService(
-                service_type=ServiceType.VEHICLE,
-                service_name="Vehicle Registration",
-                expiry_date=s.vehicle_registration_expire_date,
-            )
-        )
+# ---------------- Expiry timeline ----------------
 
-    if s.passport_expire_date:
-        services.append(
-            UserService(
-                service_type=ServiceType.PASSPORT,
-                service_name="Passport",
-                expiry_date=s.passport_expire_date,
-            )
-        )
+# A service is "due" once it is within this many days of expiry
+# (same rule as proactive SMS and renewals).
+EXPIRY_DUE_THRESHOLD_DAYS = 3
+
+# Min-heap of (due_at, session_id, service_type, expiry_date), where due_at
+# is when the entry next needs attention: first when the service crosses the
+# due threshold, later when a reminder is snoozed until. Entries are never
+# updated in place; a renewal pushes a new entry and the old one becomes
+# stale (its expiry no longer matches _CURRENT_EXPIRY) and is skipped on pop.
+ExpiryEntry = Tuple[datetime, str, ServiceType, datetime]
+EXPIRY_TIMELINE: List[ExpiryEntry] = []
+_CURRENT_EXPIRY: Dict[Tuple[str, ServiceType], datetime] = {}
+
+
+def _track_expiry(session_id: str, service_type: ServiceType, expiry: datetime) -> None:
+    """
+    Register the current expiry of a session's service on the timeline.
+    """
+    _CURRENT_EXPIRY[(session_id, service_type)] = expiry
+    # days_left = (expiry - now).days <= threshold  <=>  now > expiry - (threshold + 1) days
+    due_at = expiry - timedelta(days=EXPIRY_DUE_THRESHOLD_DAYS + 1)
+    heapq.heappush(EXPIRY_TIMELINE, (due_at, session_id, service_type, expiry))
+    _compact_expiry_timeline()
+
+
+def _is_current(session_id: str, service_type: ServiceType, expiry: datetime) -> bool:
+    return _CURRENT_EXPIRY.get((session_id, service_type)) == expiry
 
-    return services
+
+def _compact_expiry_timeline() -> None:
+    """
+    Drop stale entries once they outnumber live ones.
+    """
+    global EXPIRY_TIMELINE
+
+    if len(EXPIRY_TIMELINE) <= 2 * len(_CURRENT_EXPIRY) + 1024:
+        return
+    EXPIRY_TIMELINE = [e for e in EXPIRY_TIMELINE if _is_current(e[1], e[2], e[3])]
+    heapq.heapify(EXPIRY_TIMELINE)
+
+
+def pop_due_expiries(now: datetime) -> List[Tuple[str, ServiceType, datetime]]:
+    """
+    Pop every live timeline entry whose due_at has passed and return
+    (session_id, service_type, expiry_date) for each. Cost is proportional
+    to the number of due (and stale) entries, not to the number of users.
+
+    Popped entries leave the timeline; use snooze_expiry to be reminded again.
+    """
+    due: List[Tuple[str, ServiceType, datetime]] = []
+    while EXPIRY_TIMELINE and EXPIRY_TIMELINE[0][0] <= now:
+        _, session_id, service_type, expiry = heapq.heappop(EXPIRY_TIMELINE)
+        if _is_current(session_id, service_type, expiry):
+            due.append((session_id, service_type, expiry))
+    return due
+
+
+def snooze_expiry(
+    session_id: str,
+    service_type: ServiceType,
+    expiry: datetime,
+    until: datetime,
+) -> None:
+    """
+    Put a popped entry back on the timeline, due again at `until`
+    (ignored if the service has since been renewed or the session is gone).
+    """
+    if _is_current(session_id, service_type, expiry):
+        heapq.heappush(EXPIRY_TIMELINE, (until, session_id, service_type, expiry))
+
+
+def _forget_expiries(session_id: str) -> None:
+    for service_type in ServiceType:
+        _CURRENT_EXPIRY.pop((session_id, service_type), None)
+
+
+def expiry_timeline_stats() -> Dict[str, int]:
+    return {
+        "tracked_services": len(_CURRENT_EXPIRY),
+        "timeline_entries": len(EXPIRY_TIMELINE),
+    }
 
 
 # ---------------- Notifications ----------------
@@ -142,36 +229,158 @@ def add_notification(
         meta=meta or {},
     )
 
-    NOTIFICATIONS.append(notif)
-    _update_user_notification_index(user_id)
+    _store_notification(notif)
+    _index_notification(notif)
+    _publish_notification(notif)
+    return notif
+
+
+async def aadd_notification(
+    user_id: str,
+    channel: str,
+    message: str,
+    meta: Optional[Dict] = None,
+) -> Optional[Notification]:
+    """
+    Async add_notification for code running on the event loop: the message
+    is embedded with a non-blocking call first, then stored and indexed.
+    Returns None if the session was evicted while embedding.
+    """
+    vector = (await embeddings.aembed_documents([message]))[0]
+    if user_id not in USERS:
+        return None
+
+    notif = Notification(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        channel=channel,
+        message=message,
+        created_at=datetime.now(timezone.utc),
+        meta=meta or {},
+    )
+
+    _store_notification(notif)
+    _index_notification(notif, vector)
+    _publish_notification(notif)
     return notif
 
 
+def _store_notification(notif: Notification) -> None:
+    """
+    Insert a notification into its user's shard (kept sorted by created_at)
+    and into the by-id index.
+    """
+    shard = USER_NOTIFICATIONS.setdefault(notif.user_id, [])
+    if not shard or shard[-1].created_at <= notif.created_at:
+        shard.append(notif)  # common case: newest notification
+    else:
+        bisect.insort_right(shard, notif, key=lambda n: n.created_at)
+    NOTIFICATIONS_BY_ID[notif.id] = notif
+
+
+def get_notification(notif_id: str) -> Optional[Notification]:
+    """
+    Lookup a single notification by id.
+    """
+    return NOTIFICATIONS_BY_ID.get(notif_id)
+
+
 def get_user_notifications(user_id: str) -> List[Notification]:
     """
-    Return all notifications for a specific session user.
+    Return all notifications for a specific session user (oldest first).
+    """
+    return list(USER_NOTIFICATIONS.get(user_id, ()))
+
+
+def get_user_notifications_since(
+    user_id: str,
+    last_id: Optional[str],
+) -> List[Notification]:
+    """
+    Notifications for a session user created after `last_id` (oldest first).
+    Returns the full list if last_id is empty or unknown, so clients resync.
+    """
+    shard = USER_NOTIFICATIONS.get(user_id, [])
+    last = NOTIFICATIONS_BY_ID.get(last_id) if last_id else None
+    if last is None or last.user_id != user_id:
+        return list(shard)
+
+    i = bisect.bisect_left(shard, last.created_at, key=lambda n: n.created_at)
+    while shard[i].id != last_id:
+        i += 1
+    return shard[i + 1 :]
+
+
+def remove_notification(user_id: str, notif_id: str) -> bool:
     """
-    return [n for n in NOTIFICATIONS if n.user_id == user_id]
+    Delete a single notification for a session user and drop its vector
+    from the user's index. Returns False if it did not exist.
+    """
+    notif = NOTIFICATIONS_BY_ID.get(notif_id)
+    if notif is None or notif.user_id != user_id:
+        return False
+
+    del NOTIFICATIONS_BY_ID[notif_id]
+    shard = USER_NOTIFICATIONS[user_id]
+    i = bisect.bisect_left(shard, notif.created_at, key=lambda n: n.created_at)
+    while shard[i].id != notif_id:
+        i += 1
+    del shard[i]
+
+    index = USER_NOTIFICATION_INDEX.get(user_id)
+    if index is not None:
+        index.delete([notif_id])
+        if index.index.ntotal == 0:
+            USER_NOTIFICATION_INDEX.pop(user_id, None)
+    return True
 
 
-def _update_user_notification_index(user_id: str) -> None:
+def _index_notification(notif: Notification, vector: Optional[List[float]] = None) -> None:
     """
-    Rebuild vector index for a session user's notifications.
+    Incrementally add ONE notification to its user's vector index.
+
+    Only the new message is embedded (unless `vector` is already given);
+    the existing vectors are kept, so the cost of an add does not grow with
+    the user's notification history. The notification id doubles as the
+    vector store id (used for deletion).
+    """
+    if vector is None:
+        vector = embeddings.embed_documents([notif.message])[0]
+    text_embeddings = [(notif.message, vector)]
+
+    index = USER_NOTIFICATION_INDEX.get(notif.user_id)
+    if index is None:
+        USER_NOTIFICATION_INDEX[notif.user_id] = FAISS.from_embeddings(
+            text_embeddings=text_embeddings,
+            embedding=embeddings,
+            metadatas=[{"notif_id": notif.id}],
+            ids=[notif.id],
+        )
+        return
+
+    index.add_embeddings(
+        text_embeddings=text_embeddings,
+        metadatas=[{"notif_id": notif.id}],
+        ids=[notif.id],
+    )
+
+
+def rebuild_user_notification_index(user_id: str) -> None:
+    """
+    Full rebuild of a session user's notification index from scratch.
+    Not used on the hot path; kept for recovery / consistency checks.
     """
     user_notifs = get_user_notifications(user_id)
     if not user_notifs:
         USER_NOTIFICATION_INDEX.pop(user_id, None)
         return
 
-    texts = [n.message for n in user_notifs]
-    metadatas = [{"notif_id": n.id} for n in user_notifs]
-
-    index = FAISS.from_texts(
-        texts=texts,
+    USER_NOTIFICATION_INDEX[user_id] = FAISS.from_texts(
+        texts=[n.message for n in user_notifs],
         embedding=embeddings,
-        metadatas=metadatas,
+        metadatas=[{"notif_id": n.id} for n in user_notifs],
+        ids=[n.id for n in user_notifs],
     )
-    USER_NOTIFICATION_INDEX[user_id] = index
 
 
 def search_notifications(user_id: str, query: str, k: int = 3) -> List[Notification]:
@@ -183,8 +392,25 @@ def search_notifications(user_id: str, query: str, k: int = 3) -> List[Notificat
         return []
 
     docs = index.similarity_search(query, k=k)
-    notif_ids = {doc.metadata.get("notif_id") for doc in docs}
-    return [n for n in NOTIFICATIONS if n.id in notif_ids]
+    hits = (NOTIFICATIONS_BY_ID.get(doc.metadata.get("notif_id")) for doc in docs)
+    return [n for n in hits if n is not None]
+
+
+async def asearch_notifications(
+    user_id: str,
+    query: str,
+    k: int = 3,
+) -> List[Notification]:
+    """
+    Async variant of search_notifications (non-blocking query embedding).
+    """
+    index = USER_NOTIFICATION_INDEX.get(user_id)
+    if index is None:
+        return []
+
+    docs = await index.asimilarity_search(query, k=k)
+    hits = (NOTIFICATIONS_BY_ID.get(doc.metadata.get("notif_id")) for doc in docs)
+    return [n for n in hits if n is not None]
 
 
 def renew_specific_service_for_user(
@@ -227,6 +453,7 @@ def renew_specific_service_for_user(
         elif svc.service_type == ServiceType.PASSPORT:
             user.services.passport_expire_date = new_expiry
 
+        _track_expiry(user_id, svc.service_type, new_expiry)
         return svc
 
     return None
@@ -235,12 +462,18 @@ def renew_specific_service_for_user(
 USER_MEDIA: Dict[str, List[UserMedia]] = {}  # keyed by session user_id
 
 
-def add_user_media(user_id: str, kind: str, filename: str) -> UserMedia:
+def add_user_media(
+    user_id: str,
+    kind: str,
+    filename: str,
+    variants: Optional[Dict[str, str]] = None,
+) -> UserMedia:
     media = UserMedia(
         id=str(uuid.uuid4()),
         user_id=user_id,
         kind=kind,
         filename=filename,
+        variants=variants or {},
         created_at=datetime.now(timezone.utc),
     )
     USER_MEDIA.setdefault(user_id, []).append(media)
@@ -249,3 +482,182 @@ def add_user_media(user_id: str, kind: str, filename: str) -> UserMedia:
 
 def get_user_media(user_id: str) -> List[UserMedia]:
     return USER_MEDIA.get(user_id, [])
+
+
+# ---------------- Notification push ----------------
+
+# Live subscribers (e.g. SSE streams) per session user. Each gets its own
+# bounded queue; None is pushed to ask the subscriber to resync from its
+# last id (queue overflow) or to re-check that the session still exists.
+NOTIFICATION_SUBSCRIBER_QUEUE_SIZE = 100
+_SUBSCRIBERS: Dict[str, Set["asyncio.Queue[Optional[Notification]]"]] = {}
+
+
+def subscribe_notifications(user_id: str) -> "asyncio.Queue[Optional[Notification]]":
+    queue: "asyncio.Queue[Optional[Notification]]" = asyncio.Queue(
+        maxsize=NOTIFICATION_SUBSCRIBER_QUEUE_SIZE
+    )
+    _SUBSCRIBERS.setdefault(user_id, set()).add(queue)
+    return queue
+
+
+def unsubscribe_notifications(
+    user_id: str,
+    queue: "asyncio.Queue[Optional[Notification]]",
+) -> None:
+    subscribers = _SUBSCRIBERS.get(user_id)
+    if subscribers is None:
+        return
+    subscribers.discard(queue)
+    if not subscribers:
+        _SUBSCRIBERS.pop(user_id, None)
+
+
+def _signal(queue: "asyncio.Queue[Optional[Notification]]") -> None:
+    """
+    Replace a subscriber's backlog with a single None (resync) marker.
+    """
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(None)
+
+
+def _publish_notification(notif: Notification) -> None:
+    for queue in _SUBSCRIBERS.get(notif.user_id, ()):
+        try:
+            queue.put_nowait(notif)
+        except asyncio.QueueFull:
+            _signal(queue)  # slow consumer: it will resync from its last id
+
+
+def _close_subscribers(session_id: str) -> None:
+    for queue in _SUBSCRIBERS.pop(session_id, ()):
+        _signal(queue)
+
+
+def notification_push_stats() -> Dict[str, int]:
+    return {
+        "subscribed_sessions": len(_SUBSCRIBERS),
+        "subscribers": sum(len(s) for s in _SUBSCRIBERS.values()),
+    }
+
+
+# ---------------- Session lifecycle ----------------
+
+# Last activity per live session (monotonic seconds), in LRU order:
+# least recently used first.
+SESSION_LAST_SEEN: "OrderedDict[str, float]" = OrderedDict()
+
+# Callbacks run when a session is evicted, so other modules (agents,
+# chat memory, ...) can drop their per-session state too.
+_SESSION_EVICT_HOOKS: List[Callable[[str], None]] = []
+
+SESSIONS_EVICTED = 0
+
+
+def register_session_evict_hook(hook: Callable[[str], None]) -> None:
+    _SESSION_EVICT_HOOKS.append(hook)
+
+
+def touch_session(session_id: str) -> None:
+    """
+    Mark a session as recently used (moves it to the LRU tail).
+    """
+    if session_id in SESSION_LAST_SEEN:
+        SESSION_LAST_SEEN[session_id] = time.monotonic()
+        SESSION_LAST_SEEN.move_to_end(session_id)
+
+
+def evict_session(session_id: str) -> bool:
+    """
+    Drop everything held for a session: user, notifications, notification
+    index, media records, plus any state registered via evict hooks.
+    """
+    global SESSIONS_EVICTED
+
+    SESSION_LAST_SEEN.pop(session_id, None)
+    user = USERS.pop(session_id, None)
+
+    for notif in USER_NOTIFICATIONS.pop(session_id, ()):
+        NOTIFICATIONS_BY_ID.pop(notif.id, None)
+    USER_NOTIFICATION_INDEX.pop(session_id, None)
+    USER_MEDIA.pop(session_id, None)
+    _forget_expiries(session_id)
+    _close_subscribers(session_id)
+
+    for hook in _SESSION_EVICT_HOOKS:
+        try:
+            hook(session_id)
+        except Exception as exc:  # noqa: BLE001
+            print(f"[STORE] Session evict hook failed for {session_id}: {exc}")
+
+    if user is None:
+        return False
+
+    SESSIONS_EVICTED += 1
+    return True
+
+
+def evict_idle_sessions() -> int:
+    """
+    Evict sessions idle for longer than SESSION_IDLE_TTL_SECONDS.
+    Only looks at the LRU head, so the cost is proportional to evictions.
+    """
+    cutoff = time.monotonic() - SESSION_IDLE_TTL_SECONDS
+    evicted = 0
+
+    while SESSION_LAST_SEEN:
+        session_id, last_seen = next(iter(SESSION_LAST_SEEN.items()))
+        if last_seen > cutoff:
+            break
+        evict_session(session_id)
+        evicted += 1
+
+    if evicted:
+        print(f"[STORE] Evicted {evicted} idle session(s)")
+    return evicted
+
+
+def _enforce_session_cap() -> None:
+    """
+    Evict least recently used sessions above MAX_LIVE_SESSIONS.
+    """
+    while len(SESSION_LAST_SEEN) > MAX_LIVE_SESSIONS:
+        session_id = next(iter(SESSION_LAST_SEEN))
+        evict_session(session_id)
+
+
+def _estimate_session_bytes(session_id: str) -> int:
+    """
+    Rough memory footprint of one session (user, notifications, vectors).
+    """
+    size = 0
+
+    user = USERS.get(session_id)
+    if user is not None:
+        size += len(user.model_dump_json())
+
+    for notif in USER_NOTIFICATIONS.get(session_id, ()):
+        size += len(notif.message.encode("utf-8")) + 256
+
+    index = USER_NOTIFICATION_INDEX.get(session_id)
+    if index is not None:
+        size += index.index.ntotal * index.index.d * 4
+
+    size += len(USER_MEDIA.get(session_id, ())) * 256
+    return size
+
+
+def session_stats() -> Dict[str, float]:
+    """
+    Gauges for the /metrics endpoint.
+    """
+    live = len(SESSION_LAST_SEEN)
+    total_bytes = sum(_estimate_session_bytes(sid) for sid in SESSION_LAST_SEEN)
+    return {
+        "live_sessions": live,
+        "max_live_sessions": MAX_LIVE_SESSIONS,
+        "evicted_sessions": SESSIONS_EVICTED,
+        "estimated_bytes": total_bytes,
+        "estimated_bytes_per_session": total_bytes / live if live else 0.0,
+    }
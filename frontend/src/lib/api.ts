@@ -32,6 +32,18 @@ export interface LoginResponse {
 export interface UploadMediaResponse {
   media_id: string;
   kind: string;
+  // "print" (600x800 JPEG), "preview" / "thumb" (WebP) -> filename
+  variants?: Record<string, string>;
+}
+
+// Returned with HTTP 202 when the photo is still being processed
+export interface PhotoJobStatus {
+  job_id: string;
+  status: "pending" | "done" | "failed";
+  media_id?: string;
+  kind?: string;
+  variants?: Record<string, string>;
+  detail?: string;
 }
 
 export interface TextToSpeechRequest {
@@ -115,6 +127,90 @@ export async function sendChatMessage(
   return response.json();
 }
 
+export interface ChatStreamHandlers {
+  onToken?: (text: string) => void;
+  onToolStart?: (tool: string) => void;
+  onToolEnd?: (tool: string) => void;
+  onProposedAction?: (action: ProposedAction) => void;
+}
+
+// Send chat message and consume the /chat/stream Server-Sent Events.
+// Resolves with the final ChatResponse (same shape as sendChatMessage).
+export async function streamChatMessage(
+  user_id: string,
+  message: string,
+  handlers: ChatStreamHandlers = {}
+): Promise<ChatResponse> {
+  const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Accept: "text/event-stream",
+    },
+    body: JSON.stringify({
+      user_id,
+      message,
+    }),
+  });
+
+  if (!response.ok || !response.body) {
+    const errorText = await response.text();
+    throw new Error(`Chat request failed: ${errorText}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let final: ChatResponse | null = null;
+
+  const handleEvent = (event: string, data: any) => {
+    switch (event) {
+      case "token":
+        handlers.onToken?.(data.text);
+        break;
+      case "tool_start":
+        handlers.onToolStart?.(data.tool);
+        break;
+      case "tool_end":
+        handlers.onToolEnd?.(data.tool);
+        break;
+      case "proposed_action":
+        handlers.onProposedAction?.(data as ProposedAction);
+        break;
+      case "done":
+        final = data as ChatResponse;
+        break;
+      case "error":
+        throw new Error(`Chat request failed: ${data.detail}`);
+    }
+  };
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep: number;
+    while ((sep = buffer.indexOf("\n\n")) !== -1) {
+      const block = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+
+      let event = "message";
+      let data = "";
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      if (data) handleEvent(event, JSON.parse(data));
+    }
+  }
+
+  if (!final) {
+    throw new Error("Chat stream ended without a response");
+  }
+  return final;
+}
+
 // Upload ID photo with background removal
 export async function uploadIdPhoto(
   user_id: string,
@@ -134,7 +230,29 @@ export async function uploadIdPhoto(
     throw new Error(`Upload failed: ${errorText}`);
   }
 
-  return response.json();
+  if (response.status !== 202) {
+    return response.json();
+  }
+
+  // Slow processing: poll the job until it finishes
+  const { job_id }: PhotoJobStatus = await response.json();
+  while (true) {
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+    const jobResponse = await fetch(
+      `${API_BASE_URL}/upload/id-photo/jobs/${job_id}`
+    );
+    if (!jobResponse.ok) {
+      const errorText = await jobResponse.text();
+      throw new Error(`Upload failed: ${errorText}`);
+    }
+    const job: PhotoJobStatus = await jobResponse.json();
+    if (job.status === "done") {
+      return { media_id: job.media_id!, kind: job.kind!, variants: job.variants };
+    }
+    if (job.status === "failed") {
+      throw new Error(`Upload failed: ${job.detail}`);
+    }
+  }
 }
 
 // Get uploaded image URL